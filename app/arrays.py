@@ -0,0 +1,144 @@
+import math
+from numbers import Integral
+
+try:
+    import numpy as np
+except ImportError:  # NumPy steht in requirements.txt; ohne sie arbeiten die Funktionen auf Listen
+    np = None
+
+# Array-Funktionen für den Interpreter. Mit NumPy liefern array(), linspace()
+# und range() mit Kommazahlen echte Arrays, mit denen + - * / ^ elementweise
+# rechnen. range() mit ganzen Zahlen bleibt immer eine Liste von Python-ints:
+# kein Überlauf wie bei int64 und dieselbe Bedeutung mit und ohne NumPy.
+
+# Obergrenze für die Länge erzeugter Arrays (Schutz vor Speicherüberlauf)
+MAX_ARRAY_LENGTH = 10_000_000
+# Ohne NumPy werden Listen in Blöcken dieser Größe erzeugt; jeder Block
+# verbraucht vorher entsprechend viele Schritte des Budgets (charge)
+CHUNK_SIZE = 4096
+
+
+def is_array(value):
+    return np is not None and isinstance(value, np.ndarray)
+
+
+def _check_length(n):
+    if n > MAX_ARRAY_LENGTH:
+        raise ValueError(f"array too large ({n} > {MAX_ARRAY_LENGTH} elements)")
+
+
+def array(values):
+    if np is None:
+        raise RuntimeError("array() requires NumPy (pip install numpy)")
+    return np.asarray(values)
+
+
+def _sequence(n, start, step, charge):
+    # start, start + step, ... (n Werte) als Liste, blockweise mit Budget
+    values = []
+    exact = isinstance(start, int) and isinstance(step, int)
+    for offset in range(0, n, CHUNK_SIZE):
+        size = min(CHUNK_SIZE, n - offset)
+        if charge is not None:
+            charge(size)
+        if exact:
+            first = start + offset * step
+            values.extend(range(first, first + size * step, step))
+        else:
+            values.extend([start + i * step for i in range(offset, offset + size)])
+    return values
+
+
+def arange(start, stop=None, step=1, charge=None):
+    """range(stop) / range(start, stop[, step]); charge(n) bucht die Elemente
+    erzeugter Listen aufs Ausführungsbudget."""
+    if stop is None:
+        start, stop = 0, start
+    if step == 0:
+        raise ValueError("range() step must not be zero")
+    exact = all(isinstance(v, Integral) for v in (start, stop, step))
+    if exact:
+        start, stop, step = int(start), int(stop), int(step)
+    n = max(0, math.ceil((stop - start) / step))
+    _check_length(n)
+    if np is not None and not exact:
+        return np.arange(start, stop, step)
+    return _sequence(n, start, step, charge)
+
+
+def linspace(start, stop, num=50, charge=None):
+    num = int(num)
+    _check_length(num)
+    if np is not None:
+        return np.linspace(start, stop, num)
+    if num == 1:
+        return [float(start)]
+    if num <= 0:
+        return []
+    values = _sequence(num, float(start), (stop - start) / (num - 1), charge)
+    values[-1] = float(stop)
+    return values
+
+
+def _scalar(value):
+    # NumPy-Skalare als normale Python-Zahlen zurückgeben
+    return value.item() if np is not None and isinstance(value, np.generic) else value
+
+
+def array_sum(values, start=0):
+    if is_array(values):
+        return _scalar(values.sum()) + start
+    return sum(values, start)
+
+
+def array_min(*args):
+    if len(args) == 1 and is_array(args[0]):
+        return _scalar(args[0].min())
+    return min(*args)
+
+
+def array_max(*args):
+    if len(args) == 1 and is_array(args[0]):
+        return _scalar(args[0].max())
+    return max(*args)
+
+
+def mean(values):
+    if is_array(values):
+        if values.size == 0:
+            raise ValueError("mean() of an empty array")
+        return _scalar(values.mean())
+    values = list(values)
+    if not values:
+        raise ValueError("mean() of an empty list")
+    return sum(values) / len(values)
+
+
+def elementwise(scalar_fn, name):
+    """Macht eine math-Funktion (sqrt, sin, ...) auf Arrays elementweise nutzbar."""
+    if np is None:
+        return scalar_fn
+    array_fn = getattr(np, name)
+
+    def fn(x, *args):
+        # Weitere Argumente (z.B. log(x, basis)) werden durchgereicht
+        if isinstance(x, (np.ndarray, list, tuple)):
+            # log(0), sqrt(-1): -inf/nan im Ergebnis statt RuntimeWarning auf stderr
+            with np.errstate(all="ignore"):
+                if not args:
+                    return array_fn(x)
+                return np.vectorize(scalar_fn, otypes=[float])(x, *args)
+        return scalar_fn(x, *args)
+    fn.__name__ = name
+    return fn
+
+
+ARRAY_FUNCTIONS = {
+    "array": array,
+    "range": arange,
+    "linspace": linspace,
+    "sum": array_sum,
+    "min": array_min,
+    "max": array_max,
+    "mean": mean,
+}
@@ -0,0 +1,124 @@
+import os
+import sys
+
+from PySide6.QtCore import QObject, QUrl, QCoreApplication
+from PySide6.QtMultimedia import QSoundEffect, QMediaPlayer, QAudioOutput
+
+# Gemeinsamer Sound-Dienst für Zellen, Startbildschirm und Minispiele.
+# Kurze WAV-Effekte liegen vorgeladen in einem kleinen Pool von QSoundEffect-
+# Stimmen (niedrige Latenz, überlappende Aufrufe möglich); längere, komprimierte
+# Sounds (MP3) spielt ein einziger, erst bei Bedarf angelegter QMediaPlayer.
+
+VOLUME = 0.25
+# Gleichzeitig spielbare Instanzen pro Effekt
+VOICES = 4
+EFFECTS = {
+    "beep": "assets/beep.wav",
+}
+STREAMS = {
+    "start": "assets/start.mp3",
+}
+
+
+def resource_path(relative_path):
+    if hasattr(sys, '_MEIPASS'):
+        return os.path.join(sys._MEIPASS, relative_path)
+    return os.path.join(os.path.abspath('.'), relative_path)
+
+
+def _url(relative_path):
+    return QUrl.fromLocalFile(os.path.abspath(resource_path(relative_path)))
+
+
+class AudioEngine(QObject):
+    """Spielt benannte Sounds aus EFFECTS (Stimmen-Pool) und STREAMS (Media-Player)."""
+
+    def __init__(self, parent=None, voices=VOICES, volume=VOLUME):
+        super().__init__(parent)
+        self.volume = volume
+        self.muted = False
+        self._voices = {}  # Name -> Liste von QSoundEffect
+        self._next = {}  # Name -> Index der nächsten Stimme (Round-Robin)
+        for name, path in EFFECTS.items():
+            self.load_effect(name, path, voices)
+        self.player = None
+        self.audio_output = None
+
+    def load_effect(self, name, path, voices=VOICES):
+        """Lädt path (WAV) einmal pro Stimme vor; danach startet play(name) ohne Dekodieren."""
+        url = _url(path)
+        pool = []
+        for _ in range(voices):
+            effect = QSoundEffect(self)
+            effect.setSource(url)
+            effect.setVolume(self.volume)
+            pool.append(effect)
+        self._voices[name] = pool
+        self._next[name] = 0
+
+    def play(self, name):
+        if self.muted:
+            return
+        if name in self._voices:
+            self._play_effect(name)
+        elif name in STREAMS:
+            self._play_stream(STREAMS[name])
+
+    def _play_effect(self, name):
+        pool = self._voices[name]
+        start = self._next[name]
+        # Freie Stimme suchen; sind alle belegt, die älteste neu starten
+        for offset in range(len(pool)):
+            effect = pool[(start + offset) % len(pool)]
+            if not effect.isPlaying():
+                break
+        else:
+            effect = pool[start]
+            effect.stop()
+        if effect.status() == QSoundEffect.Status.Error:
+            return  # z.B. kein Audiogerät: still weiterarbeiten
+        self._next[name] = (pool.index(effect) + 1) % len(pool)
+        effect.play()
+
+    def _play_stream(self, path):
+        if self.player is None:
+            self.player = QMediaPlayer(self)
+            self.audio_output = QAudioOutput(self)
+            self.audio_output.setVolume(self.volume)
+            self.player.setAudioOutput(self.audio_output)
+        url = _url(path)
+        if self.player.source() != url:
+            self.player.setSource(url)
+        self.player.stop()
+        self.player.play()
+
+    def stop(self):
+        for pool in self._voices.values():
+            for effect in pool:
+                effect.stop()
+        if self.player is not None:
+            self.player.stop()
+
+    def set_volume(self, volume):
+        self.volume = volume
+        for pool in self._voices.values():
+            for effect in pool:
+                effect.setVolume(volume)
+        if self.audio_output is not None:
+            self.audio_output.setVolume(volume)
+
+    def set_muted(self, muted):
+        self.muted = muted
+        if muted:
+            self.stop()
+
+
+_engine = None
+
+
+def audio():
+    """Der gemeinsame AudioEngine; wird beim ersten Aufruf angelegt (QApplication muss existieren)."""
+    global _engine
+    if _engine is None:
+        _engine = AudioEngine(QCoreApplication.instance())
+    return _engine
@@ -0,0 +1,182 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.interpreter import ErrorMessage, ExecutionBudget, check_limits, flatten_results, is_error
+from app.cache import OutputCache
+from app.kernel import NotebookKernel
+from app.model import NotebookModel
+from app.storage import load_notebook, save_notebook
+
+# Headless-Ausführung gespeicherter Notebooks (run.py --exec): ohne Qt-Widgets
+# direkt auf dem NotebookModel, mehrere Notebooks parallel in einem Prozesspool.
+
+PNG_SIZE = 300
+
+
+def format_results(results):
+    """Ergebnisliste einer Zelle -> (Ausgabetext, Grafikliste, Fehler gefunden)."""
+    graphics = []
+    lines = []
+    error_found = False
+    for result in flatten_results(results):
+        if isinstance(result, dict) and 'graphics' in result:
+            graphics.extend(result['graphics'])
+            continue
+        if isinstance(result, dict) and 'input_request' in result:
+            result = ErrorMessage(f"Error: INPUT {result['input_request']} is not available in batch mode")
+        if is_error(result):
+            error_found = True
+        if result:
+            lines.append(str(result))
+    return "\n".join(lines), graphics, error_found
+
+
+def export_png(graphics, path, size=PNG_SIZE):
+    """Zeichnet eine Grafikliste offscreen in eine PNG-Datei."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtGui import QGuiApplication, QImage, QPainter, QColor
+    from app.graphics import paint_graphics
+    QGuiApplication.instance() or QGuiApplication([])
+    image = QImage(size, size, QImage.Format.Format_RGB32)
+    image.fill(QColor('black'))
+    painter = QPainter(image)
+    paint_graphics(painter, graphics, size)
+    painter.end()
+    if not image.save(path):
+        raise OSError(f"could not write {path}")
+
+
+def run_notebook(path, png_dir=None, max_steps=None, max_seconds=None, write_back=True,
+                 profile_dir=None, use_cache=True):
+    """Führt alle Code-Zellen eines Notebooks aus und schreibt die Ausgaben zurück.
+
+    Mit profile_dir wird jede Zelle profiliert und das Profil als JSON gespeichert.
+    Unveränderte Zellen kommen aus dem Ausgabe-Cache neben dem Notebook.
+    Ungültige max_steps/max_seconds (negativ, nicht endlich) -> ValueError.
+
+    Gibt eine Zusammenfassung als dict zurück (picklebar für den Prozesspool)."""
+    started = time.perf_counter()
+    path = os.path.abspath(path)
+    summary = {"path": path, "cells": 0, "cached": 0, "errors": [], "warnings": [], "pngs": []}
+    try:
+        notebook = NotebookModel.from_data(load_notebook(path))
+    except Exception as e:
+        summary["errors"].append(f"load failed: {type(e).__name__}: {e}")
+        return summary
+    budget = ExecutionBudget()
+    # Budget aus dem Notebook, Kommandozeile hat Vorrang
+    limits = notebook.budget_limits()
+    if limits is not None:
+        try:
+            budget.set_limits(*check_limits(*limits))
+        except ValueError as e:
+            summary["warnings"].append(f"invalid notebook budget ignored: {e}")
+    if max_steps is not None:
+        budget.set_limits(check_limits(max_steps, None)[0], budget.max_seconds)
+    if max_seconds is not None:
+        budget.set_limits(budget.max_steps, check_limits(None, max_seconds)[1])
+    stem = os.path.splitext(os.path.basename(path))[0]
+    # Wie in der GUI: alle Zellen teilen sich einen Kernel
+    kernel = NotebookKernel(budget, OutputCache.for_notebook(path) if use_cache else None)
+    interpreter = kernel.interpreter
+    for idx, cell in enumerate(notebook.cells):
+        if cell.cell_type != "Code":
+            continue
+        summary["cells"] += 1
+        if profile_dir:
+            interpreter.enable_profiler()
+        source = cell.source
+        key, entry = kernel.cache_lookup(source)
+        cell.start_run(source, kernel.begin(cell))
+        if entry is not None:
+            results = kernel.cache_apply(entry)
+            summary["cached"] += 1
+        else:
+            try:
+                results = interpreter.run_block(source.splitlines())
+            except Exception as e:
+                # Wie im Worker: Absturz einer Zelle als Fehler melden, weiter mit der nächsten
+                results = [ErrorMessage(f"Error: {type(e).__name__}: {e}")]
+        kernel.finish()
+        text, graphics, error_found = format_results(results)
+        # --dry-run: weder das Notebook noch den Cache verändern
+        if write_back and entry is None and not error_found:
+            outputs = [r for r in flatten_results(results) if not (isinstance(r, dict) and 'graphics' in r)]
+            kernel.cache_store(key, source, outputs, graphics)
+        cell.set_result(text.split("\n") if text else [], graphics)
+        if error_found:
+            summary["errors"].append(f"cell {idx}: {text.splitlines()[-1]}")
+        if profile_dir:
+            interpreter.profiler.to_json(os.path.join(profile_dir, f"{stem}_cell{idx}.profile.json"))
+        if graphics and png_dir:
+            png_path = os.path.join(png_dir, f"{stem}_cell{idx}.png")
+            try:
+                export_png(graphics, png_path)
+                summary["pngs"].append(png_path)
+            except ImportError:
+                summary["warnings"].append(f"cell {idx}: PNG export needs PySide6, skipped")
+            except Exception as e:
+                summary["errors"].append(f"cell {idx}: PNG export failed: {type(e).__name__}: {e}")
+    if write_back:
+        save_notebook(notebook, path)
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def _run_one(job):
+    return run_notebook(*job)
+
+
+def run_notebooks(paths, jobs=None, png_dir=None, max_steps=None, max_seconds=None, write_back=True,
+                  profile_dir=None, use_cache=True):
+    """Führt mehrere Notebooks parallel aus; liefert die Zusammenfassungen in Eingabereihenfolge."""
+    check_limits(max_steps, max_seconds)  # ValueError vor dem Start statt in jedem Prozess
+    for directory in (png_dir, profile_dir):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    work = [(p, png_dir, max_steps, max_seconds, write_back, profile_dir, use_cache) for p in paths]
+    if len(work) <= 1 or jobs == 1:
+        return [_run_one(job) for job in work]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(_run_one, work))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="run.py --exec", description="Retro Notebook headless ausführen")
+    parser.add_argument("--exec", dest="notebooks", nargs="+", required=True, metavar="NOTEBOOK",
+                        help="Notebook-Dateien (JSON), die ausgeführt werden")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="Anzahl paralleler Prozesse (Standard: Anzahl CPUs)")
+    parser.add_argument("--png", metavar="DIR", help="Grafiken der Zellen als PNG in DIR speichern")
+    parser.add_argument("--max-steps", type=int, default=None, help="Schrittbudget pro Zelle (0 = unbegrenzt)")
+    parser.add_argument("--max-seconds", type=float, default=None, help="Zeitbudget pro Zelle (0 = unbegrenzt)")
+    parser.add_argument("--profile", metavar="DIR", help="Zellen profilieren, Profile als JSON in DIR")
+    parser.add_argument("--no-cache", action="store_true", help="Ausgabe-Cache neben dem Notebook nicht nutzen")
+    parser.add_argument("--dry-run", action="store_true", help="Ausgaben nicht in die Dateien zurückschreiben")
+    args = parser.parse_args(argv)
+    # Wie beim Budget-Dialog der GUI: ungültige Grenzen sind ein Bedienfehler, kein Zellfehler
+    try:
+        check_limits(args.max_steps, args.max_seconds)
+    except ValueError as e:
+        parser.error(str(e))
+
+    summaries = run_notebooks(args.notebooks, args.jobs, args.png, args.max_steps,
+                              args.max_seconds, not args.dry_run, args.profile, not args.no_cache)
+    failed = 0
+    for summary in summaries:
+        status = "FAIL" if summary["errors"] else "ok"
+        print(f"[{status}] {summary['path']}: {summary['cells']} Zellen ({summary['cached']} aus Cache), "
+              f"{summary.get('seconds', 0)} s")
+        for message in summary["errors"] + summary["warnings"]:
+            print(f"    {message}")
+        failed += bool(summary["errors"])
+    print(f"{len(summaries) - failed}/{len(summaries)} Notebooks ohne Fehler")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
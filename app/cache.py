@@ -0,0 +1,259 @@
+import hashlib
+import json
+import marshal
+import os
+from array import array
+
+from app import parser as ast
+from app.arrays import is_array, np
+from app.deps import analyze, expression_names
+
+# Ausgabe-Cache für Zellen: Ergebnisse (Text und Grafik) werden unter einem
+# Hash aus Quelltext und den gelesenen Variablen/DEF-Funktionen auf der
+# Platte abgelegt. Läuft eine unveränderte Zelle mit denselben Eingaben
+# erneut, werden Ausgaben und geschriebene Variablen nur wiederhergestellt.
+# Die Dateien sind reines JSON (kein Pickle): ein fremder Cache kann höchstens
+# falsche Ausgaben liefern, aber keinen Code ausführen.
+
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+# Zellen mit mehr Ausgaben werden nicht gecacht
+MAX_CACHED_OUTPUTS = 10_000
+# Anweisungen mit Nebenwirkungen außerhalb von Variablen: nie cachen
+_UNCACHEABLE = (ast.Input, ast.Trace, ast.Budget)
+
+
+def _cacheable(nodes):
+    for node in nodes:
+        if isinstance(node, _UNCACHEABLE):
+            return False
+        if isinstance(node, ast.If):
+            if not (_cacheable(node.then_body) and _cacheable(node.else_body)):
+                return False
+        elif isinstance(node, (ast.While, ast.For)) and not _cacheable(node.body):
+            return False
+    return True
+
+
+def _input_names(interpreter, reads):
+    # Gelesene Namen plus alles, was aufgerufene DEF-Funktionen selbst lesen
+    names = set(reads)
+    todo = [name for name in names if name in interpreter.functions]
+    while todo:
+        args, body, _ = interpreter.functions[todo.pop()]
+        for name in expression_names(body) - set(args) - names:
+            names.add(name)
+            if name in interpreter.functions:
+                todo.append(name)
+    return names
+
+
+def _fingerprint(value):
+    # Hash des Inhalts eines Werts; None für Typen, die der Cache nicht kennt
+    try:
+        if is_array(value):
+            digest = hashlib.sha256(f"array {value.dtype.str} {value.shape}".encode("utf-8"))
+            digest.update(memoryview(np.ascontiguousarray(value)).cast("B"))
+            return digest.digest()
+        # marshal unterscheidet int/float/bool und ist so schnell wie pickle,
+        # kennt aber nur eingebaute Typen (Arrays in Listen: nicht cachebar).
+        # Version 2: ohne Rückverweise, die von Referenzzählern abhängen
+        return hashlib.sha256(marshal.dumps(value, 2)).digest()
+    except (ValueError, TypeError):
+        return None
+
+
+def cache_key(interpreter, source, fingerprints=None):
+    """Hash aus Quelltext und Eingabe-Umgebung; None, falls nicht cachebar.
+
+    fingerprints (dict, vom Aufrufer gehalten) merkt sich die Hashes gelesener
+    Werte: Solange eine Variable dasselbe Objekt ist und der Interpreter
+    seitdem nichts in Listen/Arrays geschrieben hat (mutations), wird ihr
+    Inhalt nicht erneut gehasht."""
+    if not _cacheable(ast.parse_program(source)):
+        return None
+    reads, _ = analyze(source)
+    digest = hashlib.sha256(source.encode("utf-8"))
+    for name in sorted(_input_names(interpreter, reads)):
+        digest.update(f"\0{name}\0".encode("utf-8"))
+        # Gleiche Rangfolge wie im Namensraum: Variablen vor DEF-Funktionen
+        if name in interpreter.env:
+            value = interpreter.env[name]
+            memo = fingerprints.get(name) if fingerprints is not None else None
+            if memo is not None and memo[0] is value and memo[1] == interpreter.mutations:
+                fingerprint = memo[2]
+            else:
+                fingerprint = _fingerprint(value)
+                if fingerprints is not None:
+                    fingerprints[name] = (value, interpreter.mutations, fingerprint)
+            if fingerprint is None:
+                return None
+            digest.update(fingerprint)
+        elif name in interpreter.functions:
+            digest.update(repr(interpreter.functions[name]).encode("utf-8"))
+        else:
+            digest.update(b"-")
+    return digest.hexdigest()
+
+
+def _encode(value):
+    # Wert -> JSON. Listen bleiben Listen, alle anderen Container werden als
+    # {"typ": ...} markiert (echte dicts also auch), damit _decode sie erkennt
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if np is not None and isinstance(value, np.generic):
+        return _encode(value.item())
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    if isinstance(value, tuple):
+        return {"tuple": [_encode(item) for item in value]}
+    if is_array(value):
+        if value.dtype.kind not in "biuf":
+            raise TypeError(f"array of {value.dtype} cannot be cached")
+        return {"array": value.tolist(), "dtype": value.dtype.str}
+    if isinstance(value, array):
+        # z.B. Koordinaten von PLOT/POINTS aus Listen (app.interpreter.coordinates)
+        return {"array": value.tolist(), "typecode": value.typecode}
+    if isinstance(value, dict):
+        return {"dict": [[_encode(k), _encode(v)] for k, v in value.items()]}
+    if isinstance(value, (set, frozenset)):
+        return {"set": [_encode(item) for item in value]}
+    if isinstance(value, complex):
+        return {"complex": [value.real, value.imag]}
+    raise TypeError(f"{type(value).__name__} cannot be cached")
+
+
+def _decode(data):
+    if isinstance(data, list):
+        return [_decode(item) for item in data]
+    if not isinstance(data, dict):
+        return data
+    if "tuple" in data:
+        return tuple(_decode(item) for item in data["tuple"])
+    if "typecode" in data:
+        return array(data["typecode"], data["array"])
+    if "array" in data:
+        # Ohne NumPy (anderer Rechner) bleibt das Array eine Liste
+        return np.array(data["array"], dtype=data["dtype"]) if np is not None else data["array"]
+    if "dict" in data:
+        return {_freeze(_decode(k)): _decode(v) for k, v in data["dict"]}
+    if "set" in data:
+        return {_freeze(_decode(item)) for item in data["set"]}
+    if "complex" in data:
+        return complex(*data["complex"])
+    raise ValueError(f"unknown cache value {sorted(data)}")
+
+
+def _freeze(key):
+    # JSON kennt keine Tupel als Schlüssel: Listen wieder hashbar machen
+    return tuple(_freeze(item) for item in key) if isinstance(key, list) else key
+
+
+def capture(interpreter, source, outputs, graphics):
+    """Cache-Eintrag nach einem Lauf: Ausgaben plus geschriebene Variablen/DEFs."""
+    _, writes = analyze(source)
+    return {
+        "outputs": list(outputs),
+        "graphics": list(graphics),
+        "env": {name: interpreter.env[name] for name in writes if name in interpreter.env},
+        "functions": {name: interpreter.functions[name] for name in writes
+                      if name in interpreter.functions and name not in interpreter.env},
+    }
+
+
+def apply(interpreter, entry):
+    """Stellt die von der Zelle geschriebenen Variablen und DEFs wieder her."""
+    for name, value in entry["env"].items():
+        interpreter.set_var(name, value)
+    for name, (args, body, memo) in entry["functions"].items():
+        interpreter._define_function(name, args, body, memo)
+
+
+class OutputCache:
+    """Verzeichnis mit einer JSON-Datei pro Cache-Eintrag, begrenzt auf max_bytes.
+
+    Beim Überschreiten werden die am längsten nicht benutzten Einträge
+    gelöscht (LRU über die Änderungszeit; Treffer erneuern sie)."""
+
+    def __init__(self, directory, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0  # Einträge, die put nicht als JSON speichern konnte
+
+    @classmethod
+    def for_notebook(cls, notebook_path, max_bytes=MAX_CACHE_BYTES):
+        """Cache-Verzeichnis neben dem Notebook: demo.json -> demo.cache/"""
+        return cls(os.path.splitext(notebook_path)[0] + ".cache", max_bytes)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            entry = {
+                "outputs": _decode(data["outputs"]),
+                "graphics": _decode(data["graphics"]),
+                "env": {name: _decode(value) for name, value in data["env"].items()},
+                "functions": {name: (list(args), body, bool(memo))
+                              for name, (args, body, memo) in data["functions"].items()},
+            }
+            os.utime(path)  # zuletzt benutzt
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            # Fehlt, beschädigt oder aus einer anderen Version: wie nicht gecacht
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        try:
+            data = json.dumps({
+                "outputs": _encode(entry["outputs"]),
+                "graphics": _encode(entry["graphics"]),
+                "env": {name: _encode(value) for name, value in entry["env"].items()},
+                "functions": {name: [list(args), body, memo]
+                              for name, (args, body, memo) in entry["functions"].items()},
+            }).encode("utf-8")
+        except (TypeError, ValueError):
+            # z.B. Werte, die JSON nicht abbilden kann: nicht cachen, aber mitzählen
+            self.skipped += 1
+            return False
+        if len(data) > self.max_bytes:
+            return False
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self.evict()
+        return True
+
+    def evict(self):
+        """Löscht die ältesten Einträge, bis der Cache unter max_bytes liegt."""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for item in it:
+                if item.name.endswith(".json"):
+                    stat = item.stat()
+                    entries.append((stat.st_mtime, stat.st_size, item.path))
+                    total += stat.st_size
+        entries.sort()
+        while total > self.max_bytes and entries:
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith((".json", ".pkl")):  # .pkl: Einträge älterer Versionen
+                    os.remove(os.path.join(self.directory, name))
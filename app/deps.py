@@ -0,0 +1,115 @@
+import ast as pyast
+from functools import lru_cache
+
+from app import parser as ast
+
+# Abhängigkeiten zwischen Zellen: welche Namen liest bzw. schreibt eine Zelle?
+# Geschrieben wird durch LET, DEF, INPUT und FOR; gelesen wird jeder Name, der
+# in einem Ausdruck vorkommt. Daraus ergibt sich, welche Zellen bei Run All neu
+# laufen müssen und welche "downstream" von einer Zelle liegen.
+
+
+def expression_names(expr):
+    """Alle Namen, die in einem Ausdruck gelesen werden."""
+    try:
+        tree = pyast.parse(expr.replace("^", "**"), mode="eval")
+    except SyntaxError:
+        return set()
+    return {node.id for node in pyast.walk(tree) if isinstance(node, pyast.Name)}
+
+
+def _expressions(node):
+    # Ausdrücke eines Knotens (ohne verschachtelte Blöcke)
+    if isinstance(node, (ast.Let, ast.Print, ast.Expr)):
+        return [node.expr]
+    if isinstance(node, (ast.Graphics, ast.Budget)):
+        return node.args
+    if isinstance(node, (ast.If, ast.While)):
+        return [node.cond]
+    if isinstance(node, ast.For):
+        return [e for e in (node.start, node.end, node.step) if e]
+    return []
+
+
+def _walk(nodes, reads, writes):
+    for node in nodes:
+        for expr in _expressions(node):
+            reads |= expression_names(expr)
+        if isinstance(node, ast.Let):
+            writes.add(node.name)
+            if node.index is not None:
+                reads.add(node.name)  # arr[1] = ... verändert das bestehende arr
+        elif isinstance(node, ast.Def):
+            writes.add(node.name)
+            reads |= expression_names(node.body) - set(node.args)
+        elif isinstance(node, ast.Input):
+            writes.add(node.name)
+        elif isinstance(node, ast.For):
+            writes.add(node.var)
+        if isinstance(node, ast.If):
+            _walk(node.then_body, reads, writes)
+            _walk(node.else_body, reads, writes)
+        elif isinstance(node, (ast.While, ast.For)):
+            _walk(node.body, reads, writes)
+
+
+@lru_cache(maxsize=1024)
+def analyze(source):
+    """Zellquelltext -> (gelesene Namen, geschriebene Namen) als frozensets."""
+    reads, writes = set(), set()
+    _walk(ast.parse_program(source), reads, writes)
+    return frozenset(reads), frozenset(writes)
+
+
+class DependencyGraph:
+    """Abhängigkeiten einer Zellliste in Notebook-Reihenfolge.
+
+    sources enthält pro Zelle den Quelltext (None für Markdown-Zellen). Eine
+    Zelle hängt für jeden gelesenen Namen von der letzten Zelle davor ab, die
+    ihn schreibt. Kanten zeigen also immer nach vorne; die Notebook-Reihenfolge
+    ist damit bereits eine topologische Sortierung."""
+
+    def __init__(self, sources):
+        self.sources = list(sources)
+        self.reads = []
+        self.writes = []
+        self.upstream = []  # Index -> Indizes der Zellen, von denen sie abhängt
+        last_writer = {}
+        for idx, source in enumerate(self.sources):
+            reads, writes = analyze(source) if source is not None else (frozenset(), frozenset())
+            self.reads.append(reads)
+            self.writes.append(writes)
+            self.upstream.append({last_writer[name] for name in reads if name in last_writer})
+            for name in writes:
+                last_writer[name] = idx
+
+    def downstream(self, idx):
+        """Alle Zellen, die (auch indirekt) von Zelle idx abhängen, in Ausführungsreihenfolge."""
+        affected = {idx}
+        result = []
+        for j in range(idx + 1, len(self.sources)):
+            if self.upstream[j] & affected:
+                affected.add(j)
+                result.append(j)
+        return result
+
+    def stale(self, runs):
+        """Zellen, die bei Run All neu laufen müssen, in Ausführungsreihenfolge.
+
+        runs[i] ist (Quelltext beim letzten Lauf, Ausführungsnummer) oder None,
+        falls die Zelle noch nie lief. Neu laufen muss eine Zelle, deren Code
+        sich geändert hat, die noch nie lief, deren Vorgänger neu läuft oder
+        deren Vorgänger seit ihrem letzten Lauf erneut ausgeführt wurde."""
+        rerun = set()
+        for idx, source in enumerate(self.sources):
+            if source is None:
+                continue
+            run = runs[idx]
+            if run is None or run[0] != source or self.upstream[idx] & rerun:
+                rerun.add(idx)
+                continue
+            for up in self.upstream[idx]:
+                if runs[up] is None or runs[up][1] > run[1]:
+                    rerun.add(idx)
+                    break
+        return sorted(rerun)
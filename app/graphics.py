@@ -0,0 +1,43 @@
+from PySide6.QtCore import QPointF
+from PySide6.QtGui import QColor, QPainter, QPen, QPolygonF
+
+# Grafikbefehle arbeiten in einem 100x100-Koordinatensystem, das auf die
+# Zeichenfläche skaliert wird.
+COORD_RANGE = 100
+
+
+def _polygon(xs, ys, scale):
+    return QPolygonF([QPointF(x * scale, y * scale) for x, y in zip(xs, ys)])
+
+
+def paint_graphics(painter, graphics, size):
+    """Zeichnet eine Grafikliste (siehe RetroInterpreter) auf painter.
+
+    PLOT/POINTS werden als ein einziger drawPolyline-/drawPoints-Aufruf
+    gezeichnet, egal wie viele Punkte sie enthalten."""
+    scale = size / COORD_RANGE
+    painter.setRenderHint(QPainter.Antialiasing)
+    pen = QPen(QColor('#33ff66'))
+    painter.setPen(pen)
+    for item in graphics:
+        if item['type'] == 'point':
+            x = int(item['x'] * scale)
+            y = int(item['y'] * scale)
+            painter.drawEllipse(x-2, y-2, 4, 4)
+        elif item['type'] == 'line':
+            x1 = int(item['x1'] * scale)
+            y1 = int(item['y1'] * scale)
+            x2 = int(item['x2'] * scale)
+            y2 = int(item['y2'] * scale)
+            painter.drawLine(x1, y1, x2, y2)
+        elif item['type'] == 'circle':
+            x = int(item['x'] * scale)
+            y = int(item['y'] * scale)
+            r = int(item['r'] * scale)
+            painter.drawEllipse(x - r, y - r, 2*r, 2*r)
+        elif item['type'] == 'polyline':
+            painter.drawPolyline(_polygon(item['xs'], item['ys'], scale))
+        elif item['type'] == 'points':
+            painter.setPen(QPen(QColor('#33ff66'), 3))
+            painter.drawPoints(_polygon(item['xs'], item['ys'], scale))
+            painter.setPen(pen)
@@ -1,7 +1,18 @@
+import io
 import math
+import numbers
 import operator
-import re
 import time
+import tokenize
+from array import array
+from functools import lru_cache, wraps
+from collections import OrderedDict, deque
+
+from app import parser as ast
+from app.arrays import ARRAY_FUNCTIONS, arange, elementwise, is_array, linspace, np
+from app.profiler import LineProfiler
+from app.sandbox import (ITER_HELPER, MAX_ALLOCATION, MAX_CALL_DEPTH, LimitExceeded, compile_expression,
+                         compile_lambda, helpers)
 
 # Unterstützte Operatoren für Berechnungen
 OPS = {
@@ -12,14 +23,18 @@ OPS = {
     "/": operator.truediv,
 }
 
+# Mit NumPy arbeiten diese Funktionen auch elementweise auf Arrays
 FUNCTIONS = {
-    "sqrt": math.sqrt,
-    "sin": math.sin,
-    "cos": math.cos,
-    "tan": math.tan,
-    "log": math.log,
-    "exp": math.exp,
+    "sqrt": elementwise(math.sqrt, "sqrt"),
+    "sin": elementwise(math.sin, "sin"),
+    "cos": elementwise(math.cos, "cos"),
+    "tan": elementwise(math.tan, "tan"),
+    "log": elementwise(math.log, "log"),
+    "exp": elementwise(math.exp, "exp"),
+    **ARRAY_FUNCTIONS,
 }
+# Liefern neue Arrays: deren Größe zählt wie die der Operatoren (_allocate)
+ARRAY_RESULTS = ("sqrt", "sin", "cos", "tan", "log", "exp", "array")
 
 CONSTANTS = {
     "pi": math.pi,
@@ -27,35 +42,224 @@ CONSTANTS = {
     "e": math.e,
 }
 
-def make_user_function(interpreter, arglist, expr):
-        def user_func(*actuals):
-            local_vars = dict(zip(arglist, actuals))
-            return interpreter.eval_expr_with_scope(expr, local_vars)
-        return user_func
+# Maximale Anzahl kompilierter Ausdrücke pro Interpreter (LRU)
+EXPR_CACHE_SIZE = 512
+# Maximale Anzahl gemerkter Ergebnisse pro DEF PURE/MEMO-Funktion (LRU)
+MEMO_CACHE_SIZE = 4096
+
+# Standard-Budget pro Ausführung (Anweisungen, Schleifendurchläufe und
+# DEF-Aufrufe zählen je einen Schritt)
+DEFAULT_MAX_STEPS = 1_000_000
+DEFAULT_MAX_SECONDS = 10.0
+# Die Uhr wird nur alle N Schritte abgefragt
+CLOCK_CHECK_INTERVAL = 256
+# Mindestabstand zwischen zwei Heartbeat-Meldungen (Sekunden)
+HEARTBEAT_INTERVAL = 0.1
+
+
+# Größe des Ringpuffers für TRACE ON (ältere Einträge fallen heraus)
+TRACE_SIZE = 200
+
+
+class BudgetExceeded(Exception):
+    """Schritt- oder Zeitbudget einer Ausführung ist aufgebraucht."""
+
+
+class ExecutionCancelled(BudgetExceeded):
+    """Die Ausführung wurde von außen (z.B. Abbrechen-Button) beendet."""
+
+
+class ExecutionBudget:
+    """Grenzen für eine Ausführung in Schritten und Sekunden (None = unbegrenzt).
+
+    Ein Objekt dient gleichzeitig als Einstellung (Notebook/Zelle) und, über
+    start(), als Zähler für einen konkreten Lauf."""
+
+    def __init__(self, max_steps=DEFAULT_MAX_STEPS, max_seconds=DEFAULT_MAX_SECONDS):
+        self.steps = 0
+        self.started = None
+        self.cancelled = False
+        self.heartbeat = None
+        self._next_clock_check = CLOCK_CHECK_INTERVAL
+        self._next_heartbeat = 0.0
+        self.set_limits(max_steps, max_seconds)
+
+    def start(self, heartbeat=None):
+        """Liefert einen frischen Zähler mit denselben Grenzen und startet ihn.
+
+        heartbeat(usage) wird während des Laufs höchstens alle
+        HEARTBEAT_INTERVAL Sekunden aufgerufen."""
+        meter = ExecutionBudget(self.max_steps, self.max_seconds)
+        meter.begin(heartbeat)
+        return meter
+
+    def begin(self, heartbeat=None):
+        """Startet die Uhr dieses Zählers. Ein vorher aufgerufenes cancel()
+        bleibt wirksam (Zähler, die vor dem Lauf angelegt werden)."""
+        self.started = time.perf_counter()
+        self.heartbeat = heartbeat
+        self._next_heartbeat = self.started + HEARTBEAT_INTERVAL
+        self.set_limits(self.max_steps, self.max_seconds)
+
+    def set_limits(self, max_steps, max_seconds):
+        self.max_steps = max_steps
+        self.max_seconds = max_seconds
+        self._step_limit = math.inf if max_steps is None else max_steps
+        if self.cancelled:
+            self._step_limit = -1
+        if max_seconds is None or self.started is None:
+            self._deadline = math.inf
+        else:
+            self._deadline = self.started + max_seconds
+
+    def charge(self, steps=1):
+        self.steps += steps
+        if self.steps > self._step_limit:
+            if self.cancelled:
+                raise ExecutionCancelled("Error: execution cancelled")
+            raise BudgetExceeded(f"Error: execution budget of {self.max_steps} steps exceeded")
+        if self.steps >= self._next_clock_check:
+            self._next_clock_check = self.steps + CLOCK_CHECK_INTERVAL
+            now = time.perf_counter()
+            if now > self._deadline:
+                raise BudgetExceeded(f"Error: execution time budget of {self.max_seconds} s exceeded")
+            if self.heartbeat is not None and now >= self._next_heartbeat:
+                self._next_heartbeat = now + HEARTBEAT_INTERVAL
+                self.heartbeat(self.usage())
+
+    def cancel(self):
+        """Beendet den Lauf beim nächsten Schritt (darf aus einem anderen Thread kommen)."""
+        self.cancelled = True
+        self._step_limit = -1
+
+    def elapsed(self):
+        return 0.0 if self.started is None else time.perf_counter() - self.started
+
+    def usage(self):
+        return {
+            "steps": self.steps,
+            "seconds": round(self.elapsed(), 4),
+            "max_steps": self.max_steps,
+            "max_seconds": self.max_seconds,
+        }
+
+
+def check_limit(value, name):
+    """Prüft einen Budget-Wert: None oder 0 = unbegrenzt (None), sonst eine
+    endliche Zahl >= 0. Wirft ValueError bei allem anderen."""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, numbers.Real) or value < 0 \
+            or (isinstance(value, float) and not math.isfinite(value)):
+        raise ValueError(f"{name} must be a finite, non-negative number, got {value!r}")
+    return value or None
+
+
+def check_limits(max_steps, max_seconds):
+    """(Schritte, Sekunden) geprüft und normalisiert; Schritte als ganze Zahl."""
+    max_steps = check_limit(max_steps, "steps")
+    if max_steps is not None:
+        max_steps = max(1, int(max_steps))
+    return max_steps, check_limit(max_seconds, "seconds")
+
+
+class _Suspend(Exception):
+    """Bricht die Ausführung ab, bis eine INPUT-Eingabe vorliegt."""
+
+
+class StateSnapshot:
+    """Eingefrorener Zustand (Variablen und DEF-Funktionen) eines Interpreters.
+
+    Die Dicts sind flache Kopien. Listen und Arrays werden nicht kopiert,
+    sondern erst bei einer späteren Index-Zuweisung (copy-on-write)."""
+    __slots__ = ("env", "functions", "user_functions")
+
+    def __init__(self, env, functions, user_functions):
+        self.env = env
+        self.functions = functions
+        self.user_functions = user_functions
+
+
+class ErrorMessage(str):
+    """Fehlermeldung des Interpreters. Als eigener Typ, damit ein Benutzer-String
+    wie 'Error x' ein ganz normaler Wert bleibt."""
+
+
+def is_error(out):
+    """Ist out eine Fehlermeldung (und kein Wert, der nur so aussieht)?"""
+    return isinstance(out, ErrorMessage)
+
+
+def flatten_results(items):
+    """Verschachtelte Ergebnislisten von run_block/run_line flach durchlaufen."""
+    for item in items:
+        if isinstance(item, list):
+            yield from flatten_results(item)
+        else:
+            yield item
+
+
+def coordinates(values):
+    """Liste/Array von Zahlen -> kompaktes float64-Array (NumPy oder array('d'))."""
+    if is_array(values):
+        return np.asarray(values, dtype=float).ravel()
+    if isinstance(values, (int, float)):
+        raise TypeError("PLOT/POINTS expect a list or array of numbers")
+    return array('d', map(float, values))
+
+
+def make_user_function(interpreter, arglist, expr, memo=False, name="<lambda>"):
+    """Kompiliert einen DEF-Rumpf einmal zu einer echten Python-Funktion.
+
+    Die Argumente werden zu lokalen Variablen eines lambda, alle anderen
+    Namen kommen aus dem Namensraum des Interpreters. Mit memo=True werden
+    Ergebnisse pro (hashbarem) Argumenttupel in einem LRU-Cache gehalten.
+    Ist der Profiler aktiv, werden Aufrufe und Zeit unter name verbucht.
+    Der Rumpf wird wie jeder Ausdruck durch die Sandbox geprüft."""
+    normalized = interpreter._normalize_expr(expr)
+    source = f"lambda {', '.join(arglist)}: {normalized}"
+    body = eval(compile_lambda(arglist, normalized, source), interpreter.namespace)
+    if memo:
+        cached = lru_cache(maxsize=MEMO_CACHE_SIZE)(body)
+
+        def call(*actuals):
+            try:
+                hash(actuals)
+            except TypeError:  # z.B. Listen als Argument: nicht cachebar
+                return body(*actuals)
+            return cached(*actuals)
+    else:
+        call = body
+
+    def user_func(*actuals):
+        interpreter.meter.charge()
+        if interpreter._call_depth >= MAX_CALL_DEPTH:
+            raise RecursionError(f"maximum DEF call depth of {MAX_CALL_DEPTH} exceeded")
+        interpreter._call_depth += 1
+        try:
+            if interpreter.profiler is not None:
+                return interpreter.profiler.call(name, call, actuals)
+            return call(*actuals)
+        finally:
+            interpreter._call_depth -= 1
+    if memo:
+        user_func.cache_info = cached.cache_info
+    return user_func
+
 
 class RetroInterpreter:
-    def __init__(self):
-        self.functions = {}  # Name -> (arg_list, body_expr)
+    def __init__(self, budget=None):
+        self.functions = {}  # Name -> (arg_list, body_expr, memo)
+        self._user_functions = {}  # Name -> kompilierte Funktion
         self.env = {}  # Variablen speichern
-        self.in_if_block = False
-        self.if_condition = None
-        self.if_lines_true = []
-        self.if_lines_false = []
-        self.collecting_else = False
-        self.in_while_block = False
-        self.while_condition = None
-        self.while_lines = []
-        self.in_for_block = False
-        self.for_var = None
-        self.for_start = None
-        self.for_end = None
-        self.for_step = 1
-        self.for_lines = []
+        # Zeilenweise eingegebene Blöcke sammeln, bis das passende Ende kommt
+        self.block_lines = []
+        self.block_depth = 0
         self.pending_input_var = None  # Für GUI-Input
         self.last_input_result = None
-        self.in_frame_block = False
+        # Grafikpuffer des laufenden Frames; jeder Grafikbefehl wird genau
+        # einmal ausgewertet und hier angehängt (siehe _exec_graphics)
         self.current_frame = []
-        self.frames = []
         # Zusätzliche eingebaute Funktionen für Listen und Strings
         self.builtin_functions = {
             'len': len,
@@ -66,6 +270,97 @@ class RetroInterpreter:
             'ord': ord,
             'chr': chr,
         }
+        # Cache: Ausdruckstext -> kompiliertes Code-Objekt (LRU)
+        self.expr_cache = OrderedDict()
+        self.expr_cache_size = EXPR_CACHE_SIZE
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Lebender Namensraum für eval(): wird bei LET, DEF und INPUT
+        # schrittweise aktualisiert statt bei jedem Ausdruck neu gebaut
+        self.namespace = {"__builtins__": {}, **helpers(self._allocate), ITER_HELPER: self._limited_iter}
+        # Von der laufenden Auswertung erzeugte Elemente (siehe _allocate)
+        self._allocated = 0
+        # Funktionen, die ohne NumPy Listen erzeugen, buchen aufs Budget
+        self.library = {**FUNCTIONS, "range": self._range, "linspace": self._linspace}
+        for name in ARRAY_RESULTS:
+            self.library[name] = self._counted(self.library[name])
+        for name in {**CONSTANTS, **self.library, **self.builtin_functions}:
+            self._bind(name)
+        # Aktuelle Verschachtelungstiefe von DEF-Aufrufen
+        self._call_depth = 0
+        # Ausführer je Knotentyp des Anweisungsbaums
+        self._executors = {
+            ast.Let: self._exec_let,
+            ast.Print: self._exec_print,
+            ast.Expr: self._exec_expr,
+            ast.Def: self._exec_def,
+            ast.Input: self._exec_input,
+            ast.Help: self._exec_help,
+            ast.Budget: self._exec_budget,
+            ast.Trace: self._exec_trace,
+            ast.SyntaxErrorNode: self._exec_syntax_error,
+            ast.If: self._exec_if,
+            ast.While: self._exec_while,
+            ast.For: self._exec_for,
+            ast.Graphics: self._exec_graphics,
+        }
+        self._outputs = []
+        self._stream = None
+        # Budget für Schleifen und DEF-Aufrufe; last_usage = Verbrauch des letzten Laufs
+        self.budget = budget or ExecutionBudget()
+        self.meter = self.budget.start()
+        self.last_usage = None
+        # Ausführungs-Trace (aus = None, sonst begrenzter Ringpuffer)
+        self.trace = None
+        # Zeilenprofiler (aus = None, siehe enable_profiler)
+        self.profiler = None
+        # ids von Listen/Arrays, die in Snapshots stecken: vor dem Schreiben kopieren
+        self._shared = set()
+        # Zähler für Schreibzugriffe in Listen/Arrays (z.B. für den Ausgabe-Cache)
+        self.mutations = 0
+
+    def _bind(self, name):
+        # Rangfolge: eingebaut > Variablen > DEF-Funktionen > math/Arrays > Konstanten
+        if name in self.builtin_functions:
+            self.namespace[name] = self.builtin_functions[name]
+        elif name in self.env:
+            self.namespace[name] = self.env[name]
+        elif name in self._user_functions:
+            self.namespace[name] = self._user_functions[name]
+        elif name in self.library:
+            self.namespace[name] = self.library[name]
+        elif name in CONSTANTS:
+            # Konstanten (pi, π, e) haben den niedrigsten Rang: LET e = 5 gewinnt
+            self.namespace[name] = CONSTANTS[name]
+        else:
+            self.namespace.pop(name, None)
+
+    def set_var(self, name, value):
+        self.env[name] = value
+        self._bind(name)
+
+    def snapshot(self):
+        """Hält den aktuellen Zustand fest, ohne Listen/Arrays zu kopieren."""
+        snap = StateSnapshot(dict(self.env), dict(self.functions), dict(self._user_functions))
+        self._shared.update(id(v) for v in self.env.values() if isinstance(v, list) or is_array(v))
+        return snap
+
+    def restore(self, snap):
+        """Setzt Variablen und DEF-Funktionen auf den Stand von snap zurück."""
+        names = set(self.env) | set(self._user_functions) | set(snap.env) | set(snap.user_functions)
+        self.env = dict(snap.env)
+        self.functions = dict(snap.functions)
+        self._user_functions = dict(snap.user_functions)
+        for name in names:
+            self._bind(name)
+        self.block_lines = []
+        self.block_depth = 0
+        self.pending_input_var = None
+
+    def retain_snapshots(self, snapshots):
+        """Nur noch Container der übergebenen Snapshots gelten als geteilt."""
+        self._shared = {id(v) for snap in snapshots for v in snap.env.values()
+                        if isinstance(v, list) or is_array(v)}
 
     def run_line(self, line):
         # Falls auf Eingabe gewartet wird, keine weiteren Zeilen ausführen
@@ -86,86 +381,20 @@ class RetroInterpreter:
         if not line or line.startswith('#'):
             return ""
 
-        # Grafikbefehle im Frame sammeln (ohne Rekursion!)
-        if self.in_frame_block:
-            cmd = line.upper().split()[0]
-            args = line[len(cmd):].strip().split(',')
-            try:
-                if cmd == "POINT" and len(args) == 2:
-                    x = float(self.eval_expr(args[0]))
-                    y = float(self.eval_expr(args[1]))
-                    self.current_frame.append({"type": "point", "x": x, "y": y})
-                elif cmd == "LINE" and len(args) == 4:
-                    x1 = float(self.eval_expr(args[0]))
-                    y1 = float(self.eval_expr(args[1]))
-                    x2 = float(self.eval_expr(args[2]))
-                    y2 = float(self.eval_expr(args[3]))
-                    self.current_frame.append({"type": "line", "x1": x1, "y1": y1, "x2": x2, "y2": y2})
-                elif cmd == "CIRCLE" and len(args) == 3:
-                    x = float(self.eval_expr(args[0]))
-                    y = float(self.eval_expr(args[1]))
-                    r = float(self.eval_expr(args[2]))
-                    self.current_frame.append({"type": "circle", "x": x, "y": y, "r": r})
-                else:
-                    return f"Syntax Error in {cmd}"
-            except Exception as e:
-                return f"Error in {cmd}: {e}"
-            return ""
-
-        if self.in_for_block:
-            if line.upper() == "NEXT":
-                return self._run_for_block()
-            else:
-                self.for_lines.append(line)
-                return ""
-
-        if line.upper().startswith("FOR "):
-            return self._start_for_block(line)
-
-        if self.in_while_block:
-            if line.upper() == "ENDWHILE":
-                return self._run_while_block()
-            else:
-                self.while_lines.append(line)
+        # Blöcke (auch verschachtelt) sammeln und erst am äußeren Ende ausführen
+        self.block_depth += ast.block_delta(line)
+        if self.block_lines or self.block_depth > 0:
+            self.block_lines.append(line)
+            if self.block_depth > 0:
                 return ""
-
-        # Schleifenbeginn
-        if line.upper().startswith("WHILE "):
-            return self._start_while_block(line)
-
-        if self.in_if_block:
-            if line.upper() == "ELSE":
-                self.collecting_else = True
-                return ""
-            elif line.upper() == "ENDIF":
-                return self._run_if_block()
-            else:
-                if self.collecting_else:
-                    self.if_lines_false.append(line)
-                else:
-                    self.if_lines_true.append(line)
-                return ""
-
-        if line.upper().startswith("IF "):
-            return self._start_if_block(line)
-
-        if line.upper() == "HELP":
-            return self._handle_help()
-
-        if line.upper().startswith("INPUT "):
-            return self.handle_input(line[6:].strip())
-
-        if line.upper().startswith("LET "):
-            return self.handle_assignment(line[4:].strip())
-
-        elif line.upper().startswith("PRINT "):
-            return self.handle_print(line[6:].strip())
-
-        elif line.upper().startswith("DEF "):
-            return self.handle_function_def(line[4:].strip())
-
+            lines, self.block_lines = self.block_lines, []
         else:
-            return self.eval_expr(line)
+            lines = [line]
+        self.block_depth = 0
+        outputs = self.execute(ast.parse_program(lines))
+        if not outputs:
+            return ""
+        return outputs[0] if len(outputs) == 1 else outputs
 
     def _handle_help(self):
         return (
@@ -178,14 +407,20 @@ class RetroInterpreter:
             "PRINT expr                 - Evaluate and print expression\n"
             "INPUT var                  - Ask for user input\n"
             "DEF f(x) = expr            - Define a function\n"
+            "DEF MEMO f(x) = expr       - Function that remembers results (also: DEF PURE)\n"
             "IF cond THEN ... ELSE ... ENDIF - Conditional execution\n"
             "WHILE cond DO ... ENDWHILE      - While loop\n"
             "FOR i = a TO b [STEP s] ... NEXT - For loop\n"
+            "TRACE ON [n] / TRACE OFF   - Record the last n executed steps (default 200)\n"
+            "TRACE                      - Show the recorded steps\n"
+            "BUDGET steps [, seconds]   - Set the execution budget for this cell (0 = unlimited)\n"
             "\n"
             "# Graphics:\n"
             "POINT x, y                 - Draw a point at (x, y)\n"
             "LINE x1, y1, x2, y2        - Draw a line from (x1, y1) to (x2, y2)\n"
             "CIRCLE x, y, r             - Draw a circle with center (x, y) and radius r\n"
+            "PLOT xs, ys                - Draw a connected line through all points\n"
+            "POINTS xs, ys              - Draw all points (PLOT ys / POINTS ys: x = 0, 1, ...)\n"
             "\n"
             "# Built-in functions for lists/strings:\n"
             "len(x)   - Length of list or string\n"
@@ -196,213 +431,191 @@ class RetroInterpreter:
             "ord(c)   - Unicode code of character\n"
             "chr(n)   - Character from Unicode code\n"
             "\n"
+            "# Arrays (element-wise + - * / ^ with NumPy installed):\n"
+            "array(list)              - Convert a list to an array\n"
+            "range(a, b[, step])      - Numbers from a up to (not incl.) b\n"
+            "linspace(a, b, n)        - n evenly spaced numbers from a to b\n"
+            "sum(x), min(x), max(x), mean(x) - Aggregates over a list/array\n"
+            "x[a:b]                   - Slice of a list/array/string\n"
+            "\n"
             "# Notes:\n"
             "- All graphics commands in a code block are shown together.\n"
-            "- WHILE/ENDWHILE and FOR/NEXT support blocks.\n"
+            "- WHILE/ENDWHILE, FOR/NEXT and IF/ELSE/ENDIF blocks can be nested.\n"
             "- Errors in loops or graphics abort execution.\n"
-            "- Max 1000 WHILE iterations (to prevent endless loops).\n"
+            "- Loops and function calls run within an execution budget\n"
+            "  (default: 1000000 steps, 10 seconds per cell).\n"
             "\n"
             "HELP                        - Show this help message"
         )
 
-    def _start_for_block(self, line):
-            match = re.match(r"FOR ([a-zA-Z_][a-zA-Z0-9_]*) = (.+?) TO (.+?)( STEP (.+))?$", line, re.IGNORECASE)
-            if not match:
-                return "Syntax Error in FOR"
-
-            self.in_for_block = True
-            self.for_var = match.group(1)
-            self.for_start = self.eval_expr(match.group(2))
-            self.for_end = self.eval_expr(match.group(3))
-            self.for_step = self.eval_expr(match.group(5)) if match.group(5) else 1
-            self.for_lines = []
-
-            return ""
-
-    def _run_for_block(self):
-        self.in_for_block = False
-        outputs = []
-
-        i = self.for_start
-        self.env[self.for_var] = i
-
-        cmp = (lambda a, b: a <= b) if self.for_step > 0 else (lambda a, b: a >= b)
-
-        while cmp(i, self.for_end):
-            self.env[self.for_var] = i
-            for line in self.for_lines:
-                out = self.run_line(line)
-                if out:
-                    outputs.append(out)
-            i += self.for_step
-
-        return "\n".join(outputs)
-
-    def _start_while_block(self, line):
-        match = re.match(r"WHILE (.+?) DO", line, re.IGNORECASE)
-        if not match:
-            return "Syntax Error in WHILE"
-
-        self.in_while_block = True
-        self.while_condition = match.group(1)
-        self.while_lines = []
-        return ""
-    
-    def _run_while_block(self):
-        self.in_while_block = False
-        outputs = []
-        max_loops = 1000
-        loop_count = 0
-        last_i = None
-        while True:
-            if loop_count >= max_loops:
-                outputs.append("Error: Maximum WHILE loop iterations (1000) exceeded. Possible endless loop.")
-                break
-            condition_result = self.eval_expr(self.while_condition)
-            if isinstance(condition_result, str) and condition_result.startswith("Error"):
-                outputs.append(condition_result)
-                break
-            if not condition_result:
-                break
-            # Debug: Wert von i ausgeben, falls vorhanden
-            debug_i = self.env.get('i', None)
-            outputs.append(f"[DEBUG] i = {debug_i}")
-            for line in self.while_lines:
-                out = self.run_line(line)
-                if isinstance(out, list):
-                    outputs.extend(out)
-                elif out:
-                    outputs.append(out)
-                # Schleife abbrechen, wenn Fehler erkannt wird
-                if isinstance(out, str) and out.startswith("Error"):
-                    outputs.append("Aborting WHILE due to error.")
-                    return outputs
-            # Prüfe, ob sich i verändert hat
-            if debug_i == self.env.get('i', None):
-                outputs.append("Error: i did not change in this loop iteration. Possible endless loop.")
-                break
-            loop_count += 1
-        return outputs
-
-    def _start_if_block(self, line):
-        match = re.match(r"IF (.+?) THEN", line, re.IGNORECASE)
-        if not match:
-            return "Syntax Error in IF"
-
-        condition = match.group(1)
-        self.in_if_block = True
-        self.if_condition = condition
-        self.if_lines_true = []
-        self.if_lines_false = []
-        self.collecting_else = False
-        return ""  # nichts sofort ausgeben
-
-    def _run_if_block(self):
-        self.in_if_block = False
-        result = self.eval_expr(self.if_condition)
-
-        if isinstance(result, str) and result.startswith("Error"):
-            return result
-
-        lines = self.if_lines_true if result else self.if_lines_false
-        outputs = []
-
-        for line in lines:
-            out = self.run_line(line)
-            if out:
-                outputs.append(out)
-
-        return "\n".join(outputs)
-
-    # Funktion zur Handhabung von Funktionsdefinitionen
-    def handle_assignment(self, statement):
-        # Unterstützt jetzt auch arr[1] = ... und s[1] = ...
-        match = re.match(r"([a-zA-Z_][a-zA-Z0-9_]*)(\s*\[\s*(\d+)\s*\])?\s*=\s*(.+)", statement)
-        if not match:
-            return "Syntax Error in LET"
-        name, _, idx, expr = match.groups()
-        value = self.eval_expr(expr)
+    def _assign(self, name, idx, value):
         if idx is not None:
             container = self.env.get(name)
-            if isinstance(container, list):
+            if isinstance(container, list) or is_array(container):
+                if id(container) in self._shared:
+                    # Steckt in einem Snapshot: erst kopieren, dann schreiben
+                    container = container.copy()
+                    self.set_var(name, container)
                 try:
                     container[int(idx)] = value
                 except Exception as e:
-                    return f"Error in list assignment: {e}"
+                    return ErrorMessage(f"Error in list assignment: {e}")
+                self.mutations += 1
                 return f"{name}[{idx}] = {value}"
             elif isinstance(container, str):
                 try:
                     i = int(idx)
                     if not (0 <= i < len(container)):
-                        return f"Error: string index out of range"
+                        return ErrorMessage(f"Error: string index out of range")
                     # Wert muss ein einzelnes Zeichen sein
                     if not (isinstance(value, str) and len(value) == 1):
-                        return f"Error: can only assign a single character to string"
+                        return ErrorMessage(f"Error: can only assign a single character to string")
                     new_str = container[:i] + value + container[i+1:]
-                    self.env[name] = new_str
+                    self.set_var(name, new_str)
                     return f"{name}[{idx}] = '{value}'"
                 except Exception as e:
-                    return f"Error in string assignment: {e}"
+                    return ErrorMessage(f"Error in string assignment: {e}")
             else:
-                return f"Error: {name} is not a list or string"
+                return ErrorMessage(f"Error: {name} is not a list or string")
         else:
-            self.env[name] = value
+            self.set_var(name, value)
             return f"{name} = {value}"
 
-    # Funktion zur Handhabung von PRINT-Anweisungen
-    def handle_print(self, expr):
-        value = self.eval_expr(expr)
-        return f"{value}"
-
-    # Funktion zur Handhabung von Funktionsdefinitionen
-    def handle_function_def(self, statement):
-        # Beispiel: square(x) = x^2
-        match = re.match(r"([a-zA-Z_][a-zA-Z0-9_]*)\((.*?)\)\s*=\s*(.+)", statement)
-        if not match:
-            return "Syntax Error in DEF"
-
-        name, arg_str, body = match.groups()
-        args = [arg.strip() for arg in arg_str.split(",") if arg.strip()]
-
-        self.functions[name] = (args, body)
-        return f"Function '{name}' defined"
+    def _define_function(self, name, args, body, memo=False):
+        try:
+            func = make_user_function(self, args, body, memo, name)
+        except Exception as e:
+            return ErrorMessage(f"Syntax Error in DEF {name}: {type(e).__name__}: {e}")
+        self.functions[name] = (args, body, memo)
+        self._user_functions[name] = func
+        self._bind(name)
+        return f"Function '{name}' defined" + (" (memoized)" if memo else "")
     
-   # Funktion zur Auswertung von Ausdrücken
+    # Funktion zur Auswertung von Ausdrücken
     def eval_expr(self, expr):
-        # Ersetze bekannte Konstanten
-        for const, val in CONSTANTS.items():
-            expr = re.sub(rf"\b{re.escape(const)}\b", str(val), expr)
-
-        # Ersetze ^ durch ** für Potenzen
-        expr = expr.replace("^", "**")
-
-        # Benutzerdefinierte Funktionen
-        user_funcs = {}
-        for name, (args, body) in self.functions.items():
-            user_funcs[name] = make_user_function(self, args, body)
-
         try:
-            safe_globals = {**FUNCTIONS, **user_funcs, **self.env, **self.builtin_functions}
-            return eval(expr, {"__builtins__": {}}, safe_globals)
+            code = self.compile_expr(expr)
         except Exception as e:
-            return f"Error in expression '{expr}': {type(e).__name__}: {e}"
-
-    def eval_expr_with_scope(self, expr, local_vars):
-        expr = expr.replace("^", "**")
-        for const, val in CONSTANTS.items():
-            expr = re.sub(rf"\b{re.escape(const)}\b", str(val), expr)
+            return ErrorMessage(f"Error in expression '{self._normalize_expr(expr)}': {type(e).__name__}: {e}")
+        self._allocated = 0
         try:
-            scope = {**FUNCTIONS, **self.env, **local_vars, **self.builtin_functions}
-            return eval(expr, {"__builtins__": {}}, scope)
+            return eval(code, self.namespace)
+        except BudgetExceeded:
+            raise
         except Exception as e:
-            return f"Error in function expression '{expr}': {type(e).__name__}: {e}"
-    
-    def handle_input(self, varname):
-        varname = varname.strip()
-        if not re.match(r"^[a-zA-Z_][a-zA-Z0-9_]*$", varname):
-            return "Syntax Error in INPUT"
-        self.pending_input_var = varname
-        return {"input_request": varname}
+            return ErrorMessage(f"Error in expression '{code.co_filename}': {type(e).__name__}: {e}")
+
+    def _normalize_expr(self, expr):
+        """Ersetzt den Operator ^ durch ** (Potenz), aber nicht in Strings.
+
+        Läuft nur beim Kompilieren; Konstanten kommen aus dem Namensraum."""
+        expr = expr.strip()
+        if "^" not in expr:
+            return expr
+        try:
+            tokens = list(tokenize.generate_tokens(io.StringIO(expr).readline))
+        except (tokenize.TokenError, SyntaxError):
+            # Unvollständiger Ausdruck: compile() meldet den eigentlichen Fehler
+            return expr.replace("^", "**")
+        for tok in reversed(tokens):
+            if tok.type == tokenize.OP and tok.string == "^" and tok.start[0] == 1:
+                col = tok.start[1]
+                expr = expr[:col] + "**" + expr[col + 1:]
+        return expr
+
+    def compile_expr(self, expr):
+        """Liefert das kompilierte Code-Objekt für expr (aus dem LRU-Cache, falls vorhanden)."""
+        key = expr.strip()
+        code = self.expr_cache.get(key)
+        if code is not None:
+            self.expr_cache.move_to_end(key)
+            self.cache_hits += 1
+            return code
+        self.cache_misses += 1
+        normalized = self._normalize_expr(key)
+        # Geprüft durch die Sandbox; der normalisierte Text dient als
+        # "Dateiname" für Fehlermeldungen
+        code = compile_expression(normalized, normalized)
+        self.expr_cache[key] = code
+        if len(self.expr_cache) > self.expr_cache_size:
+            self.expr_cache.popitem(last=False)
+        return code
+
+    def _allocate(self, n):
+        # Große Zwischenergebnisse eines Ausdrucks zusammenzählen: einzelne
+        # Operationen sind begrenzt, so auch ihre Summe
+        self._allocated += n
+        if self._allocated > MAX_ALLOCATION:
+            raise LimitExceeded(f"expression creates too much data (> {MAX_ALLOCATION} elements)")
+
+    def _counted(self, fn):
+        @wraps(fn)
+        def counted(*args):
+            result = fn(*args)
+            if is_array(result):
+                self._allocate(result.size)
+            return result
+        return counted
+
+    def _range(self, start, stop=None, step=1):
+        values = arange(start, stop, step, charge=self.meter.charge)
+        self._allocate(len(values))
+        return values
+
+    def _linspace(self, start, stop, num=50):
+        values = linspace(start, stop, num, charge=self.meter.charge)
+        self._allocate(len(values))
+        return values
+
+    def _limited_iter(self, values):
+        # Iteration in Comprehensions: jedes Element verbraucht einen Schritt.
+        # Elemente eindimensionaler Arrays als Python-Zahlen (kein np.int64 in Listen)
+        charge = self.meter.charge
+        if is_array(values) and values.ndim == 1:
+            values = values.tolist()
+        for value in values:
+            charge()
+            yield value
+
+    def cancel(self):
+        """Bricht die laufende Ausführung ab (thread-sicher)."""
+        self.meter.cancel()
+
+    def enable_trace(self, size=TRACE_SIZE):
+        """Schaltet den Ausführungs-Trace ein: (Schritt, Zeile, Anweisung, Detail)
+        landen in einem Ringpuffer mit höchstens size Einträgen."""
+        self.trace = deque(self.trace or (), maxlen=size)
+
+    def disable_trace(self):
+        self.trace = None
+
+    def format_trace(self):
+        if not self.trace:
+            return "Trace is empty (enable it with TRACE ON)"
+        rows = []
+        for step, lineno, kind, detail in self.trace:
+            row = f"#{step} line {lineno}: {kind}"
+            rows.append(f"{row} ({detail})" if detail else row)
+        return "\n".join(rows)
+
+    def enable_profiler(self):
+        """Schaltet den Zeilenprofiler ein (mit leeren Zählern) und gibt ihn zurück."""
+        self.profiler = LineProfiler()
+        return self.profiler
+
+    def disable_profiler(self):
+        self.profiler = None
+
+    def cache_stats(self):
+        """Trefferstatistik des Ausdrucks-Caches."""
+        total = self.cache_hits + self.cache_misses
+        return {
+            "hits": self.cache_hits,
+            "misses": self.cache_misses,
+            "size": len(self.expr_cache),
+            "max_size": self.expr_cache_size,
+            "hit_rate": self.cache_hits / total if total else 0.0,
+        }
 
     def provide_input(self, value):
         # Setzt den Wert für die zuletzt angeforderte Eingabevariable
@@ -414,110 +627,239 @@ class RetroInterpreter:
             val = float(value) if '.' in str(value) or 'e' in str(value).lower() else int(value)
         except Exception:
             val = value
-        self.env[varname] = val
+        self.set_var(varname, val)
         self.pending_input_var = None
         self.last_input_result = val
         return f"{varname} = {val}"
 
-    def run_block(self, lines):
-        outputs = []
-        graphics = []
-        n = len(lines)
-        i = 0
-        # Temporär: Grafikbefehle immer sammeln
-        collect_graphics = True
-        while i < n:
-            line = lines[i].strip()
-            if not line or line.startswith('#'):
-                i += 1
-                continue
-            # WHILE-Block erkennen
-            if line.upper().startswith('WHILE '):
-                cond_line = line
-                block = []
-                i += 1
-                depth = 1
-                while i < n and depth > 0:
-                    l = lines[i].strip()
-                    if l.upper().startswith('WHILE '):
-                        depth += 1
-                    elif l.upper() == 'ENDWHILE':
-                        depth -= 1
-                        if depth == 0:
-                            break
-                    block.append(lines[i])
-                    i += 1
-                # Schleife ausführen, max. 1000 Durchläufe
-                loop_count = 0
-                while True:
-                    if loop_count > 1000:
-                        outputs.append('Error: Max WHILE iterations reached')
-                        break
-                    cond = self.eval_expr(cond_line[6:-2].strip())  # WHILE ... DO
-                    if isinstance(cond, str) and cond.startswith('Error'):
-                        outputs.append(cond)
-                        break
-                    if not cond:
-                        break
-                    # Block ausführen
-                    for bline in block:
-                        # Grafikbefehle erkennen und sammeln
-                        bline_stripped = bline.strip().upper()
-                        if collect_graphics and (bline_stripped.startswith('POINT ') or bline_stripped.startswith('LINE ') or bline_stripped.startswith('CIRCLE ')):
-                            gobj = self._parse_graphics_command(bline)
-                            if gobj:
-                                graphics.append(gobj)
-                        out = self.run_line(bline)
-                        if out and not (isinstance(out, dict) and 'graphics' in out):
-                            outputs.append(out)
-                        if isinstance(out, str) and out.startswith('Error'):
-                            outputs.append('Aborting WHILE due to error.')
-                            break
-                    loop_count += 1
-                i += 1  # nach ENDWHILE
-                continue
-            # Grafikbefehle erkennen und sammeln
-            line_upper = line.upper()
-            if collect_graphics and (line_upper.startswith('POINT ') or line_upper.startswith('LINE ') or line_upper.startswith('CIRCLE ')):
-                gobj = self._parse_graphics_command(line)
-                if gobj:
-                    graphics.append(gobj)
-                out = self.run_line(line)
-                # Fehler- oder leere Ausgaben von Grafikbefehlen NICHT anzeigen
-                if out and not (isinstance(out, dict) and 'graphics' in out):
-                    if not (isinstance(out, str) and (out.strip() == '' or out.startswith('Syntax Error in') or out.startswith('Error in'))):
-                        outputs.append(out)
-                i += 1
-                continue
-            # Normale Zeile
-            out = self.run_line(line)
-            if out:
-                outputs.append(out)
-            i += 1
+    def run_block(self, lines, budget=None, heartbeat=None, stream=None, meter=None):
+        """Parst die Zeilen einer Zelle einmal und führt den Anweisungsbaum aus."""
+        return self.execute(ast.parse_program(lines), budget, heartbeat, stream, meter)
+
+    def execute(self, program, budget=None, heartbeat=None, stream=None, meter=None):
+        """Führt eine Liste von Anweisungsknoten (siehe app.parser) aus.
+
+        budget überschreibt für diesen Lauf das Budget des Interpreters; der
+        Verbrauch steht danach in last_usage, heartbeat(usage) meldet ihn
+        zwischendurch. Gibt wie bisher eine Liste von Ausgaben zurück; alle
+        Grafikbefehle landen gesammelt in einem abschließenden
+        {'graphics': [...]}. Mit stream(out) wird jede Ausgabe sofort
+        weitergereicht statt gesammelt; die Liste enthält dann nur die Grafik.
+        meter ist ein vorab mit budget.start() angelegter Zähler, damit ein
+        Abbruch schon vor dem Start des Laufs greift (siehe app.worker)."""
+        self._outputs = []
+        self.current_frame = []
+        self._stream = stream
+        self._call_depth = 0
+        if meter is None:
+            meter = (budget or self.budget).start(heartbeat)
+        else:
+            meter.begin(heartbeat)
+        self.meter = meter
+        try:
+            self._exec_body(program, False)
+        except _Suspend:
+            pass
+        except BudgetExceeded as e:
+            self._emit(ErrorMessage(str(e)))
+        self.last_usage = self.meter.usage()
+        outputs, graphics = self._outputs, self.current_frame
+        self._outputs, self.current_frame, self._stream = [], [], None
         if graphics:
             outputs.append({'graphics': graphics})
         return outputs
 
-    def _parse_graphics_command(self, line):
-        """Hilfsfunktion: Parsen und Auswerten eines Grafikbefehls (POINT, LINE, CIRCLE). Gibt dict zurück oder None bei Fehler."""
+    def _emit(self, out):
+        if out:
+            if self._stream is not None:
+                self._stream(out)
+            else:
+                self._outputs.append(out)
+        return is_error(out)
+
+    def _exec_body(self, nodes, in_loop):
+        """Führt Knoten nacheinander aus. In Schleifen wird beim ersten Fehler
+        abgebrochen; Rückgabe True, falls ein Fehler aufgetreten ist."""
+        error = False
+        charge = self.meter.charge
+        profiler = self.profiler
+        for node in nodes:
+            charge()
+            if self.trace is not None:
+                self.trace.append((self.meter.steps, node.lineno, type(node).__name__.upper(), None))
+            if profiler is None:
+                failed = self._executors[type(node)](node, in_loop)
+            else:
+                failed = self._exec_profiled(node, in_loop, profiler)
+            if failed:
+                error = True
+                if in_loop:
+                    return True
+        return error
+
+    def _exec_profiled(self, node, in_loop, profiler):
+        # Zeit inkl. verschachtelter Blöcke; auch bei INPUT/Abbruch verbuchen
+        start = profiler.clock()
         try:
-            cmd = line.strip().upper().split()[0]
-            args = line.strip()[len(cmd):].strip().split(',')
-            if cmd == "POINT" and len(args) == 2:
-                x = float(self.eval_expr(args[0]))
-                y = float(self.eval_expr(args[1]))
-                return {"type": "point", "x": x, "y": y}
-            elif cmd == "LINE" and len(args) == 4:
-                x1 = float(self.eval_expr(args[0]))
-                y1 = float(self.eval_expr(args[1]))
-                x2 = float(self.eval_expr(args[2]))
-                y2 = float(self.eval_expr(args[3]))
-                return {"type": "line", "x1": x1, "y1": y1, "x2": x2, "y2": y2}
-            elif cmd == "CIRCLE" and len(args) == 3:
-                x = float(self.eval_expr(args[0]))
-                y = float(self.eval_expr(args[1]))
-                r = float(self.eval_expr(args[2]))
-                return {"type": "circle", "x": x, "y": y, "r": r}
-        except Exception:
-            return None
-        return None
\ No newline at end of file
+            return self._executors[type(node)](node, in_loop)
+        finally:
+            profiler.record_line(node.lineno, profiler.clock() - start)
+
+    def _exec_let(self, node, in_loop):
+        value = self.eval_expr(node.expr)
+        if is_error(value):
+            return self._emit(value)
+        return self._emit(self._assign(node.name, node.index, value))
+
+    def _exec_print(self, node, in_loop):
+        value = self.eval_expr(node.expr)
+        return self._emit(value if is_error(value) else f"{value}")
+
+    def _exec_expr(self, node, in_loop):
+        return self._emit(self.eval_expr(node.expr))
+
+    def _exec_def(self, node, in_loop):
+        return self._emit(self._define_function(node.name, node.args, node.body, node.memo))
+
+    def _exec_input(self, node, in_loop):
+        self.pending_input_var = node.name
+        self._emit({"input_request": node.name})
+        raise _Suspend()
+
+    def _exec_help(self, node, in_loop):
+        return self._emit(self._handle_help())
+
+    def _exec_budget(self, node, in_loop):
+        limits = []
+        for arg in node.args:
+            value = self.eval_expr(arg)
+            if is_error(value):
+                return self._emit(value)
+            limits.append(value)
+        try:
+            max_steps, max_seconds = check_limits(
+                limits[0], limits[1] if len(limits) > 1 else self.meter.max_seconds)
+        except ValueError as e:
+            return self._emit(ErrorMessage(f"Error in BUDGET: {e}"))
+        self.meter.set_limits(max_steps, max_seconds)
+        return self._emit(f"Budget: {max_steps or 'unlimited'} steps, {max_seconds or 'unlimited'} s")
+
+    def _exec_trace(self, node, in_loop):
+        if node.mode == "ON":
+            self.enable_trace(node.size or TRACE_SIZE)
+            return self._emit(f"Trace on (last {self.trace.maxlen} steps)")
+        if node.mode == "OFF":
+            self.disable_trace()
+            return self._emit("Trace off")
+        return self._emit(self.format_trace())
+
+    def _exec_syntax_error(self, node, in_loop):
+        return self._emit(ErrorMessage(node.message))
+
+    def _condition(self, expr):
+        """Wertet eine Bedingung aus; Rückgabe (Wahrheitswert, Fehlertext)."""
+        cond = self.eval_expr(expr)
+        if is_error(cond):
+            return False, cond
+        try:
+            return bool(cond), None
+        except Exception as e:  # z.B. ein ganzes Array als Bedingung
+            return False, ErrorMessage(f"Error in condition '{expr}': {type(e).__name__}: {e}")
+
+    def _exec_if(self, node, in_loop):
+        cond, error = self._condition(node.cond)
+        if error:
+            return self._emit(error)
+        return self._exec_body(node.then_body if cond else node.else_body, in_loop)
+
+    def _exec_while(self, node, in_loop):
+        iteration = 0
+        while True:
+            self.meter.charge()
+            if self.trace is not None:
+                self.trace.append((self.meter.steps, node.lineno, "WHILE", f"iteration {iteration}"))
+            iteration += 1
+            cond, error = self._condition(node.cond)
+            if error:
+                return self._emit(error)
+            if not cond:
+                return False
+            if self.profiler is not None:
+                self.profiler.record_iteration(node.lineno, "WHILE")
+            if self._exec_body(node.body, True):
+                self._emit('Aborting WHILE due to error.')
+                return True
+
+    def _exec_for(self, node, in_loop):
+        start = self.eval_expr(node.start)
+        end = self.eval_expr(node.end)
+        step = self.eval_expr(node.step) if node.step else 1
+        for value in (start, end, step):
+            if is_error(value):
+                return self._emit(value)
+        for value in (start, end, step):
+            # Auch bool, Listen oder Arrays würden erst mitten in der Schleife scheitern
+            if isinstance(value, bool) or not isinstance(value, numbers.Real):
+                return self._emit(ErrorMessage(
+                    f"Error in FOR {node.var}: start, end and STEP must be numbers, got {type(value).__name__}"))
+        if step == 0:
+            return self._emit(ErrorMessage(f"Error in FOR {node.var}: STEP must not be zero"))
+        cmp = (lambda a, b: a <= b) if step > 0 else (lambda a, b: a >= b)
+        i = start
+        while cmp(i, end):
+            self.meter.charge()
+            if self.trace is not None:
+                self.trace.append((self.meter.steps, node.lineno, "FOR", f"{node.var} = {i}"))
+            if self.profiler is not None:
+                self.profiler.record_iteration(node.lineno, "FOR")
+            self.set_var(node.var, i)
+            if self._exec_body(node.body, True):
+                self._emit('Aborting FOR due to error.')
+                return True
+            i += step
+        return False
+
+    def _exec_graphics(self, node, in_loop):
+        if node.cmd in ("PLOT", "POINTS"):
+            return self._exec_bulk_graphics(node)
+        try:
+            values = []
+            for arg in node.args:
+                value = self.eval_expr(arg)
+                if is_error(value):
+                    return self._emit(value)
+                values.append(float(value))
+        except Exception as e:
+            return self._emit(ErrorMessage(f"Error in {node.cmd}: {e}"))
+        if node.cmd == "POINT":
+            x, y = values
+            self.current_frame.append({"type": "point", "x": x, "y": y})
+        elif node.cmd == "LINE":
+            x1, y1, x2, y2 = values
+            self.current_frame.append({"type": "line", "x1": x1, "y1": y1, "x2": x2, "y2": y2})
+        elif node.cmd == "CIRCLE":
+            x, y, r = values
+            self.current_frame.append({"type": "circle", "x": x, "y": y, "r": r})
+        return False
+
+    def _exec_bulk_graphics(self, node):
+        # PLOT xs, ys / POINTS xs, ys (oder nur ys, dann x = 0, 1, 2, ...)
+        try:
+            values = []
+            for arg in node.args:
+                value = self.eval_expr(arg)
+                if is_error(value):
+                    return self._emit(value)
+                values.append(coordinates(value))
+            if len(values) == 1:
+                ys = values[0]
+                xs = coordinates(range(len(ys)))
+            else:
+                xs, ys = values
+            if len(xs) != len(ys):
+                raise ValueError(f"x and y have different lengths ({len(xs)} != {len(ys)})")
+        except Exception as e:
+            return self._emit(ErrorMessage(f"Error in {node.cmd}: {e}"))
+        kind = "polyline" if node.cmd == "PLOT" else "points"
+        self.current_frame.append({"type": kind, "xs": xs, "ys": ys})
+        return False
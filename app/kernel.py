@@ -0,0 +1,184 @@
+import weakref
+from collections import deque
+
+from app import cache as output_cache
+from app.interpreter import RetroInterpreter, StateSnapshot, flatten_results, is_error
+
+# Notebook-Kernel: ein gemeinsamer Interpreter für alle Zellen eines Notebooks.
+# Variablen und DEF-Funktionen einer Zelle sind in den folgenden sichtbar.
+
+# Höchstens so viele Ausgabezeilen behält ein Lauf in der GUI (die neuesten)
+MAX_OUTPUT_LINES = 500
+
+
+class NotebookKernel:
+    """Gemeinsamer Interpreter mit Snapshots pro Zelle.
+
+    Vor jedem Lauf einer Zelle wird der Zustand festgehalten (begin); mit
+    rewind(key) lässt sich die Zelle später vom Stand vor ihrem letzten Lauf
+    neu ausführen, ohne die vorherigen Zellen erneut zu rechnen. Es läuft
+    immer nur eine Zelle gleichzeitig; weitere warten in pending.
+
+    Schlüssel sind die CellModel der Zellen. Sie werden nur schwach gehalten:
+    Wird eine Zelle gelöscht oder ihr Modell ersetzt, verschwindet auch ihr
+    Snapshot, und beim nächsten begin gelten dessen Listen nicht mehr als geteilt."""
+
+    def __init__(self, budget=None, cache=None):
+        self.budget = budget
+        self.cache = cache  # OutputCache oder None
+        self.fingerprints = {}  # Hashes gelesener Variablen für cache_key
+        self.interpreter = RetroInterpreter(budget)
+        self.snapshots = weakref.WeakKeyDictionary()  # Zelle -> Zustand vor dem letzten Lauf
+        self.run_numbers = weakref.WeakKeyDictionary()  # Zelle -> Nummer des letzten Laufs
+        self.running = None  # Schlüssel der gerade laufenden Zelle
+        self.pending = deque()  # Wartende Läufe (Callables ohne Argumente)
+        self.execution_count = 0
+
+    def is_busy(self):
+        return self.running is not None
+
+    def begin(self, key):
+        """Meldet den Start einer Zelle an; gibt die laufende Nummer zurück."""
+        self.snapshots[key] = self.interpreter.snapshot()
+        # Container ersetzter oder verworfener Snapshots wieder direkt beschreibbar
+        self.interpreter.retain_snapshots(list(self.snapshots.values()))
+        self.running = key
+        self.execution_count += 1
+        self.run_numbers[key] = self.execution_count
+        return self.execution_count
+
+    def finish(self):
+        """Meldet das Ende des Laufs; gibt den nächsten wartenden Lauf zurück (oder None)."""
+        self.running = None
+        return self.pending.popleft() if self.pending else None
+
+    def enqueue(self, run):
+        if run not in self.pending:
+            self.pending.append(run)
+
+    def dequeue(self, run):
+        if run in self.pending:
+            self.pending.remove(run)
+
+    def cache_lookup(self, source):
+        """(Cache-Schlüssel, Eintrag) für source im aktuellen Zustand.
+
+        Schlüssel None: nicht cachebar (kein Cache, Profiler aktiv, INPUT, ...);
+        Eintrag None: noch nicht im Cache."""
+        if self.cache is None or self.interpreter.profiler is not None:
+            return None, None
+        key = output_cache.cache_key(self.interpreter, source, self.fingerprints)
+        if key is None:
+            return None, None
+        return key, self.cache.get(key)
+
+    def cache_apply(self, entry):
+        """Übernimmt Variablen/DEFs eines Cache-Treffers; gibt die Ergebnisliste zurück."""
+        output_cache.apply(self.interpreter, entry)
+        results = list(entry["outputs"])
+        if entry["graphics"]:
+            results.append({'graphics': entry["graphics"]})
+        return results
+
+    def cache_store(self, key, source, outputs, graphics):
+        if self.cache is not None and key is not None and len(outputs) <= output_cache.MAX_CACHED_OUTPUTS:
+            self.cache.put(key, output_cache.capture(self.interpreter, source, outputs, graphics))
+
+    def rewind(self, key):
+        """Stellt den Zustand von vor dem letzten Lauf der Zelle key wieder her.
+
+        Damit fehlen auch die Variablen aller Zellen, die seitdem gelaufen sind;
+        sie gelten wieder als nicht gelaufen (invalidate), damit Run All sie
+        erneut ausführt."""
+        snap = self.snapshots.get(key)
+        if snap is None or self.is_busy():
+            return False
+        self.interpreter.restore(snap)
+        number = self.run_numbers[key]
+        for other, other_number in list(self.run_numbers.items()):
+            if other_number > number:
+                other.invalidate()
+                del self.run_numbers[other]
+        return True
+
+    def forget(self, key):
+        """Verwirft den Snapshot einer Zelle (z.B. wenn sie gelöscht wird)."""
+        self.run_numbers.pop(key, None)
+        if self.snapshots.pop(key, None) is not None:
+            self.interpreter.retain_snapshots(self.snapshots.values())
+
+    def reset(self):
+        """Leerer Zustand (z.B. beim Laden eines anderen Notebooks). Der
+        Interpreter bleibt dasselbe Objekt, damit Zellen ihn weiter halten können."""
+        self.interpreter.restore(StateSnapshot({}, {}, {}))
+        self.interpreter.disable_trace()
+        self.snapshots.clear()
+        self.run_numbers.clear()
+        self.fingerprints.clear()
+        self.interpreter.retain_snapshots(())
+        self.pending.clear()
+        self.running = None
+        self.execution_count = 0
+
+
+class CellRun:
+    """Ein Lauf einer Zelle in der GUI, ob mit Widget (NotebookCell) oder ohne
+    (NotebookRunner).
+
+    Meldet den Lauf beim Kernel an, übernimmt einen Cache-Treffer, sammelt die
+    gestreamten Ausgaben (nur die letzten MAX_OUTPUT_LINES Zeilen) samt Grafik
+    und schreibt am Ende Ergebnis und Cache-Eintrag."""
+
+    def __init__(self, kernel, model, source):
+        self.kernel = kernel
+        self.model = model
+        self.lines = deque(maxlen=MAX_OUTPUT_LINES)
+        self.total = 0  # Alle Zeilen, auch die nicht mehr behaltenen
+        self.graphics = []
+        self.error_found = False
+        self._cache_key, entry = kernel.cache_lookup(source)
+        self._cache_outputs = []
+        model.start_run(source, kernel.begin(model))
+        # Unveränderte Zelle mit denselben Eingaben: Variablen/DEFs sind
+        # übernommen, cached_results ersetzt den Lauf
+        self.from_cache = entry is not None
+        self.cached_results = kernel.cache_apply(entry) if entry is not None else None
+
+    def add(self, chunk):
+        """Nimmt neue Ergebnisse auf (Ausgaben, Fehler, {'graphics': [...]})."""
+        for result in flatten_results(chunk):
+            if isinstance(result, dict) and 'graphics' in result:
+                self.graphics.extend(result['graphics'])
+                continue
+            if is_error(result):
+                self.error_found = True
+            if not result:
+                continue
+            if self._cache_key is not None:
+                if len(self._cache_outputs) < output_cache.MAX_CACHED_OUTPUTS:
+                    self._cache_outputs.append(result)
+                else:  # Zu viele Ausgaben: diesen Lauf nicht cachen
+                    self._cache_key = None
+                    self._cache_outputs = []
+            lines = str(result).split("\n")
+            self.lines.extend(lines)
+            self.total += len(lines)
+
+    def output_lines(self):
+        """Die behaltenen Zeilen, davor ggf. ein Hinweis auf die ausgeblendeten."""
+        lines = list(self.lines)
+        hidden = self.total - len(lines)
+        if hidden > 0:
+            lines.insert(0, f"... ({hidden} ältere Zeilen ausgeblendet)")
+        return lines
+
+    def finish(self, results):
+        """Schließt den Lauf mit den letzten Ergebnissen ab: Modell, bei Erfolg
+        Cache. Gibt den nächsten wartenden Lauf des Kernels zurück (oder None)."""
+        next_run = self.kernel.finish()
+        self.add(results)
+        self.model.set_result(self.output_lines(), self.graphics)
+        if not self.from_cache and not self.error_found and self._cache_key is not None:
+            self.kernel.cache_store(self._cache_key, self.model.run_source, self._cache_outputs, self.graphics)
+        self._cache_outputs = []
+        return next_run
@@ -1,11 +1,19 @@
 from PySide6.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QScrollArea,
-    QPushButton, QFrame, QLabel, QMessageBox, QHBoxLayout, QDialog
+    QApplication, QWidget, QVBoxLayout,
+    QPushButton, QLabel, QMessageBox, QHBoxLayout, QDialog, QInputDialog
 )
 from PySide6.QtCore import Qt, QTimer
-from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput
+from app.audio import audio
 from app.widgets.cell import NotebookCell
-from app.storage import save_notebook, load_notebook
+from app.widgets.animation import AnimationClock
+from app.widgets.notebook_view import NotebookView
+from app.widgets.runner import NotebookRunner
+from app.model import CellModel, NotebookModel
+from app.storage import save_notebook, load_notebook, get_notebook_path
+from app.cache import OutputCache
+from app.interpreter import ExecutionBudget, DEFAULT_MAX_STEPS, DEFAULT_MAX_SECONDS, check_limits
+from app.kernel import NotebookKernel
+from app.deps import DependencyGraph
 from PySide6.QtGui import QCursor, QKeyEvent
 import sys
 import os
@@ -31,14 +39,8 @@ def show_loading_screen(app, window, on_finish):
     loading.resize(500, 300)
     loading.show()
 
-    # Soundeffekt für Startscreen mit QMediaPlayer
-    loading.player = QMediaPlayer()
-    loading.audio_output = QAudioOutput()
-    loading.player.setAudioOutput(loading.audio_output)
-    start_path = resource_path("assets/start.mp3")
-    loading.player.setSource(f"file://{os.path.abspath(start_path)}")
-    loading.audio_output.setVolume(0.25)
-    loading.player.play()
+    # Soundeffekt für Startscreen (gemeinsamer Sound-Dienst)
+    audio().play("start")
 
     # Blinker für Cursor
     def blink():
@@ -260,6 +262,9 @@ def start_app():
     with open(resource_path("assets/style.qss"), "r") as f:
         app.setStyleSheet(f.read())
 
+    # Sound-Dienst früh anlegen, damit die Effekte beim ersten Run schon geladen sind
+    audio()
+
     window = QWidget()
     window.setWindowTitle("Retro Notebook")
 
@@ -267,30 +272,66 @@ def start_app():
         # Layout für das Hauptfenster
         layout = QVBoxLayout()
 
-        # Scroll-Bereich für die Zellen
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(True)
-
-        # Container-Widget im Scrollbereich
-        scroll_content = QFrame()
-        scroll_layout = QVBoxLayout()
-        scroll_content.setLayout(scroll_layout)
+        # Ausführungsbudget für alle Zellen dieses Notebooks
+        # (einzelne Zellen können es mit BUDGET überschreiben)
+        notebook_budget = ExecutionBudget()
+        # Gemeinsamer Kernel: Variablen und DEF-Funktionen gelten zellübergreifend
+        kernel = NotebookKernel(notebook_budget)
+        # Ein Animations-Takt für alle Zellen; pausiert, wenn das Fenster versteckt ist
+        clock = AnimationClock(window)
+        clock.watch_window(window)
 
-        # Setzen des Scroll-Inhalts
-        scroll_area.setWidget(scroll_content)
-        layout.addWidget(scroll_area)
+        # Zellen mit Drag-Griff zum Umsortieren
+        class DraggableCell(NotebookCell):
+            def __init__(self, cell_type="Code", kernel=None, clock=None):
+                super().__init__(cell_type, kernel, clock)
+                self.drag_handle.setObjectName("drag_handle")
+                self.drag_handle.setCursor(QCursor(Qt.CursorShape.OpenHandCursor))
+                self.drag_handle.mousePressEvent = self.handle_mouse_press
+                self.drag_handle.mouseMoveEvent = self.handle_mouse_move
+                self.drag_handle.mouseReleaseEvent = self.handle_mouse_release
+                self._drag_active = False
+                self.drag_start_pos = None
+            def handle_mouse_press(self, event):
+                if event.button() == Qt.MouseButton.LeftButton:
+                    self.drag_start_pos = event.pos()
+                    self.drag_handle.setCursor(QCursor(Qt.CursorShape.ClosedHandCursor))
+            def handle_mouse_move(self, event):
+                if event.buttons() & Qt.MouseButton.LeftButton and self.drag_start_pos:
+                    if (event.pos() - self.drag_start_pos).manhattanLength() > 10:
+                        from PySide6.QtGui import QDrag, QPixmap
+                        from PySide6.QtCore import QMimeData
+                        drag = QDrag(self)
+                        mime = QMimeData()
+                        mime.setText('cell')
+                        drag.setMimeData(mime)
+                        pixmap = QPixmap(self.size())
+                        self.setProperty('dragged', True)
+                        self.style().unpolish(self)
+                        self.style().polish(self)
+                        self.render(pixmap)
+                        drag.setPixmap(pixmap)
+                        drag.exec()
+                        self.setProperty('dragged', False)
+                        self.style().unpolish(self)
+                        self.style().polish(self)
+            def handle_mouse_release(self, event):
+                self.drag_handle.setCursor(QCursor(Qt.CursorShape.OpenHandCursor))
+            def mousePressEvent(self, event):
+                super().mousePressEvent(event)
+            def mouseMoveEvent(self, event):
+                super().mouseMoveEvent(event)
 
-        # Liste von Zellen
-        cells = []
+        # Scroll-Bereich für die Zellen: Widgets gibt es nur für Zellen in der
+        # Nähe des Sichtbereichs, alle anderen existieren nur als CellModel
+        notebook = NotebookModel()
+        view = NotebookView(lambda: DraggableCell("Code", kernel, clock))
+        view.set_models(notebook.cells)
+        layout.addWidget(view)
 
         # Funktion zum Hinzufügen einer neuen Zelle
-        def add_cell(cell_type="Code", input_text="", output_text=""):
-            cell = NotebookCell(cell_type)
-            cell.input.setPlainText(input_text)
-            if cell_type == "Code" and output_text:
-                cell.output.setText(output_text)
-            scroll_layout.addWidget(cell)
-            cells.append(cell)
+        def add_cell(cell_type="Code", input_text=""):
+            view.append(CellModel(cell_type, input_text))
 
         # Erste Zelle automatisch hinzufügen
         add_cell()
@@ -301,6 +342,10 @@ def start_app():
 
         layout.addWidget(new_cell_button)
 
+        # Run All: nur Zellen, deren Code oder Eingaben sich geändert haben
+        run_all_button = QPushButton("Alle ausführen")
+        layout.addWidget(run_all_button)
+
         # Buttons zum Speichern und Laden des Notebooks
         save_button = QPushButton("Speichern")
         load_button = QPushButton("Laden")
@@ -308,6 +353,32 @@ def start_app():
         layout.addWidget(save_button)
         layout.addWidget(load_button)
 
+        # Energiesparmodus: Animationen seltener zeichnen
+        low_power_button = QPushButton("Energiesparmodus")
+        low_power_button.setCheckable(True)
+        low_power_button.toggled.connect(clock.set_low_power)
+        layout.addWidget(low_power_button)
+
+        # Budget des Notebooks (wird mit dem Notebook gespeichert)
+        budget_button = QPushButton("Budget")
+        def edit_budget():
+            steps, ok = QInputDialog.getInt(
+                window, "Budget", "Schritte pro Zelle (0 = unbegrenzt):",
+                notebook_budget.max_steps or 0, 0, 2_000_000_000)
+            if not ok:
+                return
+            seconds, ok = QInputDialog.getDouble(
+                window, "Budget", "Sekunden pro Zelle (0 = unbegrenzt):",
+                notebook_budget.max_seconds or 0, 0, 86400, 1)
+            if not ok:
+                return
+            notebook_budget.set_limits(*check_limits(steps, seconds))
+            notebook.set_budget_limits(notebook_budget.max_steps, notebook_budget.max_seconds)
+            set_status('#33ff66', f"Budget: {notebook_budget.max_steps or 'unbegrenzt'} Schritte, "
+                                  f"{notebook_budget.max_seconds or 'unbegrenzt'} s")
+        budget_button.clicked.connect(edit_budget)
+        layout.addWidget(budget_button)
+
         # About-Button
         about_button = QPushButton("About")
         def show_about():
@@ -362,30 +433,64 @@ This project is licensed under the MIT License.
         # Status-Setter global verfügbar machen
         window.set_status = set_status
 
+        # Abhängigkeiten zwischen Zellen (gelesene/geschriebene Variablen)
+        def dependency_graph():
+            return DependencyGraph(notebook.code_sources())
+
+        # Run All/Folgezellen laufen auf den Modellen; Widgets nur für sichtbare Zellen
+        runner = NotebookRunner(kernel, view, set_status, window)
+
+        def run_all():
+            stale = dependency_graph().stale(notebook.last_runs())
+            if not stale:
+                set_status('#33ff66', 'Alle Zellen aktuell')
+                return
+            # Der Kernel führt die Zellen nacheinander in dieser Reihenfolge aus
+            runner.run([notebook.cells[idx] for idx in stale])
+
+        def run_downstream(cell):
+            idx = view.index(cell.model)
+            runner.run([notebook.cells[j] for j in [idx] + dependency_graph().downstream(idx)])
+
+        run_all_button.clicked.connect(run_all)
+        window.run_downstream = run_downstream
+
         # Beispiel: Status bei Start
         set_status('#33ff66', 'Bereit')
 
         # Save/Load-Handler
         NOTEBOOK_FILE = "notebooks/auto_save.json"
+        # Ergebnisse unveränderter Zellen liegen neben dem Notebook (auto_save.cache/)
+        kernel.cache = OutputCache.for_notebook(get_notebook_path(NOTEBOOK_FILE))
+
+        # Stand der Datei beim letzten Laden/Speichern (für die Änderungsanzeige)
+        saved_data = [[]]
 
-        # Funktion zum Speichern des Notebooks
+        # Funktion zum Speichern des Notebooks (direkt aus dem Modell, ohne Widgets)
         def on_save():
-            save_notebook(cells, NOTEBOOK_FILE)
+            changed = notebook.diff(saved_data[0])
+            saved_data[0] = save_notebook(notebook, NOTEBOOK_FILE)
+            set_status('#33ff66', f'Gespeichert ({len(changed)} Zellen geändert)')
 
         # Funktion zum Laden des Notebooks
         def on_load():
             try:
                 data = load_notebook(NOTEBOOK_FILE)
-                # Vorherige Zellen entfernen
-                for i in reversed(range(scroll_layout.count())):
-                    scroll_layout.itemAt(i).widget().setParent(None)
-                cells.clear()
-                # Neue Zellen anlegen
-                for cell_data in data:
-                    cell_type = cell_data.get("type", "Code").capitalize()
-                    input_text = cell_data.get("input", "")
-                    output_text = cell_data.get("output", "")
-                    add_cell(cell_type, input_text, output_text)
+                # Laufende Zellen abbrechen, bevor ihre Widgets neu belegt werden
+                runner.cancel(wait=True)
+                for cell in view.live_cells():
+                    cell.cancel_execution(wait=True)
+                kernel.reset()
+                # Neue Zellen nur als Modelle anlegen; Widgets baut die Ansicht beim Anzeigen
+                notebook.replace(NotebookModel.from_data(data))
+                limits = notebook.budget_limits() or (DEFAULT_MAX_STEPS, DEFAULT_MAX_SECONDS)
+                try:
+                    notebook_budget.set_limits(*check_limits(*limits))
+                except ValueError as e:
+                    notebook_budget.set_limits(DEFAULT_MAX_STEPS, DEFAULT_MAX_SECONDS)
+                    print(f"Ungültiges Budget im Notebook ignoriert: {e}")
+                saved_data[0] = data
+                view.set_models(notebook.cells)
             except FileNotFoundError:
                 print("Keine gespeicherte Datei gefunden.")
 
@@ -393,96 +498,6 @@ This project is licensed under the MIT License.
         save_button.clicked.connect(on_save)
         load_button.clicked.connect(on_load)
 
-        # Drag & Drop für Zellen aktivieren
-        scroll_content.setAcceptDrops(True)
-        class DraggableCell(NotebookCell):
-            def __init__(self, cell_type="Code"):
-                super().__init__(cell_type)
-                self.drag_handle.setObjectName("drag_handle")
-                self.drag_handle.setCursor(QCursor(Qt.CursorShape.OpenHandCursor))
-                self.drag_handle.mousePressEvent = self.handle_mouse_press
-                self.drag_handle.mouseMoveEvent = self.handle_mouse_move
-                self.drag_handle.mouseReleaseEvent = self.handle_mouse_release
-                self._drag_active = False
-                self.drag_start_pos = None
-            def handle_mouse_press(self, event):
-                if event.button() == Qt.MouseButton.LeftButton:
-                    self.drag_start_pos = event.pos()
-                    self.drag_handle.setCursor(QCursor(Qt.CursorShape.ClosedHandCursor))
-            def handle_mouse_move(self, event):
-                if event.buttons() & Qt.MouseButton.LeftButton and self.drag_start_pos:
-                    if (event.pos() - self.drag_start_pos).manhattanLength() > 10:
-                        from PySide6.QtGui import QDrag, QPixmap
-                        from PySide6.QtCore import QMimeData
-                        drag = QDrag(self)
-                        mime = QMimeData()
-                        mime.setText('cell')
-                        drag.setMimeData(mime)
-                        pixmap = QPixmap(self.size())
-                        self.setProperty('dragged', True)
-                        self.style().unpolish(self)
-                        self.style().polish(self)
-                        self.render(pixmap)
-                        drag.setPixmap(pixmap)
-                        drag.exec()
-                        self.setProperty('dragged', False)
-                        self.style().unpolish(self)
-                        self.style().polish(self)
-            def handle_mouse_release(self, event):
-                self.drag_handle.setCursor(QCursor(Qt.CursorShape.OpenHandCursor))
-            def mousePressEvent(self, event):
-                super().mousePressEvent(event)
-            def mouseMoveEvent(self, event):
-                super().mouseMoveEvent(event)
-        def add_cell(cell_type="Code", input_text="", output_text=""):
-            cell = DraggableCell(cell_type)
-            cell.input.setPlainText(input_text)
-            if cell_type == "Code" and output_text:
-                cell.output.setText(output_text)
-            scroll_layout.addWidget(cell)
-            cells.append(cell)
-        # Drag & Drop Handler für das Scroll-Content
-        def move_cell(from_idx, to_idx):
-            if from_idx == to_idx or from_idx < 0 or to_idx < 0 or from_idx >= len(cells) or to_idx >= len(cells):
-                return
-            cell = cells.pop(from_idx)
-            cells.insert(to_idx, cell)
-            scroll_layout.insertWidget(to_idx, cell)
-        # Einfüge-Indikator
-        insert_line = QLabel()
-        insert_line.setFixedHeight(4)
-        insert_line.setStyleSheet('background: #33ff66; border-radius: 2px;')
-        insert_line.hide()
-        scroll_content.insert_line = insert_line
-        scroll_layout.addWidget(insert_line)
-        def show_insert_line(pos):
-            insert_line.hide()
-            for idx, cell in enumerate(cells):
-                if cell.geometry().contains(pos):
-                    scroll_layout.insertWidget(idx, insert_line)
-                    insert_line.show()
-                    return idx
-            insert_line.hide()
-            return None
-        scroll_content.dragEnterEvent = lambda e: e.accept() if e.mimeData().hasText() else e.ignore()
-        def dragMoveEvent(e):
-            pos = e.position().toPoint() if hasattr(e, 'position') else e.pos()
-            show_insert_line(pos)
-            e.accept()
-        scroll_content.dragMoveEvent = dragMoveEvent
-        scroll_content.dropEvent = lambda e: handle_drop(e)
-        def handle_drop(e):
-            pos = e.position().toPoint() if hasattr(e, 'position') else e.pos()
-            to_idx = show_insert_line(pos)
-            insert_line.hide()
-            for idx, cell in enumerate(cells):
-                if cell.geometry().contains(pos):
-                    from_idx = cells.index(e.source())
-                    if to_idx is not None:
-                        move_cell(from_idx, to_idx)
-                    break
-            e.accept()
-
         # Setzen des Layouts für das Hauptfenster
         window.setLayout(layout)
         window.resize(800, 600)
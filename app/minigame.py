@@ -6,6 +6,7 @@ from PySide6.QtGui import QPainter, QColor, QFont, QPen
 import random
 import math
 
+from app.audio import audio
 from app.codegrid import show_codegrid
 from app.tetris import show_tetris
 
@@ -152,10 +153,12 @@ class MinigameMenu(QDialog):
         help_btn.clicked.connect(self.show_help)
 
     def start_codegrid(self):
+        audio().play("beep")
         self.accept()
         show_codegrid(self.parent())
 
     def start_tetris(self):
+        audio().play("beep")
         self.accept()
         show_tetris(self.parent())
 
@@ -203,6 +206,7 @@ class MinigameMenu(QDialog):
             dlg.exec()
             return
 
+        audio().play("beep")
         self.accept()
         dlg = Sudoku(self.parent())
         # load saved Sudoku only if user has auto-resume enabled
@@ -0,0 +1,142 @@
+# Datenmodell eines Notebooks, unabhängig von Qt. Die Zellen-Widgets zeigen
+# jeweils ein CellModel an (Zellen außerhalb des sichtbaren Bereichs existieren
+# nur als Modell, siehe app/widgets/notebook_view.py). Speichern, headless
+# Ausführung (app/batch.py) und Abhängigkeiten arbeiten direkt auf dem Modell.
+
+
+def _json_graphics(graphics):
+    # PLOT/POINTS können numpy-Arrays enthalten; JSON kennt nur Listen
+    items = []
+    for item in graphics:
+        if "xs" in item:
+            item = dict(item, xs=[float(x) for x in item["xs"]], ys=[float(y) for y in item["ys"]])
+        items.append(item)
+    return items
+
+
+class CellModel:
+    """Eine Zelle: Typ ("Code"/"Markdown"), Quelltext und Ergebnis des letzten Laufs.
+
+    outputs sind die angezeigten Ausgabezeilen, graphics die Display-Liste der
+    Grafikbefehle (siehe app/graphics.py), execution_count die Nummer des
+    letzten Laufs im Kernel."""
+
+    def __init__(self, cell_type="Code", source="", outputs=None, graphics=None, execution_count=None):
+        self.cell_type = cell_type
+        self.source = source
+        self.outputs = list(outputs or [])
+        self.graphics = list(graphics or [])
+        self.execution_count = execution_count
+        # Quelltext beim letzten Lauf in dieser Sitzung (None: noch nicht gelaufen)
+        self.run_source = None
+        # Unbekannte Schlüssel aus der Datei, werden beim Speichern mitgeschrieben
+        self.extra = {}
+
+    @property
+    def output(self):
+        return "\n".join(self.outputs)
+
+    @property
+    def last_run(self):
+        """(Quelltext, Ausführungsnummer) des letzten Laufs, für Run All."""
+        if self.run_source is None:
+            return None
+        return self.run_source, self.execution_count
+
+    def start_run(self, source, execution_count):
+        self.run_source = source
+        self.execution_count = execution_count
+
+    def invalidate(self):
+        """Ergebnis gilt nicht mehr als aktuell (z.B. Zustand zurückgespult); Run All führt die Zelle neu aus."""
+        self.run_source = None
+
+    def set_result(self, outputs, graphics=()):
+        self.outputs = list(outputs)
+        self.graphics = list(graphics)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Zelle aus einem Eintrag der Notebook-JSON (siehe load_notebook)."""
+        cell_type = data.get("type", "Code").capitalize()
+        cell = cls(cell_type, data.get("input", ""))
+        if cell_type == "Code":
+            output = data.get("output", "")
+            cell.outputs = output.split("\n") if output else []
+            cell.graphics = list(data.get("graphics", []))
+            cell.execution_count = data.get("execution_count")
+        cell.extra = {key: value for key, value in data.items() if key not in _KEYS}
+        return cell
+
+    def to_dict(self):
+        entry = {"type": self.cell_type.lower(), "input": self.source}
+        if self.cell_type == "Code":
+            entry["output"] = self.output
+            if self.graphics:
+                entry["graphics"] = _json_graphics(self.graphics)
+            if self.execution_count is not None:
+                entry["execution_count"] = self.execution_count
+        for key, value in self.extra.items():
+            entry.setdefault(key, value)
+        return entry
+
+
+_KEYS = ("type", "input", "output", "graphics", "execution_count")
+
+
+class NotebookModel:
+    """Zellliste eines Notebooks in Notebook-Reihenfolge.
+
+    metadata enthält Notebook-weite Einstellungen, z.B. das Ausführungsbudget.
+    Ohne Einstellungen bleibt die Datei eine reine Zellliste (wie bisher),
+    sonst {"metadata": ..., "cells": [...]}."""
+
+    def __init__(self, cells=None, metadata=None):
+        self.cells = list(cells or [])
+        self.metadata = dict(metadata or {})
+
+    @classmethod
+    def from_data(cls, data):
+        """Aus den Daten, wie sie load_notebook liefert (Zellliste oder dict)."""
+        if isinstance(data, dict):
+            return cls((CellModel.from_dict(entry) for entry in data.get("cells", [])),
+                       data.get("metadata"))
+        return cls(CellModel.from_dict(entry) for entry in data)
+
+    def to_data(self):
+        cells = [cell.to_dict() for cell in self.cells]
+        if not self.metadata:
+            return cells
+        return {"metadata": dict(self.metadata), "cells": cells}
+
+    def replace(self, other):
+        """Übernimmt Zellen und Einstellungen von other; die Liste cells bleibt dasselbe Objekt."""
+        self.cells[:] = other.cells
+        self.metadata = dict(other.metadata)
+
+    def budget_limits(self):
+        """(max_steps, max_seconds) des Notebooks oder None (Standardbudget).
+        None als Grenze heißt unbegrenzt; geprüft wird beim Anwenden."""
+        budget = self.metadata.get("budget")
+        if not isinstance(budget, dict):
+            return None
+        return budget.get("max_steps"), budget.get("max_seconds")
+
+    def set_budget_limits(self, max_steps, max_seconds):
+        self.metadata["budget"] = {"max_steps": max_steps, "max_seconds": max_seconds}
+
+    def code_sources(self):
+        """Quelltext pro Zelle, None für Markdown (für DependencyGraph)."""
+        return [cell.source if cell.cell_type == "Code" else None for cell in self.cells]
+
+    def last_runs(self):
+        return [cell.last_run for cell in self.cells]
+
+    def diff(self, data):
+        """Indizes der Zellen, die sich von data (z.B. der gespeicherten Datei) unterscheiden."""
+        if isinstance(data, dict):
+            data = data.get("cells", [])
+        current = [cell.to_dict() for cell in self.cells]
+        changed = [idx for idx, entry in enumerate(current) if idx >= len(data) or data[idx] != entry]
+        changed.extend(range(len(current), len(data)))  # inzwischen gelöschte Zellen
+        return changed
@@ -0,0 +1,333 @@
+import re
+
+# Parser für Zellprogramme: wandelt den Quelltext einmal in einen Baum aus
+# Anweisungsknoten um, den RetroInterpreter.execute() abarbeitet.
+
+# Namen mit "__" am Anfang sind für den Interpreter reserviert (siehe app.sandbox)
+NAME = r"(?!__)[a-zA-Z_][a-zA-Z0-9_]*"
+
+FOR_RE = re.compile(rf"^FOR\s+({NAME})\s*=\s*(.+?)\s+TO\s+(.+?)(\s+STEP\s+(.+))?$", re.IGNORECASE)
+WHILE_RE = re.compile(r"^WHILE\s+(.+?)\s+DO\b", re.IGNORECASE)
+IF_RE = re.compile(r"^IF\s+(.+?)\s+THEN\b", re.IGNORECASE)
+LET_RE = re.compile(rf"^({NAME})(\s*\[\s*(\d+)\s*\])?\s*=\s*(.+)")
+DEF_RE = re.compile(rf"^(?:(PURE|MEMO)\s+)?({NAME})\((.*?)\)\s*=\s*(.+)", re.IGNORECASE)
+INPUT_RE = re.compile(rf"^{NAME}$")
+
+# Grafikbefehl -> erlaubte Anzahl Argumente
+GRAPHICS_ARGS = {"POINT": (2,), "LINE": (4,), "CIRCLE": (3,), "PLOT": (1, 2), "POINTS": (1, 2)}
+
+
+class Node:
+    __slots__ = ("lineno",)
+
+    def __init__(self, lineno):
+        self.lineno = lineno
+
+    def __repr__(self):
+        fields = ", ".join(f"{k}={getattr(self, k)!r}" for k in self.__slots__)
+        return f"{type(self).__name__}(line {self.lineno}, {fields})"
+
+
+class Let(Node):
+    __slots__ = ("name", "index", "expr")
+
+    def __init__(self, lineno, name, index, expr):
+        super().__init__(lineno)
+        self.name = name
+        self.index = index  # None oder Index als Text (arr[1] = ...)
+        self.expr = expr
+
+
+class Print(Node):
+    __slots__ = ("expr",)
+
+    def __init__(self, lineno, expr):
+        super().__init__(lineno)
+        self.expr = expr
+
+
+class Input(Node):
+    __slots__ = ("name",)
+
+    def __init__(self, lineno, name):
+        super().__init__(lineno)
+        self.name = name
+
+
+class Def(Node):
+    __slots__ = ("name", "args", "body", "memo")
+
+    def __init__(self, lineno, name, args, body, memo=False):
+        super().__init__(lineno)
+        self.name = name
+        self.args = args
+        self.body = body
+        self.memo = memo  # DEF PURE / DEF MEMO: Ergebnisse pro Argumenttupel cachen
+
+
+class If(Node):
+    __slots__ = ("cond", "then_body", "else_body")
+
+    def __init__(self, lineno, cond, then_body, else_body):
+        super().__init__(lineno)
+        self.cond = cond
+        self.then_body = then_body
+        self.else_body = else_body
+
+
+class While(Node):
+    __slots__ = ("cond", "body")
+
+    def __init__(self, lineno, cond, body):
+        super().__init__(lineno)
+        self.cond = cond
+        self.body = body
+
+
+class For(Node):
+    __slots__ = ("var", "start", "end", "step", "body")
+
+    def __init__(self, lineno, var, start, end, step, body):
+        super().__init__(lineno)
+        self.var = var
+        self.start = start
+        self.end = end
+        self.step = step  # None = Schrittweite 1
+        self.body = body
+
+
+class Graphics(Node):
+    __slots__ = ("cmd", "args")
+
+    def __init__(self, lineno, cmd, args):
+        super().__init__(lineno)
+        self.cmd = cmd  # POINT, LINE, CIRCLE, PLOT oder POINTS
+        self.args = args
+
+
+class Budget(Node):
+    __slots__ = ("args",)
+
+    def __init__(self, lineno, args):
+        super().__init__(lineno)
+        self.args = args  # [Schritte] oder [Schritte, Sekunden]
+
+
+class Trace(Node):
+    __slots__ = ("mode", "size")
+
+    def __init__(self, lineno, mode, size):
+        super().__init__(lineno)
+        self.mode = mode  # ON, OFF oder SHOW
+        self.size = size
+
+
+class Help(Node):
+    __slots__ = ()
+
+
+class Expr(Node):
+    __slots__ = ("expr",)
+
+    def __init__(self, lineno, expr):
+        super().__init__(lineno)
+        self.expr = expr
+
+
+class SyntaxErrorNode(Node):
+    """Fehlerhafte Zeile; die Meldung wird erst bei der Ausführung ausgegeben."""
+    __slots__ = ("message",)
+
+    def __init__(self, lineno, message):
+        super().__init__(lineno)
+        self.message = message
+
+
+def split_args(text):
+    """Trennt Argumente an Kommas außerhalb von Klammern und Strings."""
+    args = []
+    depth = 0
+    quote = None
+    start = 0
+    for i, ch in enumerate(text):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+        elif ch in "([{":
+            depth += 1
+        elif ch in ")]}":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            args.append(text[start:i].strip())
+            start = i + 1
+    args.append(text[start:].strip())
+    return args
+
+
+def _keyword(line):
+    return line.split(None, 1)[0].upper() if line else ""
+
+
+def parse_statement(line, lineno=1):
+    """Parst eine einzelne Zeile ohne Blockstruktur (LET, PRINT, DEF, ...)."""
+    kw = _keyword(line)
+    rest = line[len(kw):].strip()
+    if kw == "LET":
+        match = LET_RE.match(rest)
+        if not match:
+            return SyntaxErrorNode(lineno, "Syntax Error in LET")
+        name, _, idx, expr = match.groups()
+        return Let(lineno, name, idx, expr.strip())
+    if kw == "PRINT":
+        return Print(lineno, rest)
+    if kw == "DEF":
+        match = DEF_RE.match(rest)
+        if not match:
+            return SyntaxErrorNode(lineno, "Syntax Error in DEF")
+        modifier, name, arg_str, body = match.groups()
+        args = [arg.strip() for arg in arg_str.split(",") if arg.strip()]
+        return Def(lineno, name, args, body.strip(), modifier is not None)
+    if kw == "INPUT":
+        if not INPUT_RE.match(rest):
+            return SyntaxErrorNode(lineno, "Syntax Error in INPUT")
+        return Input(lineno, rest)
+    if kw in GRAPHICS_ARGS:
+        args = split_args(rest)
+        if len(args) not in GRAPHICS_ARGS[kw] or not all(args):
+            return SyntaxErrorNode(lineno, f"Syntax Error in {kw}")
+        return Graphics(lineno, kw, args)
+    if kw == "BUDGET":
+        args = [a.strip() for a in rest.split(",")]
+        if not args[0] or len(args) > 2:
+            return SyntaxErrorNode(lineno, "Syntax Error in BUDGET")
+        return Budget(lineno, args)
+    if kw == "TRACE":
+        parts = rest.upper().split()
+        if not parts:
+            return Trace(lineno, "SHOW", None)
+        if parts[0] == "ON" and len(parts) <= 2 and all(p.isdigit() for p in parts[1:]):
+            return Trace(lineno, "ON", int(parts[1]) if len(parts) == 2 else None)
+        if parts == ["OFF"]:
+            return Trace(lineno, "OFF", None)
+        return SyntaxErrorNode(lineno, "Syntax Error in TRACE")
+    if line.upper() == "HELP":
+        return Help(lineno)
+    return Expr(lineno, line)
+
+
+# Blockanfang -> passendes Blockende
+BLOCK_END = {"FOR": "NEXT", "WHILE": "ENDWHILE", "IF": "ENDIF"}
+BLOCK_CLOSERS = {end: start for start, end in BLOCK_END.items()}
+
+
+def block_delta(line):
+    """+1 für einen Blockanfang, -1 für ein Blockende, sonst 0."""
+    kw = _keyword(line)
+    if kw in BLOCK_END:
+        return 1
+    if kw in BLOCK_CLOSERS:
+        return -1
+    return 0
+
+
+class BlockTable:
+    """Sprungtabelle einer Zelle: zu jedem Blockanfang der Index des passenden
+    Endes (und bei IF ggf. des ELSE). Fehlerhafte Zeilen stehen in errors."""
+
+    def __init__(self):
+        self.end = {}
+        self.else_ = {}
+        self.errors = {}
+
+    @classmethod
+    def match(cls, keywords):
+        """Paart WHILE/ENDWHILE, FOR/NEXT und IF/ELSE/ENDIF in einem Durchlauf."""
+        table = cls()
+        stack = []  # (Index, Schlüsselwort) offener Blöcke
+        for idx, kw in enumerate(keywords):
+            if kw in BLOCK_END:
+                stack.append((idx, kw))
+            elif kw == "ELSE":
+                if stack and stack[-1][1] == "IF" and stack[-1][0] not in table.else_:
+                    table.else_[stack[-1][0]] = idx
+                else:
+                    table.errors[idx] = "Syntax Error: unexpected ELSE"
+            elif kw in BLOCK_CLOSERS:
+                if stack and stack[-1][1] == BLOCK_CLOSERS[kw]:
+                    table.end[stack.pop()[0]] = idx
+                else:
+                    table.errors[idx] = f"Syntax Error: unexpected {kw}"
+        for idx, kw in stack:
+            table.errors[idx] = f"Syntax Error: {kw} without {BLOCK_END[kw]}"
+        return table
+
+
+class Parser:
+    """Baut den Anweisungsbaum anhand der vorab berechneten Sprungtabelle."""
+
+    def __init__(self, lines):
+        if isinstance(lines, str):
+            lines = lines.splitlines()
+        # (Zeilennummer, bereinigte Zeile), Leerzeilen und Kommentare entfallen
+        self.lines = []
+        for lineno, line in enumerate(lines, start=1):
+            line = line.strip()
+            if line and not line.startswith("#"):
+                self.lines.append((lineno, line))
+        self.keywords = [_keyword(line) for _, line in self.lines]
+        self.table = BlockTable.match(self.keywords)
+
+    def parse(self):
+        return self._parse_range(0, len(self.lines))
+
+    def _parse_range(self, lo, hi):
+        body = []
+        i = lo
+        while i < hi:
+            lineno, line = self.lines[i]
+            kw = self.keywords[i]
+            if i in self.table.errors:
+                body.append(SyntaxErrorNode(lineno, self.table.errors[i]))
+                if kw in BLOCK_END:
+                    # Nicht geschlossener Block: der Rest gehört zu ihm
+                    return body
+                i += 1
+                continue
+            if kw in BLOCK_END:
+                end = self.table.end[i]
+                body.append(self._parse_block(i, end))
+                i = end + 1
+            else:
+                body.append(parse_statement(line, lineno))
+                i += 1
+        return body
+
+    def _parse_block(self, start, end):
+        lineno, line = self.lines[start]
+        kw = self.keywords[start]
+        if kw == "FOR":
+            match = FOR_RE.match(line)
+            if not match:
+                return SyntaxErrorNode(lineno, "Syntax Error in FOR")
+            var, first, last, _, step = match.groups()
+            return For(lineno, var, first, last, step, self._parse_range(start + 1, end))
+        if kw == "WHILE":
+            match = WHILE_RE.match(line)
+            if not match:
+                return SyntaxErrorNode(lineno, "Syntax Error in WHILE")
+            return While(lineno, match.group(1), self._parse_range(start + 1, end))
+        match = IF_RE.match(line)
+        if not match:
+            return SyntaxErrorNode(lineno, "Syntax Error in IF")
+        else_idx = self.table.else_.get(start)
+        if else_idx is None:
+            return If(lineno, match.group(1), self._parse_range(start + 1, end), [])
+        return If(lineno, match.group(1), self._parse_range(start + 1, else_idx),
+                  self._parse_range(else_idx + 1, end))
+
+
+def parse_program(lines):
+    """Zellquelltext (String oder Zeilenliste) -> Liste von Anweisungsknoten."""
+    return Parser(lines).parse()
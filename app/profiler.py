@@ -0,0 +1,85 @@
+import json
+import time
+
+# Zeilenprofiler für RetroInterpreter (opt-in, siehe enable_profiler): zählt
+# pro Quellzeile Treffer und kumulierte Zeit, pro Schleife die Iterationen
+# und pro DEF-Funktion Aufrufe und Zeit.
+
+
+class LineProfiler:
+    def __init__(self):
+        self.clock = time.perf_counter
+        self.lines = {}  # Zeile -> [Treffer, Sekunden inkl. verschachtelter Zeilen]
+        self.loops = {}  # Zeile -> [FOR/WHILE, Iterationen]
+        self.functions = {}  # Name -> [Aufrufe, Sekunden]
+        self._depth = {}  # Name -> aktuelle Rekursionstiefe
+
+    def record_line(self, lineno, seconds):
+        stats = self.lines.get(lineno)
+        if stats is None:
+            self.lines[lineno] = [1, seconds]
+        else:
+            stats[0] += 1
+            stats[1] += seconds
+
+    def record_iteration(self, lineno, kind):
+        stats = self.loops.get(lineno)
+        if stats is None:
+            self.loops[lineno] = [kind, 1]
+        else:
+            stats[1] += 1
+
+    def call(self, name, func, args):
+        """Ruft func(*args) auf und verbucht die Zeit bei name. Rekursive
+        Aufrufe zählen als Aufruf, ihre Zeit aber nur einmal."""
+        stats = self.functions.get(name)
+        if stats is None:
+            stats = self.functions[name] = [0, 0.0]
+        stats[0] += 1
+        depth = self._depth.get(name, 0)
+        self._depth[name] = depth + 1
+        start = self.clock()
+        try:
+            return func(*args)
+        finally:
+            self._depth[name] = depth
+            if depth == 0:
+                stats[1] += self.clock() - start
+
+    def line_stats(self, lineno):
+        """(Treffer, Sekunden) einer Zeile oder None."""
+        stats = self.lines.get(lineno)
+        return tuple(stats) if stats else None
+
+    def to_dict(self):
+        return {
+            "lines": [{"line": lineno, "hits": hits, "seconds": seconds}
+                      for lineno, (hits, seconds) in sorted(self.lines.items())],
+            "loops": [{"line": lineno, "kind": kind, "iterations": iterations,
+                       "seconds": self.lines.get(lineno, (0, 0.0))[1]}
+                      for lineno, (kind, iterations) in sorted(self.loops.items())],
+            "functions": [{"name": name, "calls": calls, "seconds": seconds}
+                          for name, (calls, seconds) in sorted(self.functions.items())],
+        }
+
+    def to_json(self, path=None):
+        """Profil als JSON-Text; mit path zusätzlich in die Datei geschrieben."""
+        text = json.dumps(self.to_dict(), indent=2)
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        return text
+
+    def format_report(self, limit=10):
+        """Kurzer Textbericht: die teuersten Zeilen und alle DEF-Funktionen."""
+        if not self.lines:
+            return "Profile is empty"
+        rows = ["line   hits      time"]
+        top = sorted(self.lines.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        for lineno, (hits, seconds) in top:
+            loop = self.loops.get(lineno)
+            extra = f"  {loop[0]} x{loop[1]}" if loop else ""
+            rows.append(f"{lineno:>4} {hits:>6} {seconds * 1000:>8.2f} ms{extra}")
+        for name, (calls, seconds) in sorted(self.functions.items()):
+            rows.append(f"DEF {name}: {calls} calls, {seconds * 1000:.2f} ms")
+        return "\n".join(rows)
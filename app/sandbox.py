@@ -0,0 +1,467 @@
+import ast as pyast
+import operator
+import re
+from functools import partial
+
+from app.arrays import MAX_ARRAY_LENGTH, is_array, np
+
+# Eingeschränkte Auswertung von Ausdrücken: Jeder Ausdruck wird beim
+# Kompilieren (einmal, danach liegt er im Cache des Interpreters) gegen eine
+# Liste erlaubter AST-Knoten geprüft. Attribute und Dunder-Namen sind
+# verboten, damit man sich nicht über ().__class__... aus eval() heraushangeln
+# kann. Alle Operatoren, Vergleiche und die Iteration in Comprehensions
+# laufen über Hilfsfunktionen, die Größe bzw. Budget begrenzen, damit
+# [0]*10**9, 9**9**9, "%0100000000d" % 1 oder zwei gegeneinander
+# gebroadcastete Arrays sofort mit einem Fehler abbrechen statt den Prozess
+# lahmzulegen. Damit reine Zahlen dabei nicht langsamer werden, prüft der
+# erzeugte Code bei Rechenausdrücken aus Namen und Konstanten (n * 2 + 1)
+# einmal die Typen der Namen und rechnet dann direkt.
+
+# Obergrenzen für Ergebnisse einzelner Operationen
+MAX_INT_BITS = 1_000_000
+MAX_SEQUENCE_LENGTH = MAX_ARRAY_LENGTH
+# Obergrenze für Breite/Genauigkeit in Formatangaben ("%08d", f"{x:>8}")
+MAX_FORMAT_WIDTH = 10_000
+# Elemente, die ein einzelner Ausdruck insgesamt erzeugen darf (Listen,
+# Strings, Arrays); begrenzt z.B. [[0]*10**7 for k in range(5)]
+MAX_ALLOCATION = 2 * MAX_SEQUENCE_LENGTH
+# Maximale Verschachtelungstiefe von DEF-Aufrufen (Rekursion)
+MAX_CALL_DEPTH = 240
+
+
+class SandboxViolation(ValueError):
+    """Der Ausdruck enthält nicht erlaubte Konstrukte."""
+
+
+class LimitExceeded(MemoryError):
+    """Ein Zwischenergebnis wäre zu groß geworden."""
+
+
+ALLOWED_NODES = {
+    pyast.Expression, pyast.Constant, pyast.Name, pyast.Load, pyast.Store,
+    pyast.BinOp, pyast.UnaryOp, pyast.BoolOp, pyast.Compare, pyast.IfExp,
+    pyast.Call, pyast.keyword, pyast.Starred,
+    pyast.List, pyast.Tuple, pyast.Set, pyast.Dict, pyast.Subscript, pyast.Slice,
+    pyast.ListComp, pyast.SetComp, pyast.DictComp, pyast.GeneratorExp, pyast.comprehension,
+    pyast.JoinedStr, pyast.FormattedValue,
+    # Operatoren
+    pyast.Add, pyast.Sub, pyast.Mult, pyast.Div, pyast.FloorDiv, pyast.Mod, pyast.Pow,
+    pyast.LShift, pyast.RShift, pyast.BitOr, pyast.BitXor, pyast.BitAnd,
+    pyast.And, pyast.Or, pyast.Not, pyast.Invert, pyast.UAdd, pyast.USub,
+    pyast.Eq, pyast.NotEq, pyast.Lt, pyast.LtE, pyast.Gt, pyast.GtE,
+    pyast.Is, pyast.IsNot, pyast.In, pyast.NotIn,
+}
+
+_SEQUENCES = (str, bytes, list, tuple)
+_NUMBERS = frozenset({int, float, complex, bool})
+_NUMPY_TYPES = (np.ndarray, np.generic) if np is not None else ()
+
+# Eine %-Umwandlung: %[(key)][flags][width][.precision][length]type
+_PERCENT_SPEC = re.compile(r"%(\([^)]*\))?[-#0 +]*(\*|\d+)?(?:\.(\*|\d+))?[hlL]?(.)", re.DOTALL)
+_DIGITS = re.compile(r"\d+")
+
+
+def _check_length(n):
+    if n > MAX_SEQUENCE_LENGTH:
+        raise LimitExceeded(f"result too large ({n} > {MAX_SEQUENCE_LENGTH} elements)")
+
+
+def _check_bits(bits):
+    if bits > MAX_INT_BITS:
+        raise LimitExceeded(f"integer result too large (~{bits} bits > {MAX_INT_BITS})")
+
+
+def _check_width(width):
+    if width > MAX_FORMAT_WIDTH:
+        raise LimitExceeded(f"format width too large ({width} > {MAX_FORMAT_WIDTH})")
+
+
+def check_format_spec(spec):
+    """Prüft eine Formatangabe wie ">8.3f": jede Zahl darin ist eine Breite
+    oder Genauigkeit (oder ein einzelnes Füllzeichen)."""
+    for digits in _DIGITS.findall(spec):
+        _check_width(int(digits))
+
+
+def check_percent_format(fmt, args):
+    """Prüft Breiten und Genauigkeiten eines %-Formats, auch per * übergebene."""
+    if isinstance(fmt, bytes):
+        fmt = fmt.decode("latin-1")
+    values = args if isinstance(args, tuple) else (args,)
+    pos = 0
+    for match in _PERCENT_SPEC.finditer(fmt):
+        key, width, precision, kind = match.groups()
+        for size in (width, precision):
+            if size == "*":
+                if pos < len(values) and isinstance(values[pos], int):
+                    _check_width(abs(values[pos]))
+                pos += 1
+            elif size is not None:
+                _check_width(int(size))
+        if kind != "%" and key is None:
+            pos += 1
+
+
+def _reserve(allocate, n):
+    _check_length(n)
+    allocate(max(n, 0))
+
+
+def _array_size(a, b):
+    # Größe des Ergebnisses einer elementweisen Operation (ohne sie auszuführen);
+    # unverträgliche Formen meldet danach die Operation selbst
+    try:
+        return np.broadcast(a, b).size
+    except ValueError:
+        return 0
+
+
+def _apply(allocate, op, a, b):
+    # Jeder Operator mit NumPy-Operand: Arrays vorher auf die Grenze buchen,
+    # Überlauf/Division durch 0 liefern inf/nan ohne RuntimeWarning auf stderr
+    if isinstance(a, _NUMPY_TYPES) or isinstance(b, _NUMPY_TYPES):
+        if is_array(a) or is_array(b):
+            _reserve(allocate, _array_size(a, b))
+        with np.errstate(all="ignore"):
+            return op(a, b)
+    return op(a, b)
+
+
+def safe_add(allocate, a, b):
+    if isinstance(a, _SEQUENCES) and isinstance(b, _SEQUENCES):
+        _reserve(allocate, len(a) + len(b))
+    return _apply(allocate, operator.add, a, b)
+
+
+def safe_mul(allocate, a, b):
+    if isinstance(a, _SEQUENCES) and isinstance(b, int):
+        _reserve(allocate, len(a) * b)
+    elif isinstance(b, _SEQUENCES) and isinstance(a, int):
+        _reserve(allocate, len(b) * a)
+    elif type(a) is int and type(b) is int:
+        _check_bits(a.bit_length() + b.bit_length())
+    return _apply(allocate, operator.mul, a, b)
+
+
+def safe_pow(allocate, a, b):
+    if type(a) is int and type(b) is int and b > 0 and a not in (-1, 0, 1):
+        _check_bits(b * a.bit_length())
+    return _apply(allocate, operator.pow, a, b)
+
+
+def safe_lshift(allocate, a, b):
+    if type(a) is int and type(b) is int and a:
+        _check_bits(a.bit_length() + b)
+    return _apply(allocate, operator.lshift, a, b)
+
+
+def safe_mod(allocate, a, b):
+    if isinstance(a, (str, bytes)):
+        # String-Formatierung: "%0100000000d" % 1 wäre 100 MB groß
+        check_percent_format(a, b)
+    return _apply(allocate, operator.mod, a, b)
+
+
+def safe_unary(allocate, op, a):
+    if isinstance(a, _NUMPY_TYPES):
+        if is_array(a):
+            _reserve(allocate, a.size)
+        with np.errstate(all="ignore"):
+            return op(a)
+    return op(a)
+
+
+def _contains(a, b):
+    return a in b
+
+
+def _not_contains(a, b):
+    return a not in b
+
+
+_COMPARISONS = {
+    "==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+    "in": _contains, "not in": _not_contains, "is": operator.is_, "is not": operator.is_not,
+}
+
+
+def safe_compare(allocate, ops, left, *comparators):
+    # a < b < c wie in Python: das erste falsche Teilergebnis oder das letzte;
+    # anders als dort sind hier aber schon alle Operanden ausgewertet
+    result = True
+    for i, (symbol, right) in enumerate(zip(ops, comparators)):
+        if i and not result:
+            return result
+        result = _apply(allocate, _COMPARISONS[symbol], left, right)
+        left = right
+    return result
+
+
+_CONVERSIONS = {ord("r"): repr, ord("s"): str, ord("a"): ascii}
+
+
+def safe_format(value, spec, conversion=-1):
+    # f"{value!conversion:spec}" mit zur Laufzeit zusammengesetztem spec
+    if conversion != -1:
+        value = _CONVERSIONS[conversion](value)
+    check_format_spec(spec)
+    return format(value, spec)
+
+
+# Namen der Hilfsfunktionen im Namensraum; beginnen mit "__" und sind damit
+# für Benutzercode unerreichbar
+ITER_HELPER = "__retro_iter"
+_TYPE = "__retro_type"
+_FORMAT = "__retro_format"
+_COMPARE = "__retro_compare"
+# Operator -> (Name der Hilfsfunktion im Namensraum, Python-Operator)
+_BINARY = {
+    pyast.Add: ("__retro_add", operator.add),
+    pyast.Sub: ("__retro_sub", operator.sub),
+    pyast.Mult: ("__retro_mul", operator.mul),
+    pyast.Div: ("__retro_truediv", operator.truediv),
+    pyast.FloorDiv: ("__retro_floordiv", operator.floordiv),
+    pyast.Mod: ("__retro_mod", operator.mod),
+    pyast.Pow: ("__retro_pow", operator.pow),
+    pyast.LShift: ("__retro_lshift", operator.lshift),
+    pyast.RShift: ("__retro_rshift", operator.rshift),
+    pyast.BitOr: ("__retro_or", operator.or_),
+    pyast.BitXor: ("__retro_xor", operator.xor),
+    pyast.BitAnd: ("__retro_and", operator.and_),
+}
+# Operatoren, die auch ohne Arrays große Ergebnisse liefern können
+_CHECKED = {operator.add: safe_add, operator.mul: safe_mul, operator.pow: safe_pow,
+            operator.lshift: safe_lshift, operator.mod: safe_mod}
+_UNARY = {
+    pyast.USub: ("__retro_neg", operator.neg),
+    pyast.UAdd: ("__retro_pos", operator.pos),
+    pyast.Invert: ("__retro_invert", operator.invert),
+}
+_SYMBOLS = {
+    pyast.Eq: "==", pyast.NotEq: "!=", pyast.Lt: "<", pyast.LtE: "<=", pyast.Gt: ">", pyast.GtE: ">=",
+    pyast.In: "in", pyast.NotIn: "not in", pyast.Is: "is", pyast.IsNot: "is not",
+}
+# Typmengen für die Prüfungen im erzeugten Code
+_NUMBERS_NAME = "__retro_numbers"
+_REALS_NAME = "__retro_reals"
+_TYPE_SETS = {_NUMBERS_NAME: _NUMBERS, _REALS_NAME: frozenset({int, float, bool})}
+# Betrag, unter dem Produkte und Potenzen mit kleinem festem Exponenten
+# weit unter MAX_INT_BITS bleiben
+_SMALL = float(2 ** 500)
+_SMALL_EXPONENT = 1000
+_OPERATORS = (pyast.BinOp, pyast.UnaryOp, pyast.Compare)
+
+
+def helpers(allocate):
+    """Hilfsfunktionen für den Namensraum eines Interpreters.
+
+    allocate(n) wird mit der Größe jedes großen Ergebnisses (Listen, Strings,
+    Arrays) aufgerufen und wirft LimitExceeded, wenn ein Ausdruck insgesamt
+    zu viel erzeugt (siehe RetroInterpreter._allocate)."""
+    return {
+        **{name: partial(_CHECKED[op], allocate) if op in _CHECKED else partial(_apply, allocate, op)
+           for name, op in _BINARY.values()},
+        **{name: partial(safe_unary, allocate, op) for name, op in _UNARY.values()},
+        _COMPARE: partial(safe_compare, allocate),
+        _FORMAT: safe_format,
+        _TYPE: type,
+        **_TYPE_SETS,
+    }
+
+
+def _name(name, node):
+    return pyast.copy_location(pyast.Name(id=name, ctx=pyast.Load()), node)
+
+
+def _call(helper, args, node):
+    call = pyast.Call(func=_name(helper, node), args=args, keywords=[])
+    return pyast.copy_location(call, node)
+
+
+def _type_in(operand, types, node):
+    # type(operand) in types; operand ist ein Name (ohne Nebenwirkung)
+    test = pyast.Compare(left=_call(_TYPE, [_name(operand.id, operand)], node),
+                         ops=[pyast.In()], comparators=[_name(types, node)])
+    return pyast.copy_location(test, node)
+
+
+def _is_small(operand, node):
+    # type(operand) in reals and -small < operand < small
+    bound = pyast.copy_location(pyast.Compare(
+        left=pyast.copy_location(pyast.Constant(value=-_SMALL), node),
+        ops=[pyast.Lt(), pyast.Lt()],
+        comparators=[_name(operand.id, operand), pyast.copy_location(pyast.Constant(value=_SMALL), node)]), node)
+    return _and([_type_in(operand, _REALS_NAME, node), bound], node)
+
+
+def _and(values, node):
+    return values[0] if len(values) == 1 else pyast.copy_location(pyast.BoolOp(op=pyast.And(), values=values), node)
+
+
+def _arithmetic(node, names):
+    """Ist node reines Rechnen mit Namen und Zahlkonstanten?
+
+    None, wenn nicht; sonst True, wenn ganze Zahlen dabei stark wachsen
+    können (* oder **). Die Namen landen in names (id -> erster Knoten)."""
+    kind = type(node)
+    if kind is pyast.Name:
+        if node.id.startswith("__"):
+            raise SandboxViolation(f"name '{node.id}' is not allowed")
+        names.setdefault(node.id, node)
+        return False
+    if kind is pyast.Constant:
+        value = node.value
+        return False if type(value) in _NUMBERS and abs(value) < _SMALL else None
+    if kind is pyast.UnaryOp:
+        return _arithmetic(node.operand, names)
+    if kind is pyast.Compare:
+        grows = False
+        for operand in (node.left, *node.comparators):
+            result = _arithmetic(operand, names)
+            if result is None:
+                return None
+            grows = grows or result
+        return grows
+    if kind is not pyast.BinOp or type(node.op) not in _BINARY:
+        return None
+    op = type(node.op)
+    if op is pyast.Pow:
+        # Nur Name/Konstante hoch feste kleine Zahl: x ** 2, 2 ** 0.5
+        exponent = node.right
+        if (type(node.left) not in (pyast.Name, pyast.Constant) or type(exponent) is not pyast.Constant
+                or type(exponent.value) not in (int, float) or abs(exponent.value) > _SMALL_EXPONENT):
+            return None
+        return None if _arithmetic(node.left, names) is None else True
+    if op is pyast.LShift:
+        return None  # 1 << n wächst mit dem Wert von n
+    left = _arithmetic(node.left, names)
+    right = None if left is None else _arithmetic(node.right, names)
+    if right is None:
+        return None
+    return left or right or op is pyast.Mult
+
+
+def _guarded(node):
+    # Jeder Operator über seine Hilfsfunktion; Namen und Konstanten bleiben
+    kind = type(node)
+    if kind is pyast.BinOp:
+        return _call(_BINARY[type(node.op)][0], [_guarded(node.left), _guarded(node.right)], node)
+    if kind is pyast.UnaryOp:
+        if type(node.op) is pyast.Not:
+            return pyast.copy_location(pyast.UnaryOp(op=node.op, operand=_guarded(node.operand)), node)
+        return _call(_UNARY[type(node.op)][0], [_guarded(node.operand)], node)
+    if kind is pyast.Compare:
+        return _compare(node, _guarded(node.left), [_guarded(operand) for operand in node.comparators])
+    return node
+
+
+def _compare(node, left, comparators):
+    ops = pyast.copy_location(pyast.Constant(value=tuple(_SYMBOLS[type(op)] for op in node.ops)), node)
+    return _call(_COMPARE, [ops, left, *comparators], node)
+
+
+def _fast_or_guarded(node, names, grows):
+    """Reines Rechnen: direkt, wenn alle Namen kleine Zahlen sind, sonst über
+    die Hilfsfunktionen (Arrays, Listen, Strings, riesige ganze Zahlen)."""
+    if not names:
+        return node  # nur Konstanten, Größe schon beim Kompilieren klar
+    if grows:
+        tests = [_is_small(name, node) for name in names.values()]
+    else:
+        tests = [_type_in(name, _NUMBERS_NAME, node) for name in names.values()]
+    # Namen sind billig und ohne Nebenwirkung doppelt auszuwerten; alles
+    # andere läuft in genau einem der beiden Zweige
+    return pyast.copy_location(pyast.IfExp(test=_and(tests, node), body=node, orelse=_guarded(node)), node)
+
+
+def _operator(node):
+    # Operator mit beliebigen (schon umgeschriebenen) Operanden
+    kind = type(node)
+    if kind is pyast.BinOp:
+        left = node.left
+        if type(node.op) is pyast.Mod and isinstance(left, pyast.Constant) and isinstance(left.value, (str, bytes)):
+            # Festes Format: schon beim Kompilieren prüfen, * erst zur Laufzeit
+            fmt = left.value if isinstance(left.value, str) else left.value.decode("latin-1")
+            if "*" not in fmt:
+                check_percent_format(fmt, ())
+                return node
+        return _call(_BINARY[type(node.op)][0], [left, node.right], node)
+    if kind is pyast.UnaryOp:
+        if type(node.op) is pyast.Not:
+            return node
+        return _call(_UNARY[type(node.op)][0], [node.operand], node)
+    if all(type(op) in (pyast.Is, pyast.IsNot) for op in node.ops):
+        return node
+    return _compare(node, node.left, node.comparators)
+
+
+def _formatted(node):
+    spec = node.format_spec
+    if all(isinstance(part, pyast.Constant) for part in spec.values):
+        check_format_spec("".join(part.value for part in spec.values))
+        return node
+    # Breite aus einem Ausdruck (f"{x:>{w}}"): erst zur Laufzeit prüfbar
+    conversion = pyast.copy_location(pyast.Constant(value=node.conversion), node)
+    node.value = _call(_FORMAT, [node.value, spec, conversion], node)
+    node.conversion = -1
+    node.format_spec = None
+    return node
+
+
+def _sandboxed(node):
+    """Prüft jeden Knoten gegen ALLOWED_NODES und setzt die Hilfsfunktionen ein.
+
+    Absichtlich ohne ast.NodeTransformer: das direkte Ablaufen der Felder ist
+    um ein Vielfaches schneller, und jeder neue Ausdruck läuft hier durch."""
+    kind = type(node)
+    if kind not in ALLOWED_NODES:
+        if kind is pyast.Attribute:
+            raise SandboxViolation(f"attribute access '.{node.attr}' is not allowed")
+        raise SandboxViolation(f"{kind.__name__} is not allowed in expressions")
+    if kind is pyast.Name:
+        if node.id.startswith("__"):
+            raise SandboxViolation(f"name '{node.id}' is not allowed")
+        return node
+    if kind in _OPERATORS:
+        names = {}
+        grows = _arithmetic(node, names)
+        if grows is not None:
+            return _fast_or_guarded(node, names, grows)
+    for field in node._fields:
+        value = getattr(node, field, None)
+        if isinstance(value, list):
+            for i, item in enumerate(value):
+                if isinstance(item, pyast.AST):
+                    value[i] = _sandboxed(item)
+        elif isinstance(value, pyast.AST):
+            setattr(node, field, _sandboxed(value))
+    if kind in _OPERATORS:
+        return _operator(node)
+    if kind is pyast.FormattedValue:
+        if node.format_spec is not None:
+            return _formatted(node)
+    elif kind is pyast.comprehension:
+        # Jede Iteration verbraucht Budget (siehe RetroInterpreter._limited_iter)
+        node.iter = _call(ITER_HELPER, [node.iter], node.iter)
+    return node
+
+
+def compile_expression(source, filename=None):
+    """Prüft und kompiliert einen Ausdruck; wirft SandboxViolation bei
+    verbotenen Konstrukten, LimitExceeded bei zu großen festen Formatangaben
+    und SyntaxError bei ungültiger Syntax."""
+    tree = _sandboxed(pyast.parse(source, mode="eval"))
+    return compile(tree, filename or source, "eval")
+
+
+def compile_lambda(arglist, body, filename=None):
+    """Wie compile_expression, aber als lambda mit den Argumenten arglist."""
+    for arg in arglist:
+        if not arg.isidentifier() or arg.startswith("__"):
+            raise SandboxViolation(f"invalid argument name '{arg}'")
+    expr = _sandboxed(pyast.parse(body, mode="eval"))
+    args = pyast.arguments(posonlyargs=[], args=[pyast.arg(arg=a) for a in arglist],
+                           vararg=None, kwonlyargs=[], kw_defaults=[], kwarg=None, defaults=[])
+    tree = pyast.Expression(body=pyast.Lambda(args=args, body=expr.body))
+    pyast.fix_missing_locations(tree)  # nur für das neue lambda/arguments
+    return compile(tree, filename or body, "eval")
@@ -7,21 +7,18 @@ def get_notebook_path(filename):
     os.makedirs(nb_dir, exist_ok=True)
     return os.path.join(nb_dir, filename)
 
-def save_notebook(cells, filename):
-    data = []
-    for cell in cells:
-        cell_type = cell.cell_type.currentText()
-        entry = {
-            "type": cell_type.lower(),
-            "input": cell.input.toPlainText()
-        }
-        if cell_type == "Code":
-            entry["output"] = cell.output.text()
-        data.append(entry)
+def save_notebook_data(data, filename):
+    """Schreibt eine Zellliste (wie von load_notebook geliefert) als JSON."""
     path = get_notebook_path(filename)
     with open(path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2)
 
+def save_notebook(notebook, filename):
+    """Speichert ein NotebookModel (app/model.py); gibt die geschriebenen Daten zurück."""
+    data = notebook.to_data()
+    save_notebook_data(data, filename)
+    return data
+
 def load_notebook(filename):
     path = get_notebook_path(filename)
     with open(path, "r", encoding="utf-8") as f:
@@ -0,0 +1,72 @@
+import weakref
+
+from PySide6.QtCore import QObject, QEvent, QTimer
+
+# Takt der Zellen-Animationen (Scanlines, Icons) in ms; im Energiesparmodus
+# wird deutlich seltener neu gezeichnet
+FRAME_INTERVAL = 60
+LOW_POWER_INTERVAL = 250
+
+
+class AnimationClock(QObject):
+    """Ein gemeinsamer Timer für die Animationen aller Zellen eines Notebooks.
+
+    Pro Takt wird anim_phase jeder registrierten Zelle gesetzt und nur die
+    Zellen werden neu gezeichnet, die gerade im Scrollbereich sichtbar sind.
+    Ist das beobachtete Fenster versteckt oder minimiert, pausiert der Timer."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.phase = 0
+        self.low_power = False
+        self._widgets = weakref.WeakSet()
+        self._paused = False
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self._tick)
+
+    def register(self, widget):
+        self._widgets.add(widget)
+        widget.anim_phase = self.phase
+        self._update_timer()
+
+    def unregister(self, widget):
+        self._widgets.discard(widget)
+        self._update_timer()
+
+    def watch_window(self, window):
+        """Pausiert die Animationen, solange window versteckt oder minimiert ist."""
+        window.installEventFilter(self)
+        self._paused = not window.isVisible() or window.isMinimized()
+        self._update_timer()
+
+    def set_low_power(self, enabled):
+        self.low_power = enabled
+        self._update_timer()
+
+    def eventFilter(self, obj, event):
+        kind = event.type()
+        if kind in (QEvent.Type.Show, QEvent.Type.Hide, QEvent.Type.WindowStateChange):
+            self._paused = kind == QEvent.Type.Hide or obj.isMinimized()
+            self._update_timer()
+        return False
+
+    def _update_timer(self):
+        if self._paused or not self._widgets:
+            self.timer.stop()
+            return
+        interval = LOW_POWER_INTERVAL if self.low_power else FRAME_INTERVAL
+        if not self.timer.isActive() or self.timer.interval() != interval:
+            self.timer.start(interval)
+
+    def _tick(self):
+        # Die Phase zählt Takte, nicht Zeichenvorgänge: im Energiesparmodus
+        # läuft die Animation langsamer statt zu springen
+        self.phase += 1
+        for widget in list(self._widgets):
+            try:
+                # Außerhalb des sichtbaren Bereichs ist visibleRegion() leer
+                if widget.isVisible() and not widget.visibleRegion().isEmpty():
+                    widget.anim_phase = self.phase
+                    widget.update()
+            except RuntimeError:  # Qt-Objekt bereits gelöscht
+                self._widgets.discard(widget)
@@ -1,20 +1,25 @@
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QTextEdit, QPushButton, QLabel, QComboBox, QInputDialog, QHBoxLayout  # QHBoxLayout ergänzt
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QTextEdit, QPushButton, QLabel, QComboBox, QInputDialog, QHBoxLayout, QFileDialog  # QHBoxLayout ergänzt
 from PySide6.QtCore import Qt, QTimer
-from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput
-from app.interpreter import RetroInterpreter
+from app.audio import audio
+from app.kernel import CellRun, NotebookKernel
+from app.model import CellModel
+from app.worker import start_worker
+from app.graphics import paint_graphics
+from app.widgets.profile_gutter import ProfileGutter
+from app.widgets.animation import AnimationClock
+from app.widgets.crt import paint_decoration
 import markdown2
-import os
-import sys
-from PySide6.QtGui import QPainter, QColor, QPen, QLinearGradient
+from PySide6.QtGui import QPainter, QColor, QPen
 import math
 
-def resource_path(relative_path):
-    if hasattr(sys, '_MEIPASS'):
-        return os.path.join(sys._MEIPASS, relative_path)
-    return os.path.join(os.path.abspath('.'), relative_path)
+# Neue Ausgaben werden gesammelt und höchstens einmal pro Frame gezeichnet
+OUTPUT_FRAME_MS = 16
 
 class NotebookCell(QWidget):
-    def __init__(self, cell_type="Code"):
+    # Anzahl gerade laufender Zellen (für die Status-LED)
+    running_count = 0
+
+    def __init__(self, cell_type="Code", kernel=None, clock=None):
         super().__init__()
 
         self.layout = QVBoxLayout()
@@ -33,16 +38,48 @@ class NotebookCell(QWidget):
         self.cell_type = QComboBox()
         self.cell_type.addItems(["Code", "Markdown"])
         self.cell_type.setCurrentText(cell_type)
+        self.cell_type.currentTextChanged.connect(self._type_changed)
         self.inner_layout.addWidget(self.cell_type)
 
-        # Eingabe mehrzeilig
+        # Eingabe mehrzeilig, links daneben die Profil-Spalte (nur bei aktivem Profil)
         self.input = QTextEdit()
-        self.inner_layout.addWidget(self.input)
+        self.input.textChanged.connect(self._source_changed)
+        self.profile_gutter = ProfileGutter(self.input)
+        self.profile_gutter.hide()
+        editor_row = QHBoxLayout()
+        editor_row.addWidget(self.profile_gutter)
+        editor_row.addWidget(self.input)
+        self.inner_layout.addLayout(editor_row)
 
         # Ausführen-Button (immer sichtbar)
         self.run_button = QPushButton("Run")
         self.run_button.clicked.connect(self.execute)
-        self.inner_layout.addWidget(self.run_button)
+        # Erneut ausführen, ausgehend vom Zustand vor dem letzten Lauf dieser Zelle
+        self.rerun_button = QPushButton("↺ Run")
+        self.rerun_button.setToolTip("Zelle mit dem Zustand von vor ihrem letzten Lauf erneut ausführen")
+        self.rerun_button.clicked.connect(self.rerun_from_snapshot)
+        # Diese Zelle und alle von ihr abhängigen Zellen ausführen
+        self.downstream_button = QPushButton("⇣ Folgezellen")
+        self.downstream_button.setToolTip("Zelle und alle Zellen, die ihre Variablen nutzen, ausführen")
+        self.downstream_button.clicked.connect(self.run_downstream)
+        # Abbrechen-Button (nur sichtbar, solange die Zelle läuft)
+        self.cancel_button = QPushButton("Abbrechen")
+        self.cancel_button.clicked.connect(self.cancel_execution)
+        self.cancel_button.hide()
+        # Profil: Treffer und Zeit pro Zeile beim nächsten Lauf messen
+        self.profile_button = QPushButton("Profil")
+        self.profile_button.setCheckable(True)
+        self.profile_export_button = QPushButton("Profil exportieren")
+        self.profile_export_button.clicked.connect(self.export_profile)
+        self.profile_export_button.hide()
+        button_row = QHBoxLayout()
+        button_row.addWidget(self.run_button)
+        button_row.addWidget(self.rerun_button)
+        button_row.addWidget(self.downstream_button)
+        button_row.addWidget(self.cancel_button)
+        button_row.addWidget(self.profile_button)
+        button_row.addWidget(self.profile_export_button)
+        self.inner_layout.addLayout(button_row)
 
         # Ausgabe (initial leer)
         self.output = QLabel("")
@@ -51,73 +88,194 @@ class NotebookCell(QWidget):
         self.outer_layout.addLayout(self.inner_layout)
         self.layout.addLayout(self.outer_layout)
         self.setLayout(self.layout)
-        self.interpreter = RetroInterpreter()
-
-        # Soundeffekt vorbereiten
-        self.player = QMediaPlayer()
-        self.audio_output = QAudioOutput()
-        self.player.setAudioOutput(self.audio_output)
-        beep_path = resource_path("assets/beep.wav")
-        self.player.setSource(f"file://{os.path.abspath(beep_path)}")
-        self.audio_output.setVolume(0.25)
-
-        # Retro-Animation: Rahmen, Scanlines, Icons
-        self.anim_timer = QTimer(self)
-        self.anim_timer.timeout.connect(self.update)
-        self.anim_timer.start(60)
+        # kernel: gemeinsamer Interpreter des Notebooks (None = eigener Kernel)
+        self.kernel = kernel or NotebookKernel()
+        self.interpreter = self.kernel.interpreter
+        self._profile = None
+        # Angezeigte Zelle (CellModel); Typ, Quelltext und Ergebnisse eines
+        # Laufs werden direkt ins Modell übernommen
+        self.model = None
+        # Laufender bzw. letzter Lauf (CellRun): gesammelte Ausgaben, Grafik, Cache
+        self._run = None
+        # Hintergrund-Ausführung (QThread + Worker), None solange nichts läuft
+        self._thread = None
+        self._worker = None
+        # Gestreamte Ausgabe wird höchstens einmal pro Frame gezeichnet
+        self._render_timer = QTimer(self)
+        self._render_timer.setSingleShot(True)
+        self._render_timer.timeout.connect(self._render_output)
+
+        # Retro-Animation: Rahmen, Scanlines, Icons. Getaktet vom gemeinsamen
+        # AnimationClock des Notebooks (ohne Notebook: eigener Takt)
         self.anim_phase = 0
+        self.clock = clock or AnimationClock(self)
+        self.clock.register(self)
+        self.bind(CellModel(cell_type))
 
-    def execute(self):
-        # Status auf "Läuft..." setzen, falls möglich
+    def bind(self, model):
+        """Zeigt model an; beim Scrollen werden Widgets für andere Zellen wiederverwendet."""
+        self.model = model
+        self.cell_type.setCurrentText(model.cell_type)
+        self.input.setPlainText(model.source)
+        self.output.setText(model.output)
+        self._run = None
+        self._profile = None
+        self.profile_button.setChecked(False)
+        self.profile_gutter.hide()
+        self.profile_export_button.hide()
+
+    def _source_changed(self):
+        if self.model is not None:
+            self.model.source = self.input.toPlainText()
+
+    def _type_changed(self, cell_type):
+        if self.model is not None:
+            self.model.cell_type = cell_type
+
+    def _main_window(self):
         main_window = self.parent()
         while main_window and not hasattr(main_window, 'set_status'):
             main_window = main_window.parent()
+        return main_window
+
+    def _set_status(self, color, text):
+        main_window = self._main_window()
         if main_window and hasattr(main_window, 'set_status'):
-            main_window.set_status('#ffff00', 'Läuft...')
-        self.player.stop()  # Falls noch ein Sound läuft
-        self.player.play()
+            main_window.set_status(color, text)
+
+    def is_running(self):
+        return self._thread is not None
+
+    def is_busy(self):
+        """Läuft die Zelle oder wartet sie im Kernel auf ihren Lauf?"""
+        pending = self.kernel.pending
+        return self.is_running() or self.execute in pending or self.rerun_from_snapshot in pending
+
+    def execute(self):
+        if self.is_running():
+            return
+        audio().play("beep")  # Vorgeladen im gemeinsamen Sound-Dienst
         if self.cell_type.currentText() == "Markdown":
             md = self.input.toPlainText()
             html = markdown2.markdown(md)
             self.output.setText(html)
-            if main_window and hasattr(main_window, 'set_status'):
-                main_window.set_status('#33ff66', 'Bereit')
+            self.model.set_result([html])
+            if not NotebookCell.running_count:
+                self._set_status('#33ff66', 'Bereit')
+            return
+        # Der Kernel führt immer nur eine Zelle aus; sonst in die Warteschlange
+        if self.kernel.is_busy():
+            self.kernel.enqueue(self.execute)
+            self.output.setText("Wartet auf andere Zelle...")
+            return
+        # Code läuft im Hintergrund; die GUI (und alle Animationen) bleibt bedienbar
+        source = self.input.toPlainText()
+        lines = source.splitlines()
+        NotebookCell.running_count += 1
+        self._set_status('#ffff00', 'Läuft...')
+        self.run_button.setEnabled(False)
+        self.cancel_button.show()
+        self.output.setText("")
+        if self.profile_button.isChecked():
+            self._profile = self.interpreter.enable_profiler()
         else:
-            code = self.input.toPlainText()
-            lines = code.splitlines()
-            results = self.interpreter.run_block(lines)
-            # Ergebnisse flatten
-            def flatten(items):
-                for item in items:
-                    if isinstance(item, list):
-                        yield from flatten(item)
-                    else:
-                        yield item
-            flat_results = list(flatten(results))
-            graphics = []
-            text_results = []
-            error_found = False
-            for result in flat_results:
-                if isinstance(result, dict) and 'graphics' in result:
-                    graphics.extend(result['graphics'])
-                elif isinstance(result, str) and result.startswith('Error'):
-                    text_results.append(result)
-                    error_found = True
-                elif result:
-                    text_results.append(str(result))
-            self.output.setText("\n".join(text_results))
-            if graphics:
-                self.show_graphics(graphics)
-            # Status nach Ausführung setzen
-            if main_window and hasattr(main_window, 'set_status'):
-                if error_found:
-                    main_window.set_status('#ff3333', 'Fehler beim Ausführen')
-                else:
-                    main_window.set_status('#33ff66', 'Bereit')
+            self.interpreter.disable_profiler()
+            self._profile = None
+            self.profile_gutter.hide()
+            self.profile_export_button.hide()
+        # Unveränderte Zelle mit denselben Eingaben: Ergebnis aus dem Cache
+        self._run = CellRun(self.kernel, self.model, source)
+        if self._run.from_cache:
+            self._on_finished(self._run.cached_results)
+            return
+        self._thread, self._worker = start_worker(
+            self.interpreter, lines,
+            on_finished=self._on_finished,
+            on_heartbeat=self._on_heartbeat,
+            on_thread_finished=self._on_thread_finished,
+            on_output=self._on_output,
+        )
+
+    def rerun_from_snapshot(self):
+        """Stellt den Kernel-Zustand von vor dem letzten Lauf her und führt die Zelle aus."""
+        if self.kernel.is_busy():
+            self.kernel.enqueue(self.rerun_from_snapshot)
+            self.output.setText("Wartet auf andere Zelle...")
+            return
+        self.kernel.rewind(self.model)  # Noch nie gelaufen: normaler Lauf
+        self.execute()
+
+    def run_downstream(self):
+        main_window = self._main_window()
+        if main_window and hasattr(main_window, 'run_downstream'):
+            main_window.run_downstream(self)
+        else:
+            self.execute()
+
+    def cancel_execution(self, wait=False):
+        """Bricht eine laufende Ausführung ab; mit wait=True blockierend."""
+        self.kernel.dequeue(self.execute)
+        self.kernel.dequeue(self.rerun_from_snapshot)
+        if self._worker is not None:
+            self._worker.cancel()
+        if wait and self._thread is not None:
+            self._thread.wait()
+
+    def _on_heartbeat(self, usage):
+        self._set_status('#ffff00', f"Läuft... ({usage['steps']} Schritte, {usage['seconds']:.1f} s)")
+
+    def _on_thread_finished(self):
+        self._thread = None
+        self._worker = None
+
+    def _on_output(self, chunk):
+        self._run.add(chunk)
+        if not self._render_timer.isActive():
+            self._render_timer.start(OUTPUT_FRAME_MS)
+
+    def _render_output(self):
+        self.output.setText("\n".join(self._run.output_lines()))
+
+    def _on_finished(self, results):
+        NotebookCell.running_count = max(0, NotebookCell.running_count - 1)
+        run = self._run
+        next_run = run.finish(results)
+        if next_run is not None:
+            QTimer.singleShot(0, next_run)
+        self.run_button.setEnabled(True)
+        self.cancel_button.hide()
+        self._render_timer.stop()
+        self._render_output()
+        # Status nach Ausführung setzen (inkl. verbrauchtem Budget); solange
+        # andere Zellen noch laufen, bleibt die LED gelb
+        usage = self.interpreter.last_usage
+        used = f" ({usage['steps']} Schritte, {usage['seconds']:.2f} s)" if usage else ""
+        if run.from_cache:
+            used = " (aus Cache)"
+        if run.error_found:
+            self._set_status('#ff3333', 'Fehler beim Ausführen' + used)
+        elif NotebookCell.running_count:
+            self._set_status('#ffff00', f'Läuft... ({NotebookCell.running_count} Zellen)')
+        else:
+            self._set_status('#33ff66', 'Bereit' + used)
+        if self._profile is not None:
+            self.profile_gutter.set_profile(self._profile)
+            self.profile_gutter.show()
+            self.profile_export_button.show()
+        if run.graphics:
+            self.show_graphics(run.graphics)
+
+    def export_profile(self):
+        profiler = self._profile
+        if profiler is None:
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Profil exportieren", "profile.json", "JSON (*.json)")
+        if path:
+            profiler.to_json(path)
 
     def show_animation(self, frames):
         from PySide6.QtWidgets import QDialog, QVBoxLayout, QLabel
-        from PySide6.QtGui import QPixmap, QPainter, QColor
+        from PySide6.QtGui import QPixmap, QPainter
         from PySide6.QtCore import Qt, QTimer
         size = 300
         dlg = QDialog(self)
@@ -132,24 +290,7 @@ class NotebookCell(QWidget):
             pixmap = QPixmap(size, size)
             pixmap.fill(Qt.black)
             painter = QPainter(pixmap)
-            painter.setRenderHint(QPainter.Antialiasing)
-            painter.setPen(QColor('#33ff66'))
-            for item in graphics:
-                if item['type'] == 'point':
-                    x = int(item['x'] * size / 100)
-                    y = int(item['y'] * size / 100)
-                    painter.drawEllipse(x-2, y-2, 4, 4)
-                elif item['type'] == 'line':
-                    x1 = int(item['x1'] * size / 100)
-                    y1 = int(item['y1'] * size / 100)
-                    x2 = int(item['x2'] * size / 100)
-                    y2 = int(item['y2'] * size / 100)
-                    painter.drawLine(x1, y1, x2, y2)
-                elif item['type'] == 'circle':
-                    x = int(item['x'] * size / 100)
-                    y = int(item['y'] * size / 100)
-                    r = int(item['r'] * size / 100)
-                    painter.drawEllipse(x - r, y - r, 2*r, 2*r)
+            paint_graphics(painter, graphics, size)
             painter.end()
             pixmaps.append(pixmap)
         # Animation abspielen
@@ -166,30 +307,13 @@ class NotebookCell(QWidget):
     def show_graphics(self, graphics):
         # Einfache Zeichenfläche als neues Fenster
         from PySide6.QtWidgets import QDialog, QVBoxLayout, QLabel
-        from PySide6.QtGui import QPixmap, QPainter, QColor
+        from PySide6.QtGui import QPixmap, QPainter
         from PySide6.QtCore import Qt
         size = 300
         pixmap = QPixmap(size, size)
         pixmap.fill(Qt.black)
         painter = QPainter(pixmap)
-        painter.setRenderHint(QPainter.Antialiasing)
-        painter.setPen(QColor('#33ff66'))
-        for item in graphics:
-            if item['type'] == 'point':
-                x = int(item['x'] * size / 100)
-                y = int(item['y'] * size / 100)
-                painter.drawEllipse(x-2, y-2, 4, 4)
-            elif item['type'] == 'line':
-                x1 = int(item['x1'] * size / 100)
-                y1 = int(item['y1'] * size / 100)
-                x2 = int(item['x2'] * size / 100)
-                y2 = int(item['y2'] * size / 100)
-                painter.drawLine(x1, y1, x2, y2)
-            elif item['type'] == 'circle':
-                x = int(item['x'] * size / 100)
-                y = int(item['y'] * size / 100)
-                r = int(item['r'] * size / 100)
-                painter.drawEllipse(x - r, y - r, 2*r, 2*r)
+        paint_graphics(painter, graphics, size)
         painter.end()
         dlg = QDialog(self)
         dlg.setWindowTitle("Grafik")
@@ -205,29 +329,9 @@ class NotebookCell(QWidget):
         qp = QPainter(self)
         qp.setRenderHint(QPainter.RenderHint.Antialiasing)
         w, h = self.width(), self.height()
-        # Glow-Rahmen
-        for i in range(1, 4):
-            qp.setPen(QPen(QColor(51,255,102, 18//i), 6+2*i))
-            qp.drawRoundedRect(2-i, 2-i, w-4+2*i, h-4+2*i, 12+i, 12+i)
-        qp.setPen(QPen(QColor('#33ff66'), 2))
-        qp.drawRoundedRect(2, 2, w-4, h-4, 12, 12)
-        # Scanlines
-        for y in range(8, h-8, 4):
-            y_off = y + (self.anim_phase % 8)
-            color = QColor(30,30,30,60)
-            if y%16==0:
-                color = QColor('#33ff66') if (y//16)%2==0 else QColor('#ffe066')
-                color.setAlpha(40)
-            qp.setPen(QPen(color, 1))
-            qp.drawLine(8, y_off, w-8, y_off)
-        # CRT-Vignette (korrekt mit QLinearGradient)
-        grad = QLinearGradient(0, 0, 0, h)
-        grad.setColorAt(0, QColor(0,0,0,80))
-        grad.setColorAt(0.5, QColor(0,0,0,0))
-        grad.setColorAt(1, QColor(0,0,0,80))
-        qp.setBrush(grad)
-        qp.setPen(Qt.PenStyle.NoPen)
-        qp.drawRoundedRect(2, 2, w-4, h-4, 12, 12)
+        # Glow-Rahmen, Scanlines und Vignette kommen vorgerendert aus dem
+        # Cache (pro Zellgröße); nur die Scanlines wandern mit anim_phase
+        paint_decoration(qp, w, h, self.anim_phase, self.devicePixelRatioF())
         # Disketten-Icon (unten rechts)
         t = self.anim_phase
         dx = int(w-36+math.sin(t/11)*2)
@@ -243,5 +347,4 @@ class NotebookCell(QWidget):
             qp.drawLine(12, 12, 22, 22)
             qp.drawLine(22, 22, 18, 22)
             qp.drawLine(22, 22, 22, 18)
-        self.anim_phase += 1
         qp.end()
\ No newline at end of file
@@ -0,0 +1,104 @@
+from collections import OrderedDict
+
+from PySide6.QtCore import Qt, QPoint, QRect
+from PySide6.QtGui import QPainter, QColor, QPen, QLinearGradient, QPixmap
+
+# Vorgerenderte CRT-Dekoration der Zellen. Glow-Rahmen und Vignette hängen von
+# der Zellgröße ab und liegen zusammen in einer Pixmap pro Größe. Die Scanlines
+# wiederholen sich alle 32 px; sie sind nur eine kleine Kachel, die pro Frame
+# mit drawTiledPixmap um anim_phase % 8 Pixel verschoben gezeichnet wird.
+
+# Obergrenze für die gecachten Rahmen-Pixmaps in Bytes (ARGB, 4 Byte pro Pixel);
+# eine Zelle mit 900x300 px braucht gut 1 MB, bei doppelter Pixeldichte das Vierfache
+CACHE_BYTES = 16 * 1024 * 1024
+SCANLINE_PERIOD = 8
+# Farbmuster der Scanlines: grau alle 4 px, grün/gelb abwechselnd alle 16 px
+SCANLINE_TILE = 32
+TILE_WIDTH = 64
+INSET = 8
+
+_overlays = OrderedDict()  # (w, h, dpr) -> Rahmen mit Vignette
+_overlay_bytes = 0
+_tiles = {}  # dpr -> Scanline-Kachel
+
+
+def _pixmap(w, h, dpr):
+    pixmap = QPixmap(int(w * dpr), int(h * dpr))
+    pixmap.setDevicePixelRatio(dpr)
+    pixmap.fill(Qt.GlobalColor.transparent)
+    return pixmap
+
+
+def _size(pixmap):
+    return pixmap.width() * pixmap.height() * 4
+
+
+def _render_overlay(w, h, dpr):
+    pixmap = _pixmap(w, h, dpr)
+    qp = QPainter(pixmap)
+    qp.setRenderHint(QPainter.RenderHint.Antialiasing)
+    # Glow-Rahmen
+    for i in range(1, 4):
+        qp.setPen(QPen(QColor(51,255,102, 18//i), 6+2*i))
+        qp.drawRoundedRect(2-i, 2-i, w-4+2*i, h-4+2*i, 12+i, 12+i)
+    qp.setPen(QPen(QColor('#33ff66'), 2))
+    qp.drawRoundedRect(2, 2, w-4, h-4, 12, 12)
+    # Vignette
+    grad = QLinearGradient(0, 0, 0, h)
+    grad.setColorAt(0, QColor(0,0,0,80))
+    grad.setColorAt(0.5, QColor(0,0,0,0))
+    grad.setColorAt(1, QColor(0,0,0,80))
+    qp.setBrush(grad)
+    qp.setPen(Qt.PenStyle.NoPen)
+    qp.drawRoundedRect(2, 2, w-4, h-4, 12, 12)
+    qp.end()
+    return pixmap
+
+
+def _render_tile(dpr):
+    # Zeile y der Kachel entspricht den Scanlines mit y % 32 in Zellkoordinaten
+    pixmap = _pixmap(TILE_WIDTH, SCANLINE_TILE, dpr)
+    qp = QPainter(pixmap)
+    for y in range(0, SCANLINE_TILE, 4):
+        color = QColor(30,30,30,60)
+        if y%16==0:
+            color = QColor('#33ff66') if (y//16)%2==0 else QColor('#ffe066')
+            color.setAlpha(40)
+        qp.fillRect(0, y, TILE_WIDTH, 1, color)
+    qp.end()
+    return pixmap
+
+
+def scanline_tile(dpr=1.0):
+    tile = _tiles.get(dpr)
+    if tile is None:
+        tile = _tiles[dpr] = _render_tile(dpr)
+    return tile
+
+
+def overlay(w, h, dpr=1.0):
+    """Rahmen und Vignette als eine Pixmap für eine Zelle der Größe w x h."""
+    global _overlay_bytes
+    key = (w, h, dpr)
+    pixmap = _overlays.get(key)
+    if pixmap is not None:
+        _overlays.move_to_end(key)
+        return pixmap
+    pixmap = _render_overlay(w, h, dpr)
+    _overlays[key] = pixmap
+    _overlay_bytes += _size(pixmap)
+    # Die neueste Pixmap bleibt immer im Cache, auch wenn sie allein zu groß ist
+    while _overlay_bytes > CACHE_BYTES and len(_overlays) > 1:
+        _key, old = _overlays.popitem(last=False)
+        _overlay_bytes -= _size(old)
+    return pixmap
+
+
+def paint_decoration(qp, w, h, phase, dpr=1.0):
+    """Zeichnet die CRT-Dekoration mit um phase verschobenen Scanlines."""
+    shift = phase % SCANLINE_PERIOD
+    if w > 2 * INSET and h > 2 * INSET:
+        # Scanlines zwischen y = 8 und h - 8, um shift nach unten versetzt
+        qp.drawTiledPixmap(QRect(INSET, INSET + shift, w - 2 * INSET, h - 2 * INSET),
+                           scanline_tile(dpr), QPoint(0, INSET))
+    qp.drawPixmap(0, 0, overlay(w, h, dpr))
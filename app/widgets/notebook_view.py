@@ -0,0 +1,258 @@
+import bisect
+
+from PySide6.QtWidgets import QScrollArea, QWidget, QLabel
+from PySide6.QtCore import Qt, QTimer, QEvent
+from PySide6.QtGui import QPainter, QColor, QPen
+
+# Virtualisierte Zellliste: Nur Zellen in der Nähe des sichtbaren Bereichs
+# bekommen ein NotebookCell-Widget, alle anderen existieren nur als CellModel.
+# Die y-Positionen ergeben sich aus den gemessenen (bzw. für noch nie
+# angezeigte Zellen geschätzten) Höhen. Zellen, deren Widget noch nicht
+# gebaut ist, werden bis zum nächsten Layout-Durchlauf als Platzhalter gezeichnet.
+
+SPACING = 8
+# Geschätzte Höhe einer noch nie angezeigten Zelle (plus pro Ausgabezeile)
+ESTIMATED_HEIGHT = 200
+ESTIMATED_LINE_HEIGHT = 16
+# Ober- und unterhalb des sichtbaren Bereichs so viele Pixel vorab aufbauen
+OVERSCAN = 600
+# So viele freigegebene Widgets werden zur Wiederverwendung aufgehoben
+POOL_SIZE = 8
+
+
+class _Canvas(QWidget):
+    # Inhalt des Scrollbereichs: zeichnet Platzhalter und nimmt Drops an
+
+    def __init__(self, view):
+        super().__init__()
+        self.view = view
+        self.setAcceptDrops(True)
+        self.insert_line = QLabel(self)
+        self.insert_line.setStyleSheet('background: #33ff66; border-radius: 2px;')
+        self.insert_line.hide()
+
+    def event(self, event):
+        # Ohne eigenes Layout meldet Qt Größenänderungen der Zellen (z.B. neue
+        # Ausgabe) als LayoutRequest an den Elternteil
+        if event.type() == QEvent.Type.LayoutRequest:
+            self.view.schedule_layout()
+        return super().event(event)
+
+    def paintEvent(self, event):
+        self.view._paint_placeholders(self, event.rect())
+
+    def dragEnterEvent(self, e):
+        e.accept() if e.mimeData().hasText() else e.ignore()
+
+    def dragMoveEvent(self, e):
+        pos = e.position().toPoint() if hasattr(e, 'position') else e.pos()
+        self.view._show_insert_line(pos.y())
+        e.accept()
+
+    def dragLeaveEvent(self, e):
+        self.insert_line.hide()
+
+    def dropEvent(self, e):
+        pos = e.position().toPoint() if hasattr(e, 'position') else e.pos()
+        self.view._drop(e.source(), pos.y())
+        e.accept()
+
+
+class NotebookView(QScrollArea):
+    """Scrollbare Zellliste, die nur Widgets für Zellen nahe dem Sichtbereich baut.
+
+    models ist die Liste der CellModel in Notebook-Reihenfolge. factory
+    erzeugt ein neues NotebookCell-Widget; freigegebene Widgets werden mit
+    bind() für andere Zellen wiederverwendet; ihr Zustand steckt vollständig
+    im Modell. Laufende und wartende Zellen
+    behalten ihr Widget, auch wenn sie aus dem Bild gescrollt werden; Run All
+    läuft ohne Widgets direkt auf den Modellen (app/widgets/runner.py)."""
+
+    def __init__(self, factory, parent=None):
+        super().__init__(parent)
+        self.factory = factory
+        self.models = []
+        self._heights = {}  # CellModel -> gemessene bzw. geschätzte Höhe
+        self._offsets = [0]  # y-Position jeder Zelle, am Ende die Gesamthöhe
+        self._index = {}  # CellModel -> Position in models
+        self._dirty = True
+        self._live = {}  # CellModel -> NotebookCell
+        self._pool = []
+        self.canvas = _Canvas(self)
+        self.setWidget(self.canvas)
+        self.setWidgetResizable(False)
+        # Feste Scrollbar: sonst ändert ihr Erscheinen die Breite und damit die Höhen
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOn)
+        self._layout_timer = QTimer(self)
+        self._layout_timer.setSingleShot(True)
+        self._layout_timer.timeout.connect(self._update_layout)
+        self.verticalScrollBar().valueChanged.connect(self.schedule_layout)
+
+    # --- Zellliste ---
+
+    def set_models(self, models):
+        """Zeigt die Liste models an (z.B. NotebookModel.cells, wird nicht kopiert).
+        Laufende Zellen vorher abbrechen."""
+        for model in list(self._live):
+            self._release(model)
+        self.models = models
+        self._heights.clear()
+        self._invalidate()
+
+    def append(self, model):
+        self.models.append(model)
+        self._invalidate()
+
+    def move(self, from_idx, to_idx):
+        if from_idx == to_idx or not (0 <= from_idx < len(self.models) and 0 <= to_idx < len(self.models)):
+            return
+        self.models.insert(to_idx, self.models.pop(from_idx))
+        self._invalidate()
+
+    def index(self, model):
+        self._recompute()
+        return self._index[model]
+
+    def live_widget(self, model):
+        """Widget der Zelle model oder None, wenn sie gerade keins hat (wird nicht gebaut)."""
+        return self._live.get(model)
+
+    def refresh(self, model):
+        """Zeigt ein neues Ergebnis von model an (z.B. nach einem Lauf ohne Widget)."""
+        cell = self._live.get(model)
+        if cell is not None and not cell.is_busy():
+            cell.bind(model)
+        self.schedule_layout()
+
+    def live_cells(self):
+        return list(self._live.values())
+
+    # --- Layout ---
+
+    def schedule_layout(self, *args):
+        # Mehrere Änderungen pro Event-Durchlauf ergeben nur ein Layout
+        if not self._layout_timer.isActive():
+            self._layout_timer.start(0)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.schedule_layout()
+
+    def _invalidate(self):
+        self._dirty = True
+        self.schedule_layout()
+
+    def _height(self, model):
+        height = self._heights.get(model)
+        if height is None:
+            height = ESTIMATED_HEIGHT + ESTIMATED_LINE_HEIGHT * min(model.output.count("\n"), 40)
+            self._heights[model] = height
+        return height
+
+    def _recompute(self):
+        if not self._dirty:
+            return
+        offsets = [0]
+        y = 0
+        for model in self.models:
+            y += self._height(model) + SPACING
+            offsets.append(y)
+        self._offsets = offsets
+        self._index = {model: idx for idx, model in enumerate(self.models)}
+        self._dirty = False
+
+    def _range(self, top, bottom):
+        # Indizes der Zellen, die den Bereich top..bottom überlappen
+        first = max(0, bisect.bisect_right(self._offsets, top) - 1)
+        last = min(len(self.models), bisect.bisect_left(self._offsets, bottom))
+        return first, max(first, last)
+
+    def _update_layout(self):
+        changed = self._dirty
+        self._recompute()
+        width = self.viewport().width()
+        top = self.verticalScrollBar().value() - OVERSCAN
+        first, last = self._range(top, top + self.viewport().height() + 2 * OVERSCAN)
+        for model in list(self._live):
+            if (model not in self._index or not first <= self._index[model] < last) \
+                    and not self._live[model].is_busy():
+                self._release(model)
+                changed = True
+        for model in self.models[first:last]:
+            if model not in self._live:
+                self._materialize(model)
+                changed = True
+        # Gebaute Zellen messen; geänderte Höhen verschieben alle folgenden Zellen
+        for model, cell in self._live.items():
+            height = max(cell.sizeHint().height(), cell.minimumSizeHint().height())
+            if self._heights.get(model) != height:
+                self._heights[model] = height
+                self._dirty = changed = True
+        if not changed and self.canvas.width() == width:
+            return  # Nur gescrollt: Qt zeichnet den freigelegten Bereich selbst
+        self._recompute()
+        for model, cell in self._live.items():
+            y = self._offsets[self._index[model]]
+            cell.setGeometry(0, y, width, self._heights[model])
+        self.canvas.resize(width, self._offsets[-1])
+        self.canvas.update()
+
+    def _materialize(self, model):
+        cell = self._pool.pop() if self._pool else self.factory()
+        cell.setParent(self.canvas)
+        cell.bind(model)
+        cell.show()
+        self._live[model] = cell
+
+    def _release(self, model):
+        cell = self._live.pop(model)
+        cell.hide()
+        if len(self._pool) < POOL_SIZE:
+            self._pool.append(cell)
+        else:
+            cell.clock.unregister(cell)
+            cell.deleteLater()
+
+    def _paint_placeholders(self, canvas, rect):
+        self._recompute()
+        first, last = self._range(rect.top(), rect.bottom())
+        qp = QPainter(canvas)
+        qp.setRenderHint(QPainter.RenderHint.Antialiasing)
+        for idx in range(first, last):
+            model = self.models[idx]
+            if model in self._live:
+                continue
+            y = self._offsets[idx]
+            height = self._offsets[idx + 1] - y - SPACING
+            qp.setPen(QPen(QColor('#33ff66'), 2))
+            qp.setBrush(QColor('#181c1b'))
+            qp.drawRoundedRect(2, y + 2, canvas.width() - 4, height - 4, 12, 12)
+            # Erste Zeile des Quelltexts als Vorschau
+            qp.setPen(QColor('#888'))
+            preview = model.source.split("\n", 1)[0][:80]
+            qp.drawText(36, y + 28, f"[{model.cell_type}] {preview}")
+        qp.end()
+
+    # --- Drag & Drop ---
+
+    def _index_at(self, y):
+        self._recompute()
+        idx = bisect.bisect_right(self._offsets, y) - 1
+        return idx if 0 <= idx < len(self.models) else None
+
+    def _show_insert_line(self, y):
+        idx = self._index_at(y)
+        line = self.canvas.insert_line
+        if idx is None:
+            line.hide()
+            return
+        line.setGeometry(0, max(0, self._offsets[idx] - SPACING // 2 - 2), self.canvas.width(), 4)
+        line.show()
+        line.raise_()
+
+    def _drop(self, source, y):
+        self.canvas.insert_line.hide()
+        to_idx = self._index_at(y)
+        model = getattr(source, "model", None)
+        if to_idx is not None and model in self._live and self._live[model] is source:
+            self.move(self.index(model), to_idx)
@@ -0,0 +1,59 @@
+from PySide6.QtWidgets import QWidget
+from PySide6.QtCore import Qt, QRectF
+from PySide6.QtGui import QPainter, QColor, QFont
+
+# Breite der Profil-Spalte neben dem Eingabefeld
+GUTTER_WIDTH = 120
+
+
+class ProfileGutter(QWidget):
+    """Spalte neben einem QTextEdit, die pro Zeile Treffer und Zeit aus
+    einem LineProfiler anzeigt. Teure Zeilen werden röter hinterlegt."""
+
+    def __init__(self, editor, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.profiler = None
+        self.setFixedWidth(GUTTER_WIDTH)
+        font = QFont("Menlo")
+        font.setStyleHint(QFont.StyleHint.Monospace)
+        font.setPointSize(9)
+        self.setFont(font)
+        # Beim Scrollen und Tippen mitlaufen
+        editor.verticalScrollBar().valueChanged.connect(self.update)
+        editor.textChanged.connect(self.update)
+
+    def set_profile(self, profiler):
+        self.profiler = profiler
+        self.update()
+
+    def paintEvent(self, event):
+        qp = QPainter(self)
+        qp.fillRect(self.rect(), QColor('#111'))
+        if self.profiler is None or not self.profiler.lines:
+            qp.end()
+            return
+        slowest = max(seconds for _, seconds in self.profiler.lines.values()) or 1.0
+        document = self.editor.document()
+        layout = document.documentLayout()
+        # Blockkoordinaten sind relativ zum Dokument; in Gutter-Koordinaten umrechnen
+        offset = self.editor.viewport().mapTo(self, self.editor.viewport().rect().topLeft()).y()
+        offset -= self.editor.verticalScrollBar().value()
+        block = document.firstBlock()
+        while block.isValid():
+            rect = layout.blockBoundingRect(block)
+            top = rect.top() + offset
+            if top > self.height():
+                break
+            stats = self.profiler.line_stats(block.blockNumber() + 1)
+            if stats and top + rect.height() >= 0:
+                hits, seconds = stats
+                row = QRectF(0, top, self.width(), rect.height())
+                heat = QColor('#ff3333')
+                heat.setAlpha(int(160 * seconds / slowest))
+                qp.fillRect(row, heat)
+                qp.setPen(QColor('#33ff66'))
+                qp.drawText(row.adjusted(4, 0, -4, 0), Qt.AlignVCenter | Qt.AlignRight,
+                            f"{hits}× {seconds * 1000:.1f} ms")
+            block = block.next()
+        qp.end()
@@ -0,0 +1,101 @@
+import markdown2
+from PySide6.QtCore import QObject, QTimer
+
+from app.kernel import CellRun
+from app.worker import start_worker
+from app.widgets.cell import NotebookCell
+
+# Run All und Folgezellen laufen direkt auf CellModel und Kernel: Zellen ohne
+# Widget (außerhalb des Sichtbereichs) bekommen dafür keins. Ist beim Start
+# einer Zelle gerade ein Widget für sie gebaut, übernimmt dieses den Lauf und
+# zeigt die Ausgabe wie beim Klick auf Run.
+
+
+class NotebookRunner(QObject):
+    """Führt Zellen nacheinander über die Warteschlange des Kernels aus.
+
+    view liefert die gerade gebauten Widgets (NotebookView), set_status setzt
+    die Status-LED des Fensters. Ohne Widget gibt es kein Profil und kein
+    Grafikfenster; die Ergebnisse landen nur im Modell."""
+
+    def __init__(self, kernel, view, set_status, parent=None):
+        super().__init__(parent)
+        self.kernel = kernel
+        self.view = view
+        self.set_status = set_status
+        self._runs = {}  # CellModel -> wartender Lauf in kernel.pending
+        self._run = None  # Laufender Lauf ohne Widget (CellRun)
+        self._thread = None
+        self._worker = None
+
+    def run(self, models):
+        """Reiht die Zellen models in dieser Reihenfolge ein."""
+        for model in models:
+            if model.cell_type != "Code":
+                model.set_result([markdown2.markdown(model.source)])
+                self.view.refresh(model)
+            elif model not in self._runs and (self._run is None or model is not self._run.model):
+                self._runs[model] = lambda model=model: self._start(model)
+                self._start(model)
+
+    def cancel(self, wait=False):
+        """Verwirft wartende Läufe und bricht den laufenden ab; mit wait=True blockierend."""
+        for run in self._runs.values():
+            self.kernel.dequeue(run)
+        self._runs.clear()
+        if self._worker is not None:
+            self._worker.cancel()
+        if wait and self._thread is not None:
+            self._thread.wait()
+
+    def _start(self, model):
+        run = self._runs.get(model)
+        if run is None:
+            return  # Inzwischen abgebrochen
+        if self.kernel.is_busy():
+            self.kernel.enqueue(run)
+            return
+        del self._runs[model]
+        cell = self.view.live_widget(model)
+        if cell is not None:
+            cell.execute()
+            return
+        source = model.source
+        NotebookCell.running_count += 1
+        self.set_status('#ffff00', 'Läuft...')
+        self.kernel.interpreter.disable_profiler()
+        self._run = CellRun(self.kernel, model, source)
+        if self._run.from_cache:
+            self._on_finished(self._run.cached_results)
+            return
+        self._thread, self._worker = start_worker(
+            self.kernel.interpreter, source.splitlines(),
+            on_finished=self._on_finished,
+            on_heartbeat=self._on_heartbeat,
+            on_thread_finished=self._on_thread_finished,
+            on_output=self._on_output,
+        )
+
+    def _on_heartbeat(self, usage):
+        self.set_status('#ffff00', f"Läuft... ({usage['steps']} Schritte, {usage['seconds']:.1f} s)")
+
+    def _on_thread_finished(self):
+        self._thread = None
+        self._worker = None
+
+    def _on_output(self, chunk):
+        self._run.add(chunk)
+
+    def _on_finished(self, results):
+        run, self._run = self._run, None
+        NotebookCell.running_count = max(0, NotebookCell.running_count - 1)
+        next_run = run.finish(results)
+        if next_run is not None:
+            QTimer.singleShot(0, next_run)
+        self.view.refresh(run.model)
+        if run.error_found:
+            self.set_status('#ff3333', 'Fehler beim Ausführen')
+        elif NotebookCell.running_count or next_run is not None:
+            self.set_status('#ffff00', 'Läuft...')
+        else:
+            self.set_status('#33ff66', 'Bereit (aus Cache)' if run.from_cache else 'Bereit')
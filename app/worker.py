@@ -0,0 +1,84 @@
+import time
+
+from PySide6.QtCore import QObject, QThread, Qt, Signal, Slot
+
+from app.interpreter import ErrorMessage
+
+# Ausgaben werden höchstens einmal pro Frame (~60 Hz) an die Zelle geschickt
+OUTPUT_FLUSH_INTERVAL = 1 / 60
+
+
+class InterpreterWorker(QObject):
+    """Führt den Code einer Zelle außerhalb des GUI-Threads aus.
+
+    Alle Signale werden über Thread-Grenzen hinweg als Queued Connection
+    zugestellt; die Zelle sieht Ergebnisse also immer im GUI-Thread."""
+
+    heartbeat = Signal(object)  # Zwischenstand des Budgets (dict aus usage())
+    output = Signal(object)  # Liste neuer Ausgaben seit dem letzten Frame
+    finished = Signal(object)  # Restliche Ergebnisse von run_block (Grafik)
+
+    def __init__(self, interpreter, lines):
+        super().__init__()
+        self.interpreter = interpreter
+        self.lines = lines
+        # Zähler schon hier (im GUI-Thread) anlegen: ein Abbruch vor dem Start
+        # des Threads landet sonst auf dem Zähler des vorherigen Laufs
+        self.meter = interpreter.budget.start()
+        self._pending = []
+        self._next_flush = 0.0
+
+    @Slot()
+    def run(self):
+        try:
+            results = self.interpreter.run_block(
+                self.lines, heartbeat=self._on_heartbeat, stream=self._on_output, meter=self.meter)
+        except Exception as e:
+            results = [ErrorMessage(f"Error: {type(e).__name__}: {e}")]
+        self._flush()
+        self.finished.emit(results)
+
+    def _on_output(self, out):
+        self._pending.append(out)
+        now = time.perf_counter()
+        if now >= self._next_flush:
+            self._flush(now)
+
+    def _on_heartbeat(self, usage):
+        # Auch bei stillen Rechenphasen Gepuffertes rausschicken
+        self._flush()
+        self.heartbeat.emit(usage)
+
+    def _flush(self, now=None):
+        self._next_flush = (now or time.perf_counter()) + OUTPUT_FLUSH_INTERVAL
+        if self._pending:
+            chunk, self._pending = self._pending, []
+            self.output.emit(chunk)
+
+    def cancel(self):
+        self.meter.cancel()
+
+
+def start_worker(interpreter, lines, on_finished, on_heartbeat=None, on_thread_finished=None,
+                 on_output=None):
+    """Startet einen InterpreterWorker in einem eigenen QThread.
+
+    Die Callbacks sollten Methoden eines QObject im GUI-Thread sein. Gibt
+    (thread, worker) zurück; der Aufrufer muss beide referenzieren, bis
+    der Thread beendet ist (on_thread_finished)."""
+    queued = Qt.ConnectionType.QueuedConnection
+    thread = QThread()
+    worker = InterpreterWorker(interpreter, lines)
+    worker.moveToThread(thread)
+    thread.started.connect(worker.run)
+    worker.finished.connect(on_finished, queued)
+    if on_heartbeat is not None:
+        worker.heartbeat.connect(on_heartbeat, queued)
+    if on_output is not None:
+        worker.output.connect(on_output, queued)
+    worker.finished.connect(thread.quit)
+    thread.finished.connect(worker.deleteLater)
+    if on_thread_finished is not None:
+        thread.finished.connect(on_thread_finished, queued)
+    thread.start()
+    return thread, worker
@@ -0,0 +1,255 @@
+"""Mikro-Benchmarks für RetroInterpreter.
+
+    python benchmarks/bench_interpreter.py                  # messen und ausgeben
+    python benchmarks/bench_interpreter.py --save-baseline  # Ergebnis als Baseline speichern
+    python benchmarks/bench_interpreter.py --compare        # mit der Baseline vergleichen
+
+Ergebnisse werden als JSON geschrieben; --compare meldet Benchmarks, die um
+mehr als --threshold Prozent langsamer geworden sind (Exitcode 1).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.interpreter import ExecutionBudget, RetroInterpreter, flatten_results, is_error  # noqa: E402
+from app.parser import parse_program  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+RESULTS_PATH = os.path.join(HERE, "results.json")
+
+
+def _interpreter():
+    # Ohne Budget-Grenzen, damit nur der Interpreter gemessen wird
+    return RetroInterpreter(ExecutionBudget(None, None))
+
+
+# Jeder Benchmark: setup() -> (run, ops, check). run ist eine Funktion ohne
+# Argumente, die einmal gemessen wird; ops gibt an, wie viele Operationen ein
+# Aufruf enthält (für ns/op). check prüft das Ergebnis von run und bricht bei
+# falschen Ergebnissen ab, damit ein kaputter Benchmark nicht nur Fehler misst.
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def _expect(condition, message):
+    if not condition:
+        raise BenchmarkError(message)
+
+
+def _no_errors(results):
+    errors = [r for r in flatten_results(results) if is_error(r)]
+    _expect(not errors, f"interpreter error: {errors[:1]}")
+
+
+def _var(interp, name, expected):
+    def check(results):
+        _no_errors(results)
+        _expect(interp.env.get(name) == expected, f"{name} = {interp.env.get(name)!r}, expected {expected!r}")
+    return check
+
+
+def bench_eval_expr():
+    interp = _interpreter()
+    interp.set_var("x", 3)
+    interp.set_var("y", 4)
+    exprs = ["x + y * 2", "sqrt(x^2 + y^2)", "x > y and y < 10", "max(x - y, y - x) / 2"] * 250
+
+    def run():
+        return [interp.eval_expr(expr) for expr in exprs]
+
+    def check(results):
+        _no_errors(results)
+        _expect(results[:4] == [11, 5.0, False, 0.5], f"unexpected results {results[:4]}")
+    return run, len(exprs), check
+
+
+def bench_run_line_dispatch():
+    interp = _interpreter()
+    lines = ["LET a = 1", "PRINT a + 1", "a * 2", "DEF f(x) = x + 1", "PRINT f(a)"] * 200
+
+    def run():
+        return [interp.run_line(line) for line in lines]
+
+    def check(results):
+        _no_errors(results)
+        _expect(interp.env.get("a") == 1 and results[-1] == "2", f"unexpected results {results[:5]}")
+    return run, len(lines), check
+
+
+def bench_for_loop():
+    interp = _interpreter()
+    program = ["LET s = 0", "FOR i = 1 TO 20000", "LET s = s + i", "NEXT"]
+
+    def run():
+        return interp.run_block(program)
+    return run, 20000, _var(interp, "s", 20000 * 20001 // 2)
+
+
+def bench_while_loop():
+    interp = _interpreter()
+    program = ["LET i = 0", "WHILE i < 20000 DO", "LET i = i + 1", "ENDWHILE"]
+
+    def run():
+        return interp.run_block(program)
+    return run, 20000, _var(interp, "i", 20000)
+
+
+def bench_def_calls():
+    program = ["DEF sq(x) = x * x", "DEF hyp(a, b) = sqrt(sq(a) + sq(b))",
+               "LET s = 0", "FOR i = 1 TO 10000", "LET s = s + hyp(i, 2)", "NEXT"]
+    interp = _interpreter()
+    expected = sum((i * i + 4) ** 0.5 for i in range(1, 10001))
+
+    def run():
+        return interp.run_block(program)
+
+    def check(results):
+        _no_errors(results)
+        _expect(abs(interp.env.get("s", 0) - expected) < 1e-6, f"s = {interp.env.get('s')!r}")
+    return run, 10000, check
+
+
+def bench_list_index_assignment():
+    interp = _interpreter()
+    interp.set_var("arr", list(range(100)))
+    # Feste Menge von Anweisungen (passt in den Ausdrucks-Cache), mehrfach ausgeführt
+    # (einmal geparst, wie eine Zelle in run_block)
+    program = parse_program([f"LET arr[{i}] = {i} * 2" for i in range(100)] * 20)
+
+    def run():
+        return interp.execute(program)
+
+    def check(results):
+        _no_errors(results)
+        _expect(interp.env["arr"] == [i * 2 for i in range(100)], "arr not assigned")
+    return run, len(program), check
+
+
+def bench_graphics_collection():
+    program = ["FOR i = 1 TO 2000", "POINT i % 100, i % 50", "LINE 0, 0, i % 100, 50",
+               "CIRCLE 50, 50, i % 40", "NEXT"]
+
+    def run():
+        return _interpreter().run_block(program)
+
+    def check(results):
+        _no_errors(results)
+        graphics = [item for r in flatten_results(results) if isinstance(r, dict) and "graphics" in r
+                    for item in r["graphics"]]
+        _expect(len(graphics) == 6000, f"{len(graphics)} graphics items, expected 6000")
+    return run, 6000, check
+
+
+BENCHMARKS = {
+    "eval_expr": bench_eval_expr,
+    "run_line_dispatch": bench_run_line_dispatch,
+    "for_loop": bench_for_loop,
+    "while_loop": bench_while_loop,
+    "def_calls": bench_def_calls,
+    "list_index_assignment": bench_list_index_assignment,
+    "graphics_collection": bench_graphics_collection,
+}
+
+
+def measure(setup, repeat):
+    run, ops, check = setup()
+    check(run())  # Aufwärmen (Compile-Cache, Funktionsdefinitionen) und Ergebnis prüfen
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    return {
+        "ops": ops,
+        "best_s": best,
+        "median_s": statistics.median(timings),
+        "ns_per_op": best / ops * 1e9,
+    }
+
+
+def run_benchmarks(names, repeat):
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": repeat,
+        "results": {name: measure(BENCHMARKS[name], repeat) for name in names},
+    }
+
+
+def compare(current, baseline, threshold):
+    """Gibt die Vergleichstabelle aus; liefert die Namen der Regressionen."""
+    regressions = []
+    print(f"{'benchmark':<24}{'baseline':>14}{'current':>14}{'change':>10}")
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<24}{'-':>14}{result['ns_per_op']:>11.0f} ns{'new':>10}")
+            continue
+        change = (result["ns_per_op"] / base["ns_per_op"] - 1) * 100
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  << slower"
+        print(f"{name:<24}{base['ns_per_op']:>11.0f} ns{result['ns_per_op']:>11.0f} ns"
+              f"{change:>+9.1f}%{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="RetroInterpreter micro-benchmarks")
+    parser.add_argument("names", nargs="*", metavar="NAME",
+                        help="nur diese Benchmarks ausführen (Standard: alle): " + ", ".join(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=5, help="Messungen pro Benchmark")
+    parser.add_argument("--output", default=RESULTS_PATH, help="JSON-Datei für die Ergebnisse")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="JSON-Datei der Baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="Ergebnis als neue Baseline speichern")
+    parser.add_argument("--compare", action="store_true", help="mit der Baseline vergleichen")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="erlaubte Verlangsamung in Prozent (Standard: 10)")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error("unknown benchmark: " + ", ".join(unknown))
+
+    current = run_benchmarks(args.names or list(BENCHMARKS), args.repeat)
+    target = args.baseline if args.save_baseline else args.output
+    with open(target, "w", encoding="utf-8") as f:
+        json.dump(current, f, indent=2)
+
+    if not args.compare:
+        for name, result in current["results"].items():
+            print(f"{name:<24}{result['ns_per_op']:>11.0f} ns/op  ({result['ops']} ops)")
+        print(f"Ergebnisse gespeichert: {target}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        # Die Baseline liegt im Repository (benchmarks/baseline.json); fehlt sie, gibt es nichts zu vergleichen
+        print(f"Keine Baseline gefunden ({args.baseline}); mit --save-baseline auf dem "
+              f"Stand vor der Änderung anlegen.", file=sys.stderr)
+        return 2
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if (baseline.get("python"), baseline.get("machine")) != (current["python"], current["machine"]):
+        # Absolute Zeiten sind nur auf demselben Rechner vergleichbar
+        print(f"Warnung: Baseline von Python {baseline.get('python')} / {baseline.get('machine')}, "
+              f"gemessen mit {current['python']} / {current['machine']}.", file=sys.stderr)
+    regressions = compare(current, baseline, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} Benchmark(s) mehr als {args.threshold:.0f}% langsamer: "
+              + ", ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,4 @@
 import sys
-from app.main import start_app
 
 
 def run_headless_test(ticks: int = 3):
@@ -30,8 +29,13 @@ def run_headless_test(ticks: int = 3):
 
 
 if __name__ == "__main__":
+    if '--exec' in sys.argv:
+        # Notebooks ohne GUI ausführen (kein Qt nötig)
+        from app.batch import main as run_batch
+        sys.exit(run_batch(sys.argv[1:]))
     if '--test' in sys.argv or '-t' in sys.argv:
         import os
         rc = run_headless_test()
         sys.exit(rc)
+    from app.main import start_app
     start_app()
\ No newline at end of file
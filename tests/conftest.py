@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests laufen ohne Installation direkt aus dem Repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
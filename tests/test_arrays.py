@@ -0,0 +1,36 @@
+"""Tests für range()/linspace() und Arrays im Interpreter (app/arrays.py)."""
+import pytest
+
+from app import arrays
+from app.interpreter import RetroInterpreter
+
+
+@pytest.fixture
+def interp():
+    return RetroInterpreter()
+
+
+def test_integer_range_is_a_list_of_python_ints(interp):
+    interp.run_block(["LET xs = range(1, 100)"])
+    assert interp.eval_expr("xs[98] ** 20") == 99 ** 20
+    assert interp.eval_expr("range(3) * 2") == [0, 1, 2, 0, 1, 2]
+    assert interp.eval_expr("range(10, 0, -3)") == [10, 7, 4, 1]
+
+
+def test_comprehension_yields_python_numbers(interp):
+    assert interp.run_block(["PRINT [x for x in range(3)]"]) == ["[0, 1, 2]"]
+    assert interp.run_block(["PRINT [x for x in linspace(0, 1, 3)]"]) == ["[0.0, 0.5, 1.0]"]
+    if arrays.np is not None:
+        assert interp.run_block(["PRINT [x * 2 for x in array([1, 2])]"]) == ["[2, 4]"]
+
+
+def test_integer_range_without_numpy_is_identical(interp, monkeypatch):
+    with_numpy = interp.eval_expr("range(2, 20, 3)")
+    monkeypatch.setattr(arrays, "np", None)
+    assert arrays.arange(2, 20, 3) == with_numpy
+
+
+@pytest.mark.skipif(arrays.np is None, reason="NumPy nicht installiert")
+def test_float_range_and_linspace_are_elementwise(interp):
+    assert list(interp.eval_expr("range(0, 1, 0.25) * 2")) == [0.0, 0.5, 1.0, 1.5]
+    assert list(interp.eval_expr("linspace(0, 1, 3) + 1")) == [1.0, 1.5, 2.0]
@@ -0,0 +1,42 @@
+"""Tests für die Headless-Ausführung (app/batch.py)."""
+import json
+
+import pytest
+
+from app import batch
+
+
+def write_notebook(path, sources):
+    path.write_text(json.dumps([{"type": "code", "input": source} for source in sources]))
+    return str(path)
+
+
+def test_failing_cell_does_not_stop_the_run(tmp_path):
+    path = write_notebook(tmp_path / "nb.json", ["PRINT (1+", "PRINT 6"])
+    summary = batch.run_notebook(path, use_cache=False)
+    assert summary["cells"] == 2
+    assert len(summary["errors"]) == 1 and summary["errors"][0].startswith("cell 0:")
+    cells = json.loads((tmp_path / "nb.json").read_text())
+    assert cells[1]["output"] == "6"
+
+
+@pytest.mark.parametrize("option, value", [
+    ("--max-steps", "-5"),
+    ("--max-seconds", "-1"),
+    ("--max-seconds", "inf"),
+    ("--max-seconds", "nan"),
+])
+def test_invalid_budget_is_a_usage_error(tmp_path, capsys, option, value):
+    path = write_notebook(tmp_path / "nb.json", ["PRINT 1"])
+    with pytest.raises(SystemExit) as exc:
+        batch.main(["--exec", path, option, value])
+    assert exc.value.code == 2
+    assert "must be a finite, non-negative number" in capsys.readouterr().err
+    # Notebook wurde nicht angefasst
+    assert "output" not in json.loads((tmp_path / "nb.json").read_text())[0]
+
+
+def test_zero_budget_means_unlimited(tmp_path):
+    path = write_notebook(tmp_path / "nb.json", ["LET s = 0", "FOR i = 1 TO 3000\nLET s = s + i\nNEXT i", "PRINT s"])
+    assert batch.main(["--exec", path, "--max-steps", "0", "--max-seconds", "0", "--no-cache"]) == 0
+    assert json.loads((tmp_path / "nb.json").read_text())[2]["output"] == "4501500"
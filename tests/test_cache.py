@@ -0,0 +1,98 @@
+"""Tests für den Ausgabe-Cache (app/cache.py)."""
+import json
+from array import array
+
+import pytest
+
+from app import batch, cache
+from app.arrays import np
+from app.interpreter import RetroInterpreter
+
+
+def test_key_changes_with_read_variables_only():
+    interp = RetroInterpreter()
+    interp.run_block(["LET x = 1", "LET y = 2", "LET xs = [1, 2]"])
+    source = "LET z = x * 2\nPRINT xs"
+    key = cache.cache_key(interp, source)
+    assert key is not None and key == cache.cache_key(interp, source)
+    interp.run_block(["LET y = 3"])  # nicht gelesen
+    assert cache.cache_key(interp, source) == key
+    interp.run_block(["LET x = 5"])
+    changed = cache.cache_key(interp, source)
+    assert changed != key
+    interp.run_block(["LET xs[0] = 9"])  # gleiches Objekt, anderer Inhalt
+    assert cache.cache_key(interp, source) != changed
+    interp.run_block(["LET x = 1.0"])  # 1 und 1.0 sind verschiedene Eingaben
+    assert cache.cache_key(interp, "PRINT x") != cache.cache_key(RetroInterpreter(), "PRINT x")
+
+
+def test_key_follows_called_functions():
+    interp = RetroInterpreter()
+    interp.run_block(["LET k = 2", "DEF f(a) = a * k"])
+    key = cache.cache_key(interp, "PRINT f(3)")
+    interp.run_block(["LET k = 3"])
+    assert cache.cache_key(interp, "PRINT f(3)") != key
+
+
+def test_memoized_fingerprints_see_list_writes():
+    interp = RetroInterpreter()
+    interp.run_block(["LET xs = [1, 2]"])
+    fingerprints = {}
+    key = cache.cache_key(interp, "PRINT xs", fingerprints)
+    interp.run_block(["LET xs[1] = 5"])
+    assert cache.cache_key(interp, "PRINT xs", fingerprints) != key
+
+
+def test_uncacheable_cells():
+    interp = RetroInterpreter()
+    assert cache.cache_key(interp, "INPUT x") is None
+    assert cache.cache_key(interp, "BUDGET 10") is None
+
+
+@pytest.mark.parametrize("value", [
+    None, True, 3, 2.5, "text", [1, [2.5, "a"]], (1, 2), {"a": 1, (1, 2): [3]}, {1, 2}, 1 + 2j,
+    array("d", [1.0, 2.5]),
+])
+def test_encode_round_trip(value):
+    decoded = cache._decode(json.loads(json.dumps(cache._encode(value))))
+    assert decoded == value and type(decoded) is type(value)
+
+
+@pytest.mark.skipif(np is None, reason="NumPy nicht installiert")
+def test_encode_round_trip_array():
+    value = np.arange(6, dtype=np.int32).reshape(2, 3)
+    decoded = cache._decode(json.loads(json.dumps(cache._encode(value))))
+    assert decoded.dtype == value.dtype and (decoded == value).all()
+
+
+def test_output_cache_put_get(tmp_path):
+    interp = RetroInterpreter()
+    source = "LET xs = [1, 2]\nDEF f(a) = a + 1\nPRINT f(1)"
+    interp.run_block(source.splitlines())
+    store = cache.OutputCache(str(tmp_path))
+    entry = cache.capture(interp, source, ["2"], [])
+    assert store.put("k", entry)
+    restored = store.get("k")
+    assert restored["outputs"] == ["2"] and restored["env"] == {"xs": [1, 2]}
+    other = RetroInterpreter()
+    cache.apply(other, restored)
+    assert other.eval_expr("f(xs[1])") == 3
+    assert store.get("missing") is None and (store.hits, store.misses) == (1, 1)
+
+
+def test_unencodable_entry_is_counted(tmp_path):
+    store = cache.OutputCache(str(tmp_path))
+    assert not store.put("k", {"outputs": [object()], "graphics": [], "env": {}, "functions": {}})
+    assert store.skipped == 1
+
+
+def test_cell_with_graphics_from_lists_is_cached(tmp_path):
+    path = tmp_path / "nb.json"
+    path.write_text(json.dumps([{"type": "code", "input": "PLOT [1, 2, 3], [4, 5, 6]\nPRINT 1"}]))
+    first = batch.run_notebook(str(path))
+    second = batch.run_notebook(str(path))
+    assert (first["cached"], second["cached"]) == (0, 1)
+    assert not second["errors"]
+    cell = json.loads(path.read_text())[0]
+    assert cell["output"] == "1"
+    assert cell["graphics"][0]["xs"] == [1.0, 2.0, 3.0]
@@ -0,0 +1,55 @@
+"""Tests für die Abhängigkeiten zwischen Zellen (app/deps.py)."""
+from app.deps import DependencyGraph, analyze
+from app.kernel import NotebookKernel
+from app.model import CellModel, NotebookModel
+
+
+def test_analyze_reads_and_writes():
+    reads, writes = analyze("LET y = x + 1\nDEF f(a) = a * k\nFOR i = 1 TO n\nLET xs[0] = i\nNEXT i\nINPUT name")
+    assert writes == {"y", "f", "i", "xs", "name"}
+    assert reads == {"x", "k", "n", "xs", "i"}
+
+
+def test_downstream_follows_last_writer():
+    graph = DependencyGraph([
+        "LET x = 1",      # 0
+        "LET y = x * 2",  # 1
+        None,             # 2 Markdown
+        "PRINT y",        # 3
+        "LET x = 5",      # 4 überschreibt x
+        "PRINT x",        # 5 hängt von 4 ab, nicht von 0
+        "PRINT 7",        # 6
+    ])
+    assert graph.downstream(0) == [1, 3]
+    assert graph.downstream(4) == [5]
+    assert graph.downstream(6) == []
+
+
+def test_stale_cells():
+    sources = ["LET x = 1", "LET y = x * 2", "PRINT y", "PRINT 3"]
+    graph = DependencyGraph(sources)
+    current = [(source, n) for n, source in enumerate(sources, start=1)]
+    assert graph.stale(current) == []
+    assert graph.stale([None] + current[1:]) == [0, 1, 2]  # nie gelaufen
+    changed = list(current)
+    changed[1] = ("LET y = x * 3", 2)  # Code geändert
+    assert graph.stale(changed) == [1, 2]
+    rerun = list(current)
+    rerun[0] = ("LET x = 1", 9)  # Vorgänger seitdem erneut gelaufen
+    assert graph.stale(rerun) == [1, 2]
+
+
+def test_rewind_marks_later_cells_stale():
+    notebook = NotebookModel([CellModel("Code", "LET x = 1"), CellModel("Code", "LET y = 2"),
+                              CellModel("Code", "PRINT x + y")])
+    kernel = NotebookKernel()
+    for cell in notebook.cells:
+        cell.start_run(cell.source, kernel.begin(cell))
+        kernel.interpreter.run_block(cell.source.splitlines())
+        kernel.finish()
+    graph = DependencyGraph(notebook.code_sources())
+    assert graph.stale(notebook.last_runs()) == []
+    # Zelle 1 vom Stand vor ihrem Lauf: y und alles danach fehlt wieder
+    kernel.rewind(notebook.cells[1])
+    assert graph.stale(notebook.last_runs()) == [2]
+    assert "y" not in kernel.interpreter.env
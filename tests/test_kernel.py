@@ -0,0 +1,129 @@
+"""Tests für den gemeinsamen Kernel (app/kernel.py): Snapshots, copy-on-write, rewind."""
+import gc
+
+from app.cache import OutputCache
+from app.interpreter import ErrorMessage
+from app.kernel import MAX_OUTPUT_LINES, CellRun, NotebookKernel
+from app.model import CellModel
+
+
+def run(kernel, cell, source=None):
+    """Führt eine Zelle wie die GUI/der Batch-Runner aus (ohne Cache)."""
+    source = cell.source if source is None else source
+    cell.start_run(source, kernel.begin(cell))
+    results = kernel.interpreter.run_block(source.splitlines())
+    kernel.finish()
+    return results
+
+
+def test_cells_share_variables_and_functions():
+    kernel = NotebookKernel()
+    first, second = CellModel("Code", "LET x = 2\nDEF f(a) = a * x"), CellModel("Code", "PRINT f(3)")
+    run(kernel, first)
+    assert run(kernel, second) == ["6"]
+    assert (first.execution_count, second.execution_count) == (1, 2)
+
+
+def test_rewind_restores_state_before_the_cell():
+    kernel = NotebookKernel()
+    setup, step = CellModel("Code", "LET x = 1"), CellModel("Code", "LET x = x + 1\nLET y = 5")
+    run(kernel, setup)
+    run(kernel, step)
+    run(kernel, step)
+    assert kernel.interpreter.env["x"] == 3
+    assert kernel.rewind(step)
+    env = kernel.interpreter.env
+    assert env["x"] == 2 and env["y"] == 5  # Stand vor dem letzten Lauf von step
+    assert kernel.rewind(setup)
+    assert "x" not in kernel.interpreter.env
+    assert not kernel.rewind(CellModel("Code", "PRINT 1"))  # nie gelaufen
+
+
+def test_rewind_is_refused_while_busy():
+    kernel = NotebookKernel()
+    cell = CellModel("Code", "LET x = 1")
+    run(kernel, cell)
+    kernel.begin(CellModel())
+    assert not kernel.rewind(cell)
+
+
+def test_list_writes_copy_on_write():
+    kernel = NotebookKernel()
+    make, change = CellModel("Code", "LET xs = [1, 2, 3]"), CellModel("Code", "LET xs[0] = 9")
+    run(kernel, make)
+    original = kernel.interpreter.env["xs"]
+    run(kernel, change)
+    assert kernel.interpreter.env["xs"] == [9, 2, 3]
+    assert original == [1, 2, 3]  # steckt im Snapshot von change, wurde kopiert
+    kernel.rewind(change)
+    assert kernel.interpreter.env["xs"] == [1, 2, 3]
+
+
+def test_unshared_lists_are_written_in_place():
+    kernel = NotebookKernel()
+    run(kernel, CellModel("Code", "LET xs = [1, 2]\nLET xs[0] = 5"))
+    xs = kernel.interpreter.env["xs"]
+    kernel.interpreter.run_block(["LET xs[1] = 6"])  # in keinem Snapshot
+    assert kernel.interpreter.env["xs"] is xs and xs == [5, 6]
+    run(kernel, CellModel("Code", "LET xs[0] = 7"))  # begin: xs steckt im Snapshot
+    assert kernel.interpreter.env["xs"] is not xs and xs == [5, 6]
+
+
+def test_removed_cells_release_their_snapshots():
+    kernel = NotebookKernel()
+    first = CellModel("Code", "LET xs = [1, 2]")
+    run(kernel, first)
+    old = kernel.interpreter.env["xs"]
+    removed = CellModel("Code", "LET xs = [3]")
+    run(kernel, removed)  # Snapshot von removed hält die alte Liste
+    assert id(old) in kernel.interpreter._shared
+    del removed
+    gc.collect()
+    assert list(kernel.snapshots) == [first]
+    run(kernel, CellModel("Code", "PRINT xs"))
+    assert id(old) not in kernel.interpreter._shared
+
+
+def test_reset_clears_state():
+    kernel = NotebookKernel()
+    cell = CellModel("Code", "LET x = 1")
+    run(kernel, cell)
+    kernel.reset()
+    assert "x" not in kernel.interpreter.env
+    assert not kernel.rewind(cell) and kernel.execution_count == 0
+
+
+def test_cell_run_collects_streamed_output():
+    kernel = NotebookKernel()
+    cell = CellModel("Code", "PRINT 1")
+    run = CellRun(kernel, cell, cell.source)
+    assert kernel.is_busy() and cell.last_run == ("PRINT 1", 1) and not run.from_cache
+    run.add(["a\nb", [""]])
+    run.add([str(n) for n in range(MAX_OUTPUT_LINES)])
+    assert run.finish([{"graphics": [{"type": "point", "x": 1, "y": 2}]}]) is None
+    assert not kernel.is_busy()
+    assert cell.outputs[0] == "... (2 ältere Zeilen ausgeblendet)"
+    assert cell.outputs[1:] == [str(n) for n in range(MAX_OUTPUT_LINES)]
+    assert cell.graphics == [{"type": "point", "x": 1, "y": 2}]
+
+
+def test_cell_run_uses_and_fills_the_cache(tmp_path):
+    kernel = NotebookKernel(cache=OutputCache(str(tmp_path)))
+    cell = CellModel("Code", "LET x = 2\nPRINT x")
+    run = CellRun(kernel, cell, cell.source)
+    run.finish(kernel.interpreter.run_block(cell.source.splitlines()))
+    kernel.reset()
+    again = CellRun(kernel, cell, cell.source)
+    assert again.from_cache and again.cached_results == ["x = 2", "2"]
+    assert kernel.interpreter.env["x"] == 2
+    again.finish(again.cached_results)
+    assert cell.outputs == ["x = 2", "2"]
+
+
+def test_cell_run_with_error_is_not_cached(tmp_path):
+    kernel = NotebookKernel(cache=OutputCache(str(tmp_path)))
+    cell = CellModel("Code", "PRINT 1")
+    run = CellRun(kernel, cell, cell.source)
+    run.finish(["1", ErrorMessage("Error: boom")])
+    assert run.error_found and cell.outputs == ["1", "Error: boom"]
+    assert not CellRun(kernel, cell, cell.source).from_cache
@@ -0,0 +1,58 @@
+"""Tests für das Qt-freie Notebook-Modell (app/model.py) und das Speichern."""
+import json
+from array import array
+
+from app.model import CellModel, NotebookModel
+from app.storage import load_notebook, save_notebook
+
+DATA = [
+    {"type": "code", "input": "PRINT 1", "output": "1", "execution_count": 3, "tags": ["x"]},
+    {"type": "markdown", "input": "# Titel"},
+]
+
+
+def test_round_trip_keeps_unknown_keys():
+    notebook = NotebookModel.from_data(DATA)
+    code, text = notebook.cells
+    assert (code.cell_type, code.outputs, code.execution_count) == ("Code", ["1"], 3)
+    assert code.extra == {"tags": ["x"]}
+    assert text.cell_type == "Markdown"
+    assert notebook.to_data() == DATA
+
+
+def test_metadata_switches_file_format():
+    notebook = NotebookModel.from_data(DATA)
+    assert isinstance(notebook.to_data(), list)
+    notebook.set_budget_limits(500, None)
+    data = notebook.to_data()
+    assert data["metadata"] == {"budget": {"max_steps": 500, "max_seconds": None}}
+    assert NotebookModel.from_data(data).budget_limits() == (500, None)
+
+
+def test_diff_lists_changed_added_and_removed_cells():
+    notebook = NotebookModel.from_data(DATA)
+    assert notebook.diff(DATA) == []
+    notebook.cells[1].source = "# Neu"
+    notebook.cells.append(CellModel("Code", "PRINT 2"))
+    assert notebook.diff(DATA) == [1, 2]
+    del notebook.cells[1:]
+    assert notebook.diff(DATA) == [1]
+    assert notebook.diff({"metadata": {}, "cells": DATA}) == [1]
+
+
+def test_last_run_and_invalidate():
+    cell = CellModel("Code", "PRINT 1")
+    assert cell.last_run is None
+    cell.start_run("PRINT 1", 4)
+    assert cell.last_run == ("PRINT 1", 4)
+    cell.invalidate()
+    assert cell.last_run is None and cell.execution_count == 4
+
+
+def test_graphics_arrays_are_saved_as_lists(tmp_path):
+    cell = CellModel("Code", "PLOT [1, 2]")
+    cell.set_result([], [{"type": "polyline", "xs": array("d", [1, 2]), "ys": (3, 4)}])
+    path = str(tmp_path / "nb.json")
+    saved = save_notebook(NotebookModel([cell]), path)
+    assert json.loads(open(path, encoding="utf-8").read()) == saved == load_notebook(path)
+    assert saved[0]["graphics"][0]["xs"] == [1.0, 2.0]
@@ -0,0 +1,60 @@
+"""Tests für den Parser der Zellprogramme (app/parser.py)."""
+from app import parser as ast
+
+
+def test_statements():
+    let, index, print_, def_, input_, plot, expr = ast.parse_program([
+        "LET x = 1 + 2",
+        "LET xs[3] = x",
+        "PRINT x",
+        "DEF MEMO f(a, b) = a + b",
+        "INPUT name",
+        "PLOT xs, ys",
+        "x * 2",
+    ])
+    assert (type(let), let.name, let.index, let.expr) == (ast.Let, "x", None, "1 + 2")
+    assert (index.name, index.index) == ("xs", "3")
+    assert (type(print_), print_.expr) == (ast.Print, "x")
+    assert (def_.name, def_.args, def_.body, def_.memo) == ("f", ["a", "b"], "a + b", True)
+    assert (type(input_), input_.name) == (ast.Input, "name")
+    assert (plot.cmd, plot.args) == ("PLOT", ["xs", "ys"])
+    assert (type(expr), expr.expr) == (ast.Expr, "x * 2")
+
+
+def test_line_numbers_skip_blank_lines_and_comments():
+    nodes = ast.parse_program("# Kommentar\n\nPRINT 1\n  PRINT 2")
+    assert [node.lineno for node in nodes] == [3, 4]
+
+
+def test_nested_blocks():
+    (loop,) = ast.parse_program([
+        "FOR i = 1 TO 10 STEP 2",
+        "  IF i > 3 THEN",
+        "    WHILE x < i DO",
+        "      LET x = x + 1",
+        "    ENDWHILE",
+        "  ELSE",
+        "    PRINT i",
+        "  ENDIF",
+        "NEXT i",
+    ])
+    assert (type(loop), loop.var, loop.start, loop.end, loop.step) == (ast.For, "i", "1", "10", "2")
+    (cond,) = loop.body
+    assert type(cond) is ast.If and cond.cond == "i > 3"
+    (inner,) = cond.then_body
+    assert type(inner) is ast.While and [type(n) for n in inner.body] == [ast.Let]
+    assert [type(n) for n in cond.else_body] == [ast.Print]
+
+
+def test_unbalanced_blocks_are_syntax_errors():
+    nodes = ast.parse_program(["PRINT 1", "ENDIF", "ELSE"])
+    assert [type(n) for n in nodes] == [ast.Print, ast.SyntaxErrorNode, ast.SyntaxErrorNode]
+    assert nodes[1].message == "Syntax Error: unexpected ENDIF"
+    nodes = ast.parse_program(["WHILE x < 3 DO", "LET x = x + 1"])
+    assert nodes[0].message == "Syntax Error: WHILE without ENDWHILE"
+
+
+def test_invalid_statements():
+    for line in ("LET = 1", "LET __x = 1", "DEF f = 1", "INPUT a b", "LINE 1, 2", "BUDGET", "TRACE maybe"):
+        (node,) = ast.parse_program([line])
+        assert type(node) is ast.SyntaxErrorNode, line
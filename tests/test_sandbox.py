@@ -0,0 +1,165 @@
+"""Regressionstests für die Sandbox (app/sandbox.py): verbotene Konstrukte,
+Größen- und Formatgrenzen und der schnelle Weg für reine Zahlen."""
+import warnings
+
+import pytest
+
+from app import sandbox
+from app.arrays import np
+from app.interpreter import ExecutionBudget, RetroInterpreter, is_error
+
+needs_numpy = pytest.mark.skipif(np is None, reason="NumPy nicht installiert")
+
+
+@pytest.fixture
+def interp():
+    # Ohne Budget: die Grenzen der Sandbox müssen auch dann greifen
+    interp = RetroInterpreter(ExecutionBudget(None, None))
+    interp.set_var("x", 3.5)
+    interp.set_var("n", 7)
+    interp.set_var("xs", [1, 2])
+    interp.set_var("s", "ab")
+    interp.set_var("w", 10 ** 8)
+    return interp
+
+
+def error(interp, expr):
+    result = interp.eval_expr(expr)
+    assert is_error(result), f"{expr} -> {result!r}"
+    return result
+
+
+@pytest.mark.parametrize("expr", [
+    "().__class__",
+    "__import__('os')",
+    "(lambda: 1)()",
+])
+def test_forbidden_constructs(interp, expr):
+    error(interp, expr)
+
+
+@pytest.mark.parametrize("expr", [
+    "[0] * 10**9",
+    "xs * 10**9",
+    "'x' * w",
+    "9 ** 9 ** 9",
+    "n << 10**7",
+    "(10**600000) * (10**600000)",
+])
+def test_single_operation_limits(interp, expr):
+    assert "too large" in error(interp, expr)
+
+
+@pytest.mark.parametrize("expr", [
+    "'%0100000000d' % 1",
+    "'%.100000000f' % 1.0",
+    "'%*d' % (10**8, 1)",
+    "'%(a)0100000000d' % {'a': 1}",
+    "b'%0100000000d' % 1",
+    "s + '%0100000000d' % n",
+    "f'{1:>100000000}'",
+    "f'{n:>{w}}'",
+    "f'{x!r:.{w}}'",
+])
+def test_format_width_limits(interp, expr):
+    assert "format width too large" in error(interp, expr)
+
+
+def test_allocation_limit_per_expression(interp):
+    # Jede einzelne Liste liegt unter der Grenze, zusammen wären es ~400 MB
+    assert "too much data" in error(interp, "[[0] * 10**7 for k in range(5)]")
+    # Die Grenze gilt pro Ausdruck, nicht für den ganzen Lauf
+    assert interp.eval_expr("len([0] * 10**7)") == 10 ** 7
+    assert interp.eval_expr("len([0] * 10**7)") == 10 ** 7
+
+
+@needs_numpy
+@pytest.mark.parametrize("expr", [
+    "a + b", "a - b", "a * b", "a / b", "a // b", "a % b", "a ** b", "a >> b", "a & b", "a | b", "a ^ b",
+    "a == b", "a < b", "b <= a", "b > a", "(a - 1) - b", "a - (b + 0)",
+])
+def test_broadcasting_is_limited(interp, expr):
+    # 5000 x 1 gegen 1 x 5000: jedes Array ist klein, das Ergebnis hätte 25 Mio. Elemente
+    interp.run_block(["LET a = array([[k] for k in range(5000)])", "LET b = array([list(range(5000))])"])
+    assert "too large" in error(interp, expr)
+
+
+@needs_numpy
+def test_array_results_count_towards_allocation(interp):
+    interp.run_block(["LET a = array(range(5 * 10**6))"])
+    assert "too much data" in error(interp, "[-a for k in range(5)]")
+    assert "too much data" in error(interp, "[a < 1 for k in range(5)]")
+    assert "too much data" in error(interp, "[sin(a) for k in range(5)]")
+    assert interp.eval_expr("len(a - 1)") == 5 * 10 ** 6
+
+
+@needs_numpy
+@pytest.mark.parametrize("expr", ["xs / 0", "xs ** 5000", "xs * 0 / 0", "log(xs - 1)", "sqrt(-xs)", "xs[0] / 0"])
+def test_numpy_warnings_are_silenced(interp, expr):
+    interp.run_block(["LET xs = array([1.0, 2.0])"])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        assert not is_error(interp.eval_expr(expr)), expr
+
+
+@pytest.mark.parametrize("expr, expected", [
+    ("x + n", 10.5),
+    ("n + 1", 8),
+    ("n * 2 + 1", 15),
+    ("n * n", 49),
+    ("x * x", 12.25),
+    ("n ** 2", 49),
+    ("x ** 2", 12.25),
+    ("2 ** 0.5", 2 ** 0.5),
+    ("n % 3", 1),
+    ("(n - 1) * 3", 18),
+    ("xs + xs", [1, 2, 1, 2]),
+    ("xs * 2", [1, 2, 1, 2]),
+    ("n * s", "ab" * 7),
+    ("s * n", "ab" * 7),
+    ("'%05d|%-4s|%%' % (n, s)", "00007|ab  |%"),
+    ("'%*d' % (4, n)", "   7"),
+    ("f'{x:>8.2f}'", "    3.50"),
+    ("f'{n:0{n}d}'", "0000007"),
+    ("f'{s!r:>6}'", "  'ab'"),
+    ("(10**300) * (10**300) == 10**600", True),
+    ("(2**600) ** 2 == 2**1200", True),
+    ("1 < n < 8", True),
+    ("1 < n < 7", False),
+    ("n not in xs and -n > ~n", True),
+    ("s < 'b' and not n", False),
+    ("xs is not None", True),
+    ("n // 2 - n / 2", -0.5),
+    ("(n | 8) & 13 >> 1", 6),
+])
+def test_results_unchanged(interp, expr, expected):
+    assert interp.eval_expr(expr) == expected
+
+
+def test_fast_path_skips_helpers_for_numbers(interp):
+    calls = []
+    for name in ("__retro_add", "__retro_mul", "__retro_pow", "__retro_mod"):
+        helper = interp.namespace[name]
+        interp.namespace[name] = lambda a, b, helper=helper: calls.append(1) or helper(a, b)
+    for expr in ("x + n", "n * 2", "n * n", "x ** 2", "n % 3", "sqrt(x^2 + n^2)"):
+        assert not is_error(interp.eval_expr(expr)), expr
+    assert calls == []
+    interp.eval_expr("xs + xs")
+    assert calls == [1]
+
+
+def test_operators_on_other_values_use_the_helpers(interp):
+    calls = []
+    helper = interp.namespace["__retro_compare"]
+    interp.namespace["__retro_compare"] = lambda *args: calls.append(args[0]) or helper(*args)
+    assert interp.eval_expr("n < x < 10") is False
+    assert interp.eval_expr("s < 'b'") is True
+    assert interp.eval_expr("len(xs) < n") is True
+    assert calls == [("<",), ("<",)]
+
+
+def test_fixed_format_is_checked_when_compiling():
+    with pytest.raises(sandbox.LimitExceeded):
+        sandbox.compile_expression("'%0100000000d' % 1")
+    with pytest.raises(sandbox.LimitExceeded):
+        sandbox.compile_expression("f'{1:>100000000}'")